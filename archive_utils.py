@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+
+from issue_utils import BufferedIssueLogger
+from models import Task, Solution
+
+logger = logging.getLogger('checker')
+
+# Verzia schémy. Archív so starou verziou sa zahodí a treba ho zaindexovať znova.
+SCHEMA_VERSION = 1
+
+# MinHash podpis má NUM_PERM 32-bitových čísel, LSH ho delí na BANDS pásiem po ROWS číslach. Dva
+# texty s podobnosťou (Jaccard) s sa stretnú aspoň v jednom pásme s pravdepodobnosťou
+# 1 - (1 - s^ROWS)^BANDS, pri 16 x 4 je to 0.03 pre s = 0.2, 0.89 pre s = 0.6 a 0.99 pre s = 0.7.
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE = 3
+
+# Od akej odhadnutej podobnosti textov hlási test taskNotInArchive zhodu
+SIMILAR_THRESHOLD = 0.6
+
+SIGNATURE = struct.Struct('<{0}I'.format(NUM_PERM))
+BAND_BYTES = ROWS * 4
+
+# Foldre kola ktoré sa indexujú (viď batch_utils.ROUND_FOLDERS) a čím sa parsujú
+KINDS = {"task": ("zadania", Task), "solution": ("vzoraky", Solution)}
+
+SCHEMA = """
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    round TEXT NOT NULL,
+    number INTEGER,
+    name TEXT,
+    name_key TEXT,
+    author TEXT,
+    points TEXT,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX documents_name ON documents (kind, name_key);
+CREATE INDEX documents_round ON documents (round);
+CREATE TABLE bands (
+    bucket INTEGER NOT NULL,
+    document INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE
+);
+CREATE INDEX bands_bucket ON bands (bucket);
+CREATE INDEX bands_document ON bands (document);
+"""
+
+
+def normalize(text):
+    """Malé písmená bez diakritiky, aby 'Šachovnica' a 'sachovnica' boli to isté."""
+
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def name_key(name):
+    return ' '.join(re.findall(r'\w+', normalize(name))) if name else None
+
+
+def statement_text(model):
+    """Text zadania / vzoráku bez hlavičky a direktív (tie sa líšia aj pri rovnakom texte)."""
+
+    return '\n'.join(line for line in model.lines()
+                     if not line.startswith('%') and line.rstrip('\r\n') != model.document.header)
+
+
+def shingles(text):
+    """Množina SHINGLE-tíc za sebou idúcich slov."""
+
+    words = re.findall(r'\w+', normalize(text))
+    return {' '.join(words[index:index + SHINGLE])
+            for index in range(max(1, len(words) - SHINGLE + 1))} - {''}
+
+
+def minhash(text):
+    """MinHash podpis textu: pre každú z NUM_PERM hashovacích funkcií minimum cez všetky shingles.
+
+    Všetkých NUM_PERM hashov shingle dá jedno volanie shake_128 (každé 4 bajty výstupu sú
+    nezávislá hashovacia funkcia), minimá sa potom zrátajú po stĺpcoch naraz."""
+
+    rows = [SIGNATURE.unpack(hashlib.shake_128(gram.encode('utf-8')).digest(SIGNATURE.size))
+            for gram in shingles(text)]
+    if not rows:
+        return (0xffffffff,) * NUM_PERM
+    return tuple(min(column) for column in zip(*rows))
+
+
+def similarity(first, second):
+    """Odhad Jaccardovej podobnosti textov z ich podpisov."""
+
+    return sum(1 for x, y in zip(first, second) if x == y) / NUM_PERM
+
+
+def band_buckets(signature):
+    """Pre každé LSH pásmo jeden 64-bitový kľúč z čísla pásma a jeho hodnôt (SQLite INTEGER je so
+    znamienkom). Dokumenty s rovnakým kľúčom sa zhodujú v celom pásme."""
+
+    packed = SIGNATURE.pack(*signature)
+    return [int.from_bytes(hashlib.blake2b(bytes([band]) + packed[band * BAND_BYTES:
+                                                                  (band + 1) * BAND_BYTES],
+                                           digest_size=8).digest(), 'little', signed=True)
+            for band in range(BANDS)]
+
+
+def round_of(folder):
+    """Kolo foldra so zadaniami / vzorákmi je jeho rodič, rovnako pri indexovaní aj pri dotaze."""
+
+    return os.path.dirname(os.path.abspath(folder))
+
+
+# Jeden dokument z archívu, ktorý sa podobá na kontrolovaný
+class Match():
+    __slots__ = ('path', 'round', 'number', 'name', 'author', 'similarity')
+
+    def __init__(self, path, round, number, name, author, similarity=None):
+        self.path = path
+        self.round = round
+        self.number = number
+        self.name = name
+        self.author = author
+        self.similarity = similarity
+
+
+# Lokálny index zadaní a vzorákov z minulých kôl v SQLite. Pre každý dokument pamätá meno, autora,
+# body a MinHash podpis textu, podpis je rozdelený do LSH pásiem s indexom. Dotaz na podobné texty
+# je tak pár lookupov v indexe a porovnanie podpisov kandidátov, nie prechod celým archívom.
+# Indexuje sa cez `check.py archive KOLO...`, nezmenené súbory (mtime + veľkosť) sa preskočia.
+class Archive():
+    def __init__(self, path, readonly=False):
+        self.path = path
+        self.lock = threading.Lock()
+        if readonly:
+            uri = 'file:{0}?mode=ro'.format(os.path.abspath(path))
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute('PRAGMA foreign_keys = ON')
+            self.migrate()
+
+    @classmethod
+    def open(cls, path):
+        """Archív na čítanie, alebo None ak ešte neexistuje alebo je zo starej verzie."""
+
+        if not os.path.isfile(path):
+            return None
+        try:
+            archive = cls(path, readonly=True)
+            version = archive.connection.execute('PRAGMA user_version').fetchone()[0]
+        except sqlite3.Error as error:
+            logger.warning("Archív %s sa nedá otvoriť: %s", path, error)
+            return None
+        if version != SCHEMA_VERSION:
+            logger.warning("Archív %s je zo starej verzie checkera, zaindexuj ho znova", path)
+            archive.close()
+            return None
+        return archive
+
+    def migrate(self):
+        with self.connection:
+            version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+            if version == SCHEMA_VERSION:
+                return
+            self.connection.execute('DROP TABLE IF EXISTS bands')
+            self.connection.execute('DROP TABLE IF EXISTS documents')
+            self.connection.executescript(SCHEMA)
+            self.connection.execute('PRAGMA user_version = {0}'.format(SCHEMA_VERSION))
+
+    def close(self):
+        self.connection.close()
+
+    def update(self, round_directory):
+        """Zaindexuje zadania a vzoráky kola. Vráti (pridané, nezmenené, zmazané)."""
+
+        round_directory = os.path.abspath(round_directory)
+        added = unchanged = 0
+        seen = set()
+        with self.lock, self.connection:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in self.connection.execute(
+                'SELECT path, size, mtime_ns FROM documents WHERE round = ?', (round_directory,))}
+            for kind, (folder, model) in KINDS.items():
+                folder = os.path.join(round_directory, folder)
+                if not os.path.isdir(folder):
+                    continue
+                for entry in sorted(os.scandir(folder), key=lambda entry: entry.name):
+                    if not (entry.name.startswith('prikl') and entry.name.endswith('.md')):
+                        continue
+                    seen.add(entry.path)
+                    stat = entry.stat()
+                    if known.get(entry.path) == (stat.st_size, stat.st_mtime_ns):
+                        unchanged += 1
+                        continue
+                    # Problémy so zadaním hlási kontrola jeho kola, tu ich zahodíme
+                    parsed = model.parse(BufferedIssueLogger('checker.archive'), entry.path)
+                    if parsed is None:
+                        continue
+                    self.store(kind, round_directory, parsed, stat)
+                    added += 1
+            removed = [path for path in known if path not in seen]
+            self.connection.executemany('DELETE FROM documents WHERE path = ?',
+                                        [(path,) for path in removed])
+        return added, unchanged, len(removed)
+
+    def store(self, kind, round_directory, model, stat):
+        signature = minhash(statement_text(model))
+        self.connection.execute('DELETE FROM documents WHERE path = ?', (model.filename,))
+        cursor = self.connection.execute(
+            'INSERT INTO documents (path, kind, round, number, name, name_key, author, points, '
+            'size, mtime_ns, signature) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (model.filename, kind, round_directory, model.number, model.name,
+             name_key(model.name), model.author, json.dumps(dict(model.points)), stat.st_size,
+             stat.st_mtime_ns, SIGNATURE.pack(*signature)))
+        self.connection.executemany('INSERT INTO bands (bucket, document) VALUES (?, ?)',
+                                    [(bucket, cursor.lastrowid)
+                                     for bucket in band_buckets(signature)])
+
+    def same_name(self, kind, name, exclude_round=None):
+        """Dokumenty z iných kôl s rovnakým menom (bez ohľadu na veľkosť písmen a diakritiku)."""
+
+        key = name_key(name)
+        if not key:
+            return []
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT path, round, number, name, author FROM documents '
+                'WHERE kind = ? AND name_key = ? AND round != ? ORDER BY round, number',
+                (kind, key, exclude_round or '')).fetchall()
+        return [Match(*row) for row in rows]
+
+    def similar(self, kind, text, threshold, exclude_round=None):
+        """Dokumenty z iných kôl, ktorých text má odhadnutú podobnosť aspoň `threshold`."""
+
+        signature = minhash(text)
+        buckets = band_buckets(signature)
+        # Kandidáti sú dokumenty ktoré sa zhodujú aspoň v jednom pásme, na to stačí index bands
+        with self.lock:
+            rows = self.connection.execute(
+                'SELECT path, round, number, name, author, signature FROM documents '
+                'WHERE kind = ? AND round != ? AND id IN (SELECT document FROM bands '
+                'WHERE bucket IN (' + ', '.join('?' * len(buckets)) + '))',
+                [kind, exclude_round or ''] + buckets).fetchall()
+        matches = []
+        for path, round_directory, number, name, author, packed in rows:
+            score = similarity(signature, SIGNATURE.unpack(packed))
+            if score >= threshold:
+                matches.append(Match(path, round_directory, number, name, author, score))
+        return sorted(matches, key=lambda match: -match.similarity)
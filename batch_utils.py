@@ -0,0 +1,92 @@
+import os
+import glob
+import logging
+import contextvars
+
+logger = logging.getLogger('checker')
+
+# Podfoldre kola: zadania, vstupy, vzoráky (rovnako ako ich generuje bench.py)
+ROUND_FOLDERS = {"path_to_tasks": "zadania",
+                 "path_to_inputs": "vstupy",
+                 "path_to_solutions": "vzoraky"}
+
+
+def read_manifest(path):
+    """Prečíta manifest: jeden foldr (alebo glob) kola na riadok, `#` je komentár. Relatívne cesty
+    sú vzhľadom na foldr manifestu."""
+
+    patterns = []
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding='utf-8') as manifest:
+        for line in manifest:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                patterns.append(os.path.join(base, line))
+    return patterns
+
+
+def find_rounds(patterns):
+    """Z manifestov a globov vyrobí zoznam foldrov kôl (bez duplikátov, v poradí zadania)."""
+
+    rounds = []
+    for pattern in patterns:
+        if os.path.isfile(pattern):
+            candidates = find_rounds(read_manifest(pattern))
+        else:
+            candidates = sorted(glob.glob(pattern))
+            if not candidates:
+                logger.warning("'%s' nezodpovedá žiadne kolo", pattern)
+        for candidate in candidates:
+            candidate = os.path.normpath(candidate)
+            if candidate in rounds or not os.path.isdir(candidate):
+                continue
+            if not any(os.path.isdir(os.path.join(candidate, folder))
+                       for folder in ROUND_FOLDERS.values()):
+                logger.warning("'%s' nevyzerá ako kolo (nemá %s), preskakujem", candidate,
+                               ", ".join(ROUND_FOLDERS.values()))
+                continue
+            rounds.append(candidate)
+    return rounds
+
+
+def round_paths(round_directory):
+    """Cesty k zadaniam, vstupom a vzorákom kola v tvare v akom ich dáva argparse."""
+
+    paths = {}
+    for key, folder in ROUND_FOLDERS.items():
+        path = os.path.join(round_directory, folder)
+        paths[key] = [path] if os.path.isdir(path) else None
+    return paths
+
+
+# Záznamy logu kola ktoré sa práve kontroluje (pri --batch), alebo None. Je to contextvar, takže
+# ho so sebou berú aj workery poolov (viď deadline_utils.inherit).
+round_records = contextvars.ContextVar('round_records', default=None)
+
+
+# Pri dávkovom behu beží každé kolo vo vlastnom vlákne. Handler odkladá záznamy kola (ak
+# bufferovanie zapol), aj tie z poolov na ktorých kolo kompiluje, spúšťa a generuje. Po dobehnutí
+# kola sa vypíšu naraz, aby sa výstupy kôl nepomiešali. Záznamy mimo kola posiela rovno ďalej.
+class RoundBufferHandler(logging.Handler):
+    def __init__(self, target):
+        super().__init__()
+        self.target = target
+
+    def start_buffering(self):
+        round_records.set([])
+
+    def stop_buffering(self):
+        records = round_records.get()
+        round_records.set(None)
+        return records
+
+    def emit(self, record):
+        records = round_records.get()
+        if records is None:
+            self.target.handle(record)
+        else:
+            records.append(record)
+
+    def replay(self, records):
+        for record in records:
+            self.target.handle(record)
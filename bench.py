@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+# Benchmarky checkera. Vygenerujú syntetické kolo (zadania, vzoráky s listingami, vstupy zadanej
+# veľkosti s nasadenými chybami), zmerajú parsovanie, každý test zvlášť aj celý `execute` a výsledky
+# zapíšu do JSON súboru. Ten sa dá porovnať s uloženým baseline, pri regresii skončí s chybou.
+
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+
+import check
+import cache_utils
+from plugin_utils import import_all
+from test_utils import freeze_test_data, RunContext
+from issue_utils import IssueLogger
+from scan_utils import scanner
+from fs_utils import files
+
+# Regresia je keď je medián horší ako baseline o viac ako toľkoto (0.25 = o 25 %)
+DEFAULT_THRESHOLD = 0.25
+
+# Časy kratšie ako toto sú šum, na regresiu ich nekontrolujeme
+MIN_SIGNIFICANT = 0.005
+
+LISTINGS = {
+    'cpp': '#include <iostream>\nint main() {{\n    long long a, b;\n    std::cin >> a >> b;\n'
+           '    std::cout << a + b << "\\n";  // {0}\n}}\n',
+    'py': 'a, b = map(int, input().split())\nprint(a + b)  # {0}\n',
+    'pas': 'program sucet;  {{ {0} }}\nvar a, b: int64;\nbegin\n  readln(a, b);\n'
+           '  writeln(a + b);\nend.\n',
+}
+
+
+def task_header(number, solution=False):
+    letter = 'Z' if number <= 4 else 'O'
+    points = [10, 10, 10, 15, 15, 20, 20, 20][number - 1]
+    popis = points // 2
+    if solution:
+        return '# {0}úloha {1} {{vzorak="Autor" bodypopis={2} bodyprogram={3}}}\n'.format(
+            letter, number, popis, points - popis)
+    return '# {0}úloha {1} {{bodypopis={2} bodyprogram={3}}}\n'.format(letter, number, popis,
+                                                                        points - popis)
+
+
+def generate_round(path, tasks=8, solutions=8, listings=('cpp', 'py'), paragraphs=50,
+                   inputs_per_task=4, input_size=64 * 1024, defect_rate=0.0, seed=0):
+    """Vygeneruje syntetické kolo do `path` (podfoldre zadania, vzoraky, vstupy).
+
+    `defect_rate` je pravdepodobnosť s ktorou má vstupný súbor nasadenú chybu (CRLF, whitespace na
+    konci riadku alebo chýbajúci newline na konci súboru)."""
+
+    rnd = random.Random(seed)
+    paths = {kind: os.path.join(path, kind) for kind in ('zadania', 'vzoraky', 'vstupy')}
+    for folder in paths.values():
+        os.makedirs(folder, exist_ok=True)
+
+    for number in range(1, tasks + 1):
+        with open(os.path.join(paths['zadania'], 'prikl{0}.md'.format(number)), 'w') as task:
+            task.write(task_header(number))
+            task.write('%by Autor\n%proofread Korektor\n\n')
+            for paragraph in range(paragraphs):
+                task.write('Odsek {0} zadania úlohy {1}. '.format(paragraph, number) * 8 + '\n\n')
+            task.write('```vstup\n1 2\n```\n\n```vystup\n3\n```\n')
+
+    for number in range(1, solutions + 1):
+        with open(os.path.join(paths['vzoraky'], 'prikl{0}.md'.format(number)), 'w') as solution:
+            solution.write(task_header(number, solution=True))
+            for paragraph in range(paragraphs):
+                solution.write('Odsek {0} vzoráku {1}. '.format(paragraph, number) * 8 + '\n\n')
+            for language in listings:
+                listing = 'riesenie{0}.{1}'.format(number, language)
+                solution.write('\\listing{{{0}}}\n'.format(listing))
+                with open(os.path.join(paths['vzoraky'], listing), 'w') as listing_file:
+                    listing_file.write(LISTINGS[language].format(rnd.random()))
+
+    for number in range(1, tasks + 1):
+        folder = os.path.join(paths['vstupy'], str(number), 'test')
+        os.makedirs(folder, exist_ok=True)
+        for index in range(inputs_per_task):
+            write_input(os.path.join(folder, '{0}.in'.format(index)), input_size, rnd,
+                        defect_rate)
+            write_input(os.path.join(folder, '{0}.out'.format(index)), input_size // 8 + 1, rnd,
+                        defect_rate)
+    return paths
+
+
+def write_input(filename, size, rnd, defect_rate):
+    line = ' '.join(str(rnd.randint(0, 10 ** 9)) for _ in range(10)) + '\n'
+    data = (line * (size // len(line) + 1))[:size].rsplit('\n', 1)[0] + '\n'
+    if rnd.random() < defect_rate:
+        defect = rnd.choice(['crlf', 'whitespace', 'eof'])
+        if defect == 'crlf':
+            data = data.replace('\n', '\r\n', 3)
+        elif defect == 'whitespace':
+            data = data.replace('\n', ' \n', 3)
+        else:
+            data = data.rstrip('\n')
+    with open(filename, 'w', newline='') as input_file:
+        input_file.write(data)
+
+
+def measure(function, repeat, before=None):
+    times = []
+    for _ in range(repeat):
+        scanner.clear()
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return {"median": statistics.median(times), "min": min(times), "max": max(times),
+            "repeat": repeat}
+
+
+def startup(arguments):
+    """Spustí check.py v novom procese, meria sa celý štart aj s importami."""
+
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            'check.py')] + arguments
+    return lambda: subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_benchmarks(paths, repeat, jobs=1):
+    silent = IssueLogger
+    results = {}
+
+    # Štart checkera: výpis testov ide iba z manifestu, -r importuje iba modul s vybraným testom
+    results["startup.print"] = measure(startup(['-p']), repeat)
+    results["startup.run_only"] = measure(startup(['-r', 'taskComplete', '--tasks',
+                                                   paths['zadania']]), repeat)
+
+    # Parsery si najskôr oskenujú strom do snapshotu súborov, aj to patrí do ich času
+    results["parse_markdown.tasks"] = measure(
+        lambda: check.parse_markdown(silent, paths['zadania'], "tasks"), repeat, files.clear)
+    results["parse_markdown.solutions"] = measure(
+        lambda: check.parse_markdown(silent, paths['vzoraky'], "solutions"), repeat, files.clear)
+    results["parse_inputs"] = measure(lambda: check.parse_inputs(silent, paths['vstupy']), repeat,
+                                      files.clear)
+
+    test_data = freeze_test_data({
+        "path_to_tasks": paths['zadania'],
+        "path_to_solutions": paths['vzoraky'],
+        "path_to_inputs": paths['vstupy'],
+        "tasks": check.parse_markdown(silent, paths['zadania'], "tasks"),
+        "solutions": check.parse_markdown(silent, paths['vzoraky'], "solutions"),
+        "inputs": check.parse_inputs(silent, paths['vstupy']),
+        "files": files})
+
+    tests = import_all()
+    with RunContext(jobs) as context:
+        for test_name, tst in tests.items():
+            results["test." + test_name] = measure(
+                lambda: tst["run"](silent('checker.' + test_name), test_data, context), repeat)
+
+    # Rovnaké argumenty ako z príkazového riadku, nové prepínače tak dostanú svoje defaulty
+    args = check.parse_arguments(['--tasks', paths['zadania'], '--inputs', paths['vstupy'],
+                                  '--solutions', paths['vzoraky'], '--jobs', str(jobs),
+                                  '--no-cache'])
+    results["execute"] = measure(lambda: check.execute(args, dict(tests)), repeat)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Vráti zoznam regresií oproti baseline."""
+
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        before = baseline[name]["median"]
+        now = result["median"]
+        if now > MIN_SIGNIFICANT and now > before * (1 + threshold):
+            regressions.append((name, before, now))
+    return regressions
+
+
+def main():
+    argumentParser = argparse.ArgumentParser(description="Benchmarky checkera KSP zadaní")
+    argumentParser.add_argument('--round', dest="round", metavar="DIR",
+                                help="Kolo na ktorom merať (so zadania/, vzoraky/, vstupy/). " +
+                                     "Bez neho sa vygeneruje syntetické kolo.")
+    argumentParser.add_argument('--keep', dest="keep", metavar="DIR",
+                                help="Syntetické kolo vygeneruj do DIR a nezmaž ho")
+    argumentParser.add_argument('--tasks', type=int, default=8, help="Počet zadaní")
+    argumentParser.add_argument('--solutions', type=int, default=8, help="Počet vzorákov")
+    argumentParser.add_argument('--listings', default='cpp,py',
+                                help="Jazyky listingov v každom vzoráku (cpp, py, pas)")
+    argumentParser.add_argument('--inputs-per-task', type=int, default=4, dest="inputs_per_task",
+                                help="Počet .in/.out párov na úlohu")
+    argumentParser.add_argument('--input-size', type=int, default=1024, dest="input_size",
+                                metavar="KB", help="Veľkosť jedného .in súboru v KB")
+    argumentParser.add_argument('--defect-rate', type=float, default=0.1, dest="defect_rate",
+                                help="Pravdepodobnosť nasadenej chyby vo vstupe")
+    argumentParser.add_argument('--seed', type=int, default=0)
+    argumentParser.add_argument('--repeat', type=int, default=3, help="Koľkokrát merať")
+    argumentParser.add_argument('-j', '--jobs', type=int, default=1, dest="jobs")
+    argumentParser.add_argument('-o', '--output', default='bench_output.json',
+                                help="Kam zapísať výsledky (default: %(default)s)")
+    argumentParser.add_argument('--baseline', metavar="FILE",
+                                help="Porovnaj výsledky s týmto baseline")
+    argumentParser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                                help="Povolené zhoršenie oproti baseline (default: %(default)s)")
+    args = argumentParser.parse_args()
+
+    # Benchmark nemá zmysel ak sa kompilácia vytiahne z cache, a výpis testov tu iba zdržuje
+    cache_utils.configure(None)
+    check.logger.setLevel(logging.CRITICAL + 1)
+
+    temp_directory = None
+    if args.round:
+        paths = {kind: os.path.join(args.round, kind) for kind in ('zadania', 'vzoraky', 'vstupy')}
+    else:
+        if args.keep:
+            target = args.keep
+        else:
+            temp_directory = tempfile.TemporaryDirectory()
+            target = temp_directory.name
+        paths = generate_round(target, args.tasks, args.solutions,
+                               [language for language in args.listings.split(',') if language],
+                               inputs_per_task=args.inputs_per_task,
+                               input_size=args.input_size * 1024,
+                               defect_rate=args.defect_rate, seed=args.seed)
+
+    try:
+        results = run_benchmarks(paths, args.repeat, args.jobs)
+    finally:
+        if temp_directory is not None:
+            temp_directory.cleanup()
+
+    report = {"meta": {"python": platform.python_version(), "machine": platform.machine(),
+                       "cpus": os.cpu_count(), "time": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                       "config": {key: value for key, value in vars(args).items()
+                                  if key not in ('output', 'baseline', 'threshold')}},
+              "results": results}
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+
+    for name, result in sorted(results.items(), key=lambda item: -item[1]["median"]):
+        print("{0:50} {1:10.4f} s".format(name, result["median"]))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, now in regressions:
+            print("REGRESIA {0}: {1:.4f} s -> {2:.4f} s ({3:+.0%})".format(
+                name, before, now, now / before - 1), file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger('checker')
+
+DEFAULT_MAX_SIZE = 64 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ksp-checker')
+
+
+# Perzistentná cache na disku adresovaná obsahom. Kľúč je hash všetkého od čoho výsledok závisí,
+# hodnota je ľubovoľný JSON. Každý záznam je samostatný súbor, zapisuje sa atomicky (tmp súbor +
+# os.replace), takže cache môže naraz zdieľať viac procesov checkera. Pri hite sa záznamu posunie
+# mtime, podľa neho sa pri prekročení max_size vyhadzujú najdlhšie nepoužité záznamy (LRU).
+class ContentCache():
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.written = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(*parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode('utf-8')
+            # Dĺžka pred každou časťou, aby ('ab', 'c') a ('a', 'bc') nedali rovnaký kľúč
+            digest.update(str(len(part)).encode('ascii') + b':' + part)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:] + '.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as entry:
+                value = json.load(entry)
+        except (OSError, ValueError):
+            # Chýbajúci, práve vyhadzovaný alebo rozbitý záznam je proste miss
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value).encode('utf-8')
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as entry:
+                entry.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.debug("Nepodarilo sa zapísať do cache %s", path)
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self.written += len(data)
+        if self.written > self.max_size // 16:
+            self.evict()
+
+    def evict(self):
+        """Vyhodí najdlhšie nepoužité záznamy, kým cache nie je menšia ako max_size."""
+
+        self.written = 0
+        lock_path = os.path.join(self.directory, '.lock')
+        with open(lock_path, 'a') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Práve vyhadzuje iný proces
+                    return
+
+            entries = []
+            total = 0
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    # Zabudnuté tmp súbory po spadnutých procesoch
+                    if entry.name.endswith('.tmp') and stat.st_mtime < time.time() - 3600:
+                        self._remove(entry.path)
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+            entries.sort()
+            for mtime, size, path in entries:
+                if total <= self.max_size:
+                    break
+                self._remove(path)
+                total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+# Cache zdieľaná celým behom. Nastavuje ju main, None znamená že cache je vypnutá.
+cache = None
+
+
+def configure(directory, max_size=DEFAULT_MAX_SIZE):
+    global cache
+    if directory is None:
+        cache = None
+        return None
+    try:
+        cache = ContentCache(directory, max_size)
+    except OSError:
+        logger.warning("Nepodarilo sa vytvoriť cache v '%s', pokračujem bez nej.", directory)
+        cache = None
+    return cache
@@ -7,18 +7,39 @@ import argparse
 import sys
 import os
 import re
-import copy
-import glob
+import time
+import hashlib
 import functools
 import subprocess
 import tempfile
 import py_compile
-
-from test_utils import test, for_each_item_in, TestResult
-from issue_utils import Issue, IssueLogger
-import tests
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+from test_utils import (for_each_item_in, freeze_test_data, schedule_order, TestResult,
+                        RunContext, shard_argument)
+from deadline_utils import Deadline
+from issue_utils import Issue, IssueLogger, BufferedIssueLogger
+import cache_utils
+from toolchain import toolchain
+from runner_utils import runner, Limits
+import timing_utils
+from timing_utils import calibrator, dump_reports
+from incremental import IncrementalState
+from fs_utils import files
+from history_utils import HISTORY_FILENAME, History, priority
+import deadline_utils
+from profile_utils import Profiler
+from plugin_utils import load_manifest, import_tests
+from report_utils import JsonLinesReporter, SarifReporter, tee_logger_class
 from models import *
 
+# Moduly jednotlivých režimov (git, archív, generátory, shardy, --batch, --lsp) sa importujú až
+# vo funkcii ktorá ich potrebuje, aby ich bežný beh (aj `-p`, `-r test`) pri štarte nenačítaval.
+
+# Archív minulých kôl v --cache-dir (viď archive_utils.py)
+ARCHIVE_FILENAME = 'archive.sqlite'
+
 logger = logging.getLogger('checker')
 logger.setLevel(logging.WARNING)
 formatter = logging.Formatter('Kontrola zadaní - %(name)s - %(levelname)s - %(message)s')
@@ -42,24 +63,33 @@ class ConsoleIssueLogger(IssueLogger):
             self.logger.log(severity, "File %s: %s", issue.file, issue.message)
 
 
-def print_tests():
-    for tst_name, tst in test.all.items():
+def print_tests(manifest):
+    for tst_name, tst in manifest["tests"].items():
         print(tst_name, " - ", tst['doc'])
         print()
 
 
-def parse_markdown(IssueLogger, path_to_files, what):
+def scan_once(path):
+    # Strom ktorý ešte nie je v snapshote oskenujeme, inak sa drží snapshotu zo začiatku behu
+    if not files.covers(path):
+        files.scan(path)
+
+
+def parse_markdown(IssueLogger, path_to_files, what, texts=None):
     VALID_TASK_FILE_NAME = 'prikl*.md'
     things = []
-    if not os.path.isdir(path_to_files):
+    scan_once(path_to_files)
+    if not files.isdir(path_to_files):
         logger.critical("folder '%s' nenájdený alebo nie je folder!", path_to_files)
-    for filename in glob.iglob(os.path.join(path_to_files, VALID_TASK_FILE_NAME)):
-        if os.path.isfile(filename):
+    for filename in files.glob(path_to_files, VALID_TASK_FILE_NAME):
+        if files.isfile(filename):
             logger.debug("Čítam súbor %s", filename)
+            # Text z `texts` (napr. obsah indexu pri --staged) má prednosť pred diskom
+            text = texts.get(os.path.abspath(filename)) if texts else None
             if what == "tasks":
-                thing = Task.parse(IssueLogger("checker.parser.task"), filename)
+                thing = Task.parse(IssueLogger("checker.parser.task"), filename, text)
             elif what == "solutions":
-                thing = Solution.parse(IssueLogger("checker.parser.solution"), filename)
+                thing = Solution.parse(IssueLogger("checker.parser.solution"), filename, text)
 
             if thing is not None:
                 things.append(thing)
@@ -68,54 +98,235 @@ def parse_markdown(IssueLogger, path_to_files, what):
 
 def parse_inputs(IssueLogger, path_to_inputs):
     inputs = []
-    if not os.path.isdir(path_to_inputs):
-        logger.critical("folder '%s' nenájdený alebo nie je folder!", path_to_files)
+    scan_once(path_to_inputs)
+    if not files.isdir(path_to_inputs):
+        logger.critical("folder '%s' nenájdený alebo nie je folder!", path_to_inputs)
     for i in range(1, 9):
         folder = os.path.join(path_to_inputs, str(i))
-        if os.path.isdir(folder):
+        if files.isdir(folder):
             task_inputs = {}
             inputs_folder = os.path.join(folder, 'test')
-            if os.path.isdir(inputs_folder):
-                for inp in os.listdir(inputs_folder):
+            if files.isdir(inputs_folder):
+                for inp in files.listdir(inputs_folder):
                     task_inputs[inp] = os.path.join(inputs_folder, inp)
-            inputs.append(task_inputs)
+            inputs.append(TaskInputs(i, folder, task_inputs))
         else:
             inputs.append(None)
     return inputs
 
 
-def execute_tests(tests, test_data, logger_class, strict):
-    results = {TestResult.SKIP: 0,
-               TestResult.OK: 0,
-               TestResult.WARNING: 0,
-               TestResult.ERROR: 0}
+def run_test(test_name, test, test_data, logger_class, context):
+    # test_data je read-only snapshot (viď freeze_test_data), takže ho testom netreba kopírovať --
+    # pokus o jeho zmenu v teste spadne namiesto toho aby rozbil ostatné testy
+    return test["run"](logger_class('checker.' + test_name), test_data, context)
 
-    for test_name, test in tests.items():
-        logger.debug("Spúšťam test %s", test_name)
 
-        # deepcopy lebo nechceme aby prišiel niekto, v teste zmenil test_data a tak rozbil všetky
-        # ostatné testy
-        status = test["run"](logger_class('checker.' + test_name), copy.deepcopy(test_data))
+def run_test_buffered(test_name, test, test_data, context):
+    buffer = BufferedIssueLogger('checker.' + test_name)
+    return buffer, run_test(test_name, test, test_data, lambda name: buffer, context)
 
-        if status == TestResult.WARNING and strict:
-            status = TestResult.ERROR
 
-        results[status] += 1
+def log_status(test_name, status):
+    if status == TestResult.ERROR:
+        logger.error("Test %s ZLYHAL!", test_name)
+    elif status == TestResult.WARNING:
+        logger.warning("Test %s skončil s varovaním!", test_name)
+    elif status == TestResult.OK:
+        logger.debug("Test %s je ok.", test_name)
+    elif status == TestResult.SKIP:
+        logger.debug("Test %s skippol sám seba", test_name)
+    elif status == TestResult.TIMEOUT:
+        logger.error("Test %s nestihol časový limit!", test_name)
 
-        if status == TestResult.ERROR:
-            logger.error("Test %s ZLYHAL!", test_name)
-        elif status == TestResult.WARNING:
-            logger.warning("Test %s skončil s varovaním!", test_name)
-        elif status == TestResult.OK:
-            logger.debug("Test %s je ok.", test_name)
-        elif status == TestResult.SKIP:
-            logger.debug("Test %s skippol sám seba", test_name)
+
+def execute_tests(tests, test_data, logger_class, strict, jobs=1, incremental=None,
+                  reporters=(), profiler=None, changed=None, shard=None, budget=None, history=None,
+                  fail_fast=False):
+    results = {TestResult.SKIP: 0,
+               TestResult.OK: 0,
+               TestResult.WARNING: 0,
+               TestResult.ERROR: 0,
+               TestResult.TIMEOUT: 0}
+
+    # Výstup ide v stabilnom poradí `order`. Spúšťať sa môže v inom: pri --fail-fast podľa
+    # očakávaného času do zlyhania, pri --jobs podľa critical path z histórie (history_utils.py).
+    order = schedule_order(tests)
+    run_order = order
+    if fail_fast or (jobs > 1 and history is not None):
+        run_order = schedule_order(tests, priority(tests, history or History(), fail_fast))
+    # Pri --fail-fast bežia všetky testy pod spoločným deadline, jeho zrušením sa zabijú procesy
+    # testov ktoré ešte bežia
+    stop = Deadline(None, budget) if fail_fast else budget
+    durations = {}
+    stopped_by = None
+    finished = 0
+
+    def timed_run(test_name, run):
+        start = time.perf_counter()
+        try:
+            return run()
+        finally:
+            durations[test_name] = time.perf_counter() - start
+
+    with RunContext(jobs, incremental, profiler, changed, shard, stop) as context:
+        futures = {}
+        if context.executor is None:
+            def serial_statuses():
+                for test_name in run_order:
+                    logger.debug("Spúšťam test %s", test_name)
+                    yield test_name, timed_run(test_name, lambda: run_test(
+                        test_name, tests[test_name], test_data, logger_class, context))
+            statuses = serial_statuses()
+        else:
+            # Nezávislé vetvy bežia paralelne. Test sa zaradí do poolu až po testoch od ktorých
+            # závisí, takže keď na ne vo workeri čaká, tie už bežia alebo dobehli. Testy logujú do
+            # vlastných bufferov, ktoré prehrávame v rovnakom poradí ako pri sériovom behu.
+            def run_after_dependencies(test_name):
+                for dependency in tests[test_name].get("depends", ()):
+                    if dependency in futures:
+                        futures[dependency].result()
+                return timed_run(test_name, lambda: run_test_buffered(
+                    test_name, tests[test_name], test_data, context))
+
+            run = deadline_utils.inherit(run_after_dependencies)
+            for test_name in run_order:
+                futures[test_name] = context.executor.submit(run, test_name)
+
+            def replayed_statuses():
+                # Pri --fail-fast v poradí v akom testy dobehnú, aby sa prvé zlyhanie ukázalo hneď
+                if fail_fast:
+                    names = {future: test_name for test_name, future in futures.items()}
+                    done = (names[future] for future in concurrent.futures.as_completed(names))
+                else:
+                    done = order
+                for test_name in done:
+                    buffer, status = futures[test_name].result()
+                    logger.debug("Spúšťam test %s", test_name)
+                    buffer.replay(logger_class(buffer.logger_name))
+                    yield test_name, status
+            statuses = replayed_statuses()
+
+        for test_name, status in statuses:
+            if status == TestResult.WARNING and strict:
+                status = TestResult.ERROR
+
+            results[status] += 1
+            finished += 1
+            for reporter in reporters:
+                reporter.logResult(test_name, status)
+            log_status(test_name, status)
+            failed = status in (TestResult.ERROR, TestResult.TIMEOUT)
+            if history is not None:
+                history.record(test_name, durations[test_name], failed)
+            if fail_fast and failed:
+                stopped_by = test_name
+                break
+
+        if stopped_by is not None:
+            stop.cancel()
+            for future in futures.values():
+                future.cancel()
+
+    if stopped_by is not None:
+        logger.error("--fail-fast: po zlyhaní testu %s som zvyšných %i testov nespustil alebo " +
+                     "zrušil, výsledky sú iba za %i dobehnutých", stopped_by,
+                     len(tests) - finished, finished)
+    if history is not None:
+        history.save()
+
+    if incremental is not None:
+        logger.debug("Inkrementálny beh: %i testov / itemov prehraných z uloženého stavu, %i " +
+                     "spustených", incremental.hits, incremental.misses)
+        incremental.save()
 
     return results
 
 
-def execute(args, tests):
+def incremental_state(args):
+    if not args.incremental:
+        return None
+    paths = [os.path.abspath(paths[0]) if paths else ""
+             for paths in (args.path_to_tasks, args.path_to_inputs, args.path_to_solutions)]
+    state_file = args.state_file
+    if state_file is None:
+        if args.no_cache:
+            logger.critical("Inkrementálny beh bez cache potrebuje explicitný --state-file")
+            return None
+        round_id = hashlib.sha1("\0".join(paths).encode('utf-8')).hexdigest()
+        state_file = os.path.join(args.cache_dir, 'incremental-' + round_id + '.json')
+    # Výsledky niektorých testov závisia aj od nastavení, nie iba od súborov
+    config = "\0".join(paths + [str(args.syntax_only), str(args.time_limit),
+                                 str(args.memory_limit), str(args.time_limit_margin)])
+    return IncrementalState(state_file, config)
+
+
+def start_profiler(args):
+    if not args.profile:
+        return None
+    if args.jobs > 1:
+        # Merané čísla sú za celý proces, paralelné testy by sa navzájom zarátali
+        logger.info("S --profile bežia testy sériovo, ignorujem --jobs %i", args.jobs)
+        args.jobs = 1
+    profiler = Profiler(args.profile_dump)
+    profiler.start()
+    return profiler
+
+
+def report_profile(args, profiler):
+    profiler.stop()
+    print(profiler.table())
+    if args.profile_json:
+        profiler.dump_json(args.profile_json)
+
+
+def open_reporters(args, tests):
+    reporters = []
+    if args.json_lines:
+        reporters.append(JsonLinesReporter.open(args.json_lines))
+    if args.sarif:
+        reporters.append(SarifReporter(args.sarif, tests))
+    if args.shard:
+        from shard_utils import ShardReporter
+        reporters.append(ShardReporter(args.shard_output, args.shard))
+    return reporters
+
+
+def archive_path(args):
+    if args.archive is not None:
+        return args.archive
+    if args.no_cache:
+        return None
+    return os.path.join(args.cache_dir, ARCHIVE_FILENAME)
+
+
+def open_archive(args):
+    """Archív minulých kôl pre taskNotInArchive, alebo None (test sa potom skippne)."""
+
+    path = archive_path(args)
+    if path is None:
+        return None
+    if not os.path.isfile(path):
+        logger.debug("Archív %s neexistuje, duplikáty z minulých kôl nehľadám", path)
+        return None
+    from archive_utils import Archive
+    # Archív zo starej verzie checkera nahlási Archive.open sám
+    return Archive.open(path)
+
+
+def open_history(args, changes=None):
+    """História testov z cache. Behy ktoré nespúšťajú všetko ju iba čítajú."""
+
+    if args.no_cache:
+        return None
+    partial = args.incremental or args.shard or (changes is not None and changes.selective)
+    return History(os.path.join(args.cache_dir, HISTORY_FILENAME), readonly=bool(partial))
+
+
+def check_round(args, tests, changes=None):
     logger.debug("Spustím tieto testy: %s", tests.keys())
+    reporters = open_reporters(args, tests)
+    issue_logger_class = tee_logger_class(ConsoleIssueLogger,
+                                          *[reporter.issueLogger for reporter in reporters])
     tasks = None
     inputs = None
     solutions = None
@@ -123,17 +334,33 @@ def execute(args, tests):
     if not (args.path_to_tasks or args.path_to_inputs or args.path_to_solutions):
         logger.warning("Nedal si mi ani zadania, ani vstupy ani vzoráky. Čo mám teda testovať?")
 
+    # Vstupy z generátorov sa vyrobia pred snapshotom, testy už vidia aktuálne súbory. Pri --staged
+    # a --since (pre-commit hook) sa do pracovného stromu nezapisuje, kontrolujú sa vstupy ako sú.
+    if args.path_to_inputs and not (args.no_generate or args.staged or args.since):
+        from generator_utils import generate_round
+        token = deadline_utils.current.set(args.budget)
+        try:
+            generate_round(args.path_to_inputs[0])
+        finally:
+            deadline_utils.current.reset(token)
+
+    # Jeden snapshot súborov kola pre parsery aj testy
+    files.scan(*[paths[0] for paths in (args.path_to_tasks, args.path_to_inputs,
+                                        args.path_to_solutions) if paths])
+
     if args.path_to_tasks:
         logger.debug("Spúšťam testy na zadaniach z '%s'", args.path_to_tasks[0])
-        tasks = parse_markdown(ConsoleIssueLogger, args.path_to_tasks[0], "tasks")
+        tasks = parse_markdown(issue_logger_class, args.path_to_tasks[0], "tasks",
+                               changes and changes.texts)
 
     if args.path_to_inputs:
         logger.debug("Spúšťam testy na vstupoch z '%s'", args.path_to_inputs[0])
-        inputs = parse_inputs(ConsoleIssueLogger, args.path_to_inputs[0])
+        inputs = parse_inputs(issue_logger_class, args.path_to_inputs[0])
 
     if args.path_to_solutions:
         logger.debug("Spúšťam testy na vzorákoch z '%s'", args.path_to_solutions[0])
-        solutions = parse_markdown(ConsoleIssueLogger, args.path_to_solutions[0], "solutions")
+        solutions = parse_markdown(issue_logger_class, args.path_to_solutions[0], "solutions",
+                                   changes and changes.texts)
 
     test_data = {"path_to_tasks": args.path_to_tasks[0] if args.path_to_tasks is not None else None,
                  "path_to_solutions": (args.path_to_solutions[0]
@@ -142,20 +369,41 @@ def execute(args, tests):
                                     if args.path_to_inputs is not None else None),
                  "tasks": tasks,
                  "solutions": solutions,
-                 "inputs": inputs}
+                 "inputs": inputs,
+                 "files": files,
+                 "archive": open_archive(args) if args.path_to_tasks else None}
+    # Zo zoznamov urobíme read-only snapshot, ktorý testy zdieľajú
+    test_data = freeze_test_data(test_data)
+
+    profiler = start_profiler(args)
+    changed = changes.paths if changes is not None and changes.selective else None
+    results = execute_tests(tests, test_data, issue_logger_class, args.strict, args.jobs,
+                            incremental_state(args), reporters, profiler, changed, args.shard,
+                            args.budget, open_history(args, changes), args.fail_fast)
+    for reporter in reporters:
+        reporter.close(results)
+    if test_data["archive"] is not None:
+        test_data["archive"].close()
+    if profiler is not None:
+        report_profile(args, profiler)
+    return results
 
-    results = execute_tests(tests, test_data, ConsoleIssueLogger, args.strict)
 
+def summarize(results):
     logger.info("Done\n\n")
 
     logger.info("Výsledky: OK      - %i", results[TestResult.OK])
     logger.info("          SKIP    - %i", results[TestResult.SKIP])
     logger.info("          WARNING - %i", results[TestResult.WARNING])
     logger.info("          ERROR   - %i", results[TestResult.ERROR])
+    logger.info("          TIMEOUT - %i", results[TestResult.TIMEOUT])
 
     if results[TestResult.ERROR] != 0:
         logger.critical("Celé zle. Zlyhalo %i testov!", results[TestResult.ERROR])
         return 1
+    elif results[TestResult.TIMEOUT] != 0:
+        logger.critical("%i testov nestihlo časový limit!", results[TestResult.TIMEOUT])
+        return 1
     elif results[TestResult.WARNING] != 0:
         logger.warning("Testy zbehli ok, ale bolo %i warningov!", results[TestResult.WARNING])
         return 0
@@ -164,7 +412,246 @@ def execute(args, tests):
         return 0
 
 
-def main():
+def changed_files(args):
+    """Pri --staged / --since zistí z gitu zmenené súbory kola. Vráti dvojicu (Changes alebo None,
+    či zlyhal git)."""
+
+    if not (args.staged or args.since):
+        return None, False
+    folders = [paths[0] for paths in (args.path_to_tasks, args.path_to_inputs,
+                                      args.path_to_solutions) if paths]
+    if not folders:
+        return None, False
+    from git_utils import GitError, round_changes
+    try:
+        changes = round_changes(folders, args.staged, args.since)
+    except GitError as error:
+        logger.critical("Nepodarilo sa zistiť zmeny z gitu: %s", error)
+        return None, True
+    if not changes.selective:
+        logger.info("Niektorý súbor kola bol zmazaný, kontrolujem celé kolo")
+    return changes, False
+
+
+def execute(args, tests):
+    changes, failed = changed_files(args)
+    if failed:
+        return 1
+    if changes is not None and not changes.paths:
+        logger.info("V kole sa nič nezmenilo, nie je čo kontrolovať")
+        return 0
+    return summarize(check_round(args, tests, changes))
+
+
+def check_buffered_round(args, tests, round_directory, handler):
+    from batch_utils import round_paths
+    round_args = argparse.Namespace(**vars(args))
+    for key, paths in round_paths(round_directory).items():
+        setattr(round_args, key, paths)
+    handler.start_buffering()
+    try:
+        results = check_round(round_args, tests)
+        return_code = summarize(results)
+    except Exception:
+        # Jedno rozbité kolo nesmie zhodiť ostatné
+        logger.exception("Kontrola kola %s spadla", round_directory)
+        results, return_code = None, 1
+    return handler.stop_buffering(), results, return_code
+
+
+def batch(args, tests):
+    if args.json_lines or args.sarif or args.profile or args.staged or args.since or args.shard:
+        logger.critical("--json-lines, --sarif, --profile, --staged, --since a --shard sa s " +
+                        "--batch nedajú použiť")
+        return 1
+    from batch_utils import find_rounds, RoundBufferHandler
+    rounds = find_rounds(args.batch)
+    if not rounds:
+        logger.critical("Nenašiel som žiadne kolo na kontrolu")
+        return 1
+
+    # Kolá bežia paralelne, toolchain (aj zistené verzie compilerov), cache a scanner zdieľajú.
+    # Výstup každého kola sa vypíše naraz, v poradí kôl.
+    handler = RoundBufferHandler(stream_handler)
+    logger.removeHandler(stream_handler)
+    logger.addHandler(handler)
+    summary = []
+    try:
+        with ThreadPoolExecutor(max(1, args.batch_jobs),
+                                thread_name_prefix='checker-round') as executor:
+            futures = [(round_directory,
+                        executor.submit(check_buffered_round, args, tests, round_directory,
+                                        handler))
+                       for round_directory in rounds]
+            for round_directory, future in futures:
+                records, results, return_code = future.result()
+                sys.stderr.write("===== Kolo {0} =====\n".format(round_directory))
+                sys.stderr.flush()
+                handler.replay(records)
+                summary.append((round_directory, results, return_code))
+    finally:
+        logger.removeHandler(handler)
+        logger.addHandler(stream_handler)
+
+    totals = {status: 0 for status in TestResult}
+    print("{0:40} {1:>6} {2:>6} {3:>8} {4:>6} {5:>8}".format("kolo", "OK", "SKIP", "WARNING",
+                                                            "ERROR", "TIMEOUT"))
+    for round_directory, results, return_code in summary:
+        if results is None:
+            print("{0:40} {1:>38}".format(round_directory, "SPADLO"))
+            continue
+        for status, count in results.items():
+            totals[status] += count
+        print("{0:40} {1:6} {2:6} {3:8} {4:6} {5:8}".format(
+            round_directory, results[TestResult.OK], results[TestResult.SKIP],
+            results[TestResult.WARNING], results[TestResult.ERROR], results[TestResult.TIMEOUT]))
+    print("{0:40} {1:6} {2:6} {3:8} {4:6} {5:8}".format(
+        "spolu", totals[TestResult.OK], totals[TestResult.SKIP], totals[TestResult.WARNING],
+        totals[TestResult.ERROR], totals[TestResult.TIMEOUT]))
+
+    failed = [round_directory for round_directory, _, return_code in summary if return_code != 0]
+    if failed:
+        logger.critical("Zlyhalo %i z %i kôl!", len(failed), len(summary))
+        return 1
+    return 0
+
+
+def calibrate(args):
+    first = lambda paths: paths[0] if paths else None
+    if not (args.path_to_solutions and args.path_to_inputs):
+        logger.critical("Na kalibráciu potrebujem vzoráky aj vstupy")
+        return 1
+    test_data = {"path_to_tasks": first(args.path_to_tasks),
+                 "path_to_solutions": first(args.path_to_solutions),
+                 "path_to_inputs": first(args.path_to_inputs),
+                 "tasks": (parse_markdown(ConsoleIssueLogger, args.path_to_tasks[0], "tasks")
+                           if args.path_to_tasks else None),
+                 "solutions": parse_markdown(ConsoleIssueLogger, args.path_to_solutions[0],
+                                             "solutions"),
+                 "inputs": parse_inputs(ConsoleIssueLogger, args.path_to_inputs[0]),
+                 "files": files}
+    test_data = freeze_test_data(test_data)
+
+    # Kalibrácia nepotrebuje ostatné testy, stačí jej modul so spúšťaním riešení
+    from tests_execution import timing_reports
+    reports = timing_reports(test_data)
+    for _, _, report in reports:
+        print(report.table())
+        print()
+    if args.calibrate_json:
+        dump_reports([report for _, _, report in reports], args.calibrate_json)
+
+    # Pre CI: zlyhá ak niektorý listing padá, alebo s rezervou nestíha limit úlohy
+    failed = 0
+    for task, _, report in reports:
+        for measurement in report.measurements:
+            limit = task.time_limit_for(measurement.language) if task is not None else None
+            if not measurement.ok or (limit is not None and
+                                      measurement.max * report.margin > limit):
+                logger.error("Listing %s na vstupe %s: %s, max %.3f s, limit %s",
+                             measurement.listing_filename, measurement.input_filename,
+                             measurement.status, measurement.max, limit)
+                failed += 1
+    return 1 if failed else 0
+
+
+def merge(argv):
+    argumentParser = argparse.ArgumentParser(prog="check.py merge",
+                                             description="Spojí výsledky shardov (--shard) do " +
+                                                         "jedného, ako keby bežal celý check")
+    argumentParser.add_argument('partials', nargs='+', metavar="PARTIAL",
+                                help="Súbory z --shard-output všetkých shardov")
+    argumentParser.add_argument('-v', action="count", dest="verbosity",
+                                help="Viac sa vykecávaj (-vv kecá ešte viac)")
+    args = argumentParser.parse_args(argv)
+    set_verbosity(args.verbosity)
+
+    from shard_utils import ShardError, merge_partials, SEVERITY_ORDER
+    try:
+        issues, statuses = merge_partials(args.partials)
+    except (ShardError, OSError, ValueError) as error:
+        logger.critical("Výsledky shardov sa nedajú spojiť: %s", error)
+        return 1
+
+    for record in issues:
+        ConsoleIssueLogger('checker.' + record["test"]).logIssue(
+            logging.getLevelName(record["severity"]),
+            Issue(record["message"], record["file"], record["line"]))
+    results = {status: 0 for status in SEVERITY_ORDER}
+    for test_name, status in statuses.items():
+        results[status] += 1
+        log_status(test_name, status)
+    return summarize(results)
+
+
+def archive(argv):
+    argumentParser = argparse.ArgumentParser(prog="check.py archive",
+                                             description="Zaindexuje zadania a vzoráky kôl do " +
+                                                         "archívu, v ktorom taskNotInArchive " +
+                                                         "hľadá mená a texty z minulých kôl")
+    argumentParser.add_argument('rounds', nargs='+', metavar="ROUND",
+                                help="Foldre kôl (so zadania/ a vzoraky/), globy alebo " +
+                                     "manifesty ako pri --batch")
+    argumentParser.add_argument('--archive', dest="archive", metavar="FILE",
+                                help="Súbor archívu (default: " + ARCHIVE_FILENAME +
+                                     " v --cache-dir)")
+    argumentParser.add_argument('--cache-dir', dest="cache_dir", metavar="DIR",
+                                default=cache_utils.default_cache_dir(),
+                                help="Cache checkera (default: %(default)s)")
+    argumentParser.add_argument('-v', action="count", dest="verbosity",
+                                help="Viac sa vykecávaj (-vv kecá ešte viac)")
+    args = argumentParser.parse_args(argv)
+    set_verbosity(args.verbosity)
+    args.no_cache = False
+
+    from archive_utils import Archive
+    from batch_utils import find_rounds
+    rounds = find_rounds(args.rounds)
+    if not rounds:
+        logger.critical("Nenašiel som žiadne kolo na zaindexovanie")
+        return 1
+    index = Archive(archive_path(args))
+    try:
+        for round_directory in rounds:
+            added, unchanged, removed = index.update(round_directory)
+            logger.info("%s: %i nových / zmenených, %i bez zmeny, %i zmazaných", round_directory,
+                        added, unchanged, removed)
+    finally:
+        index.close()
+    return 0
+
+
+def serve(args, tests):
+    from lsp_server import LanguageServer
+    first = lambda paths: paths[0] if paths else None
+    server = LanguageServer(tests, first(args.path_to_tasks), first(args.path_to_inputs),
+                            first(args.path_to_solutions), parse_inputs, args.jobs)
+    return server.serve()
+
+
+def start(args, tests):
+    try:
+        if args.lsp:
+            return serve(args, tests)
+        if args.batch:
+            return batch(args, tests)
+        if args.calibrate:
+            return calibrate(args)
+        return execute(args, tests)
+    finally:
+        # Binárky z toolchain.build zmažeme hneď, nie až pri garbage collection
+        toolchain.shutdown()
+
+
+def set_verbosity(verbosity):
+    if verbosity:
+        if verbosity == 1:
+            logger.setLevel(logging.INFO)
+        if verbosity > 1:
+            logger.setLevel(logging.DEBUG)
+
+
+def argument_parser():
     argumentParser = argparse.ArgumentParser(description="Checker KSP zadaní")
     argumentParser.add_argument('--tasks', nargs=1, dest='path_to_tasks',
                                 help="Cesta k foldru so zadaniamu")
@@ -176,47 +663,176 @@ def main():
                                 help="Iba vypíš aké testy poznáš a skonči")
     argumentParser.add_argument('--strict', action="store_true", dest="strict",
                                 help="Správaj sa k warningom ako k chybám")
+    argumentParser.add_argument('-j', '--jobs', type=int, default=1, dest="jobs", metavar="N",
+                                help="Spúšťaj nezávislé testy a ich itemy paralelne na N vláknach")
+    argumentParser.add_argument('-i', '--incremental', action="store_true", dest="incremental",
+                                help="Spúšťaj iba testy, ktorých súbory sa od minulého behu " +
+                                     "zmenili, ostatným iba zopakuj výsledky")
+    argumentParser.add_argument('--state-file', dest="state_file", metavar="FILE",
+                                help="Kde držať stav pre --incremental (default: v cache)")
+    argumentParser.add_argument('--staged', action="store_true", dest="staged",
+                                help="Pre pre-commit hook: spusti iba testy a itemy ktoré čítajú " +
+                                     "súbory zmenené v git indexe, zadania a vzoráky čítaj " +
+                                     "z indexu")
+    argumentParser.add_argument('--since', dest="since", metavar="REF",
+                                help="Spusti iba testy a itemy ktoré čítajú súbory zmenené od " +
+                                     "revízie REF")
+    argumentParser.add_argument('--compile-jobs', type=int, dest="compile_jobs", metavar="N",
+                                help="Koľko listingov kompilovať naraz (default: počet jadier)")
+    argumentParser.add_argument('--syntax-only', action="store_true", dest="syntax_only",
+                                help="Listingy iba syntakticky skontroluj (g++ -fsyntax-only), " +
+                                     "nelinkuj ich")
+    argumentParser.add_argument('--run-jobs', type=int, dest="run_jobs", metavar="N",
+                                help="Koľko behov vzorákov na vstupoch púšťať naraz " +
+                                     "(default: počet jadier)")
+    argumentParser.add_argument('--time-limit', type=float, dest="time_limit", metavar="S",
+                                default=10.0,
+                                help="Limit CPU času jedného behu vzoráku (default: %(default)s)")
+    argumentParser.add_argument('--memory-limit', type=int, dest="memory_limit", metavar="MB",
+                                default=1024,
+                                help="Limit pamäte jedného behu vzoráku (default: %(default)s)")
+    argumentParser.add_argument('--calibrate', action="store_true", dest="calibrate",
+                                help="Namiesto testov zmeraj listingy vzorákov na vstupoch, " +
+                                     "vypíš report a navrhni časové limity")
+    argumentParser.add_argument('--calibrate-json', dest="calibrate_json", metavar="FILE",
+                                help="Report kalibrácie zapíš aj do JSON súboru")
+    argumentParser.add_argument('--calibrate-runs', type=int, dest="calibrate_runs", metavar="N",
+                                default=timing_utils.DEFAULT_RUNS,
+                                help="Koľkokrát merať každý listing na každom vstupe " +
+                                     "(default: %(default)s)")
+    argumentParser.add_argument('--calibrate-warmup', type=int, dest="calibrate_warmup",
+                                metavar="N", default=timing_utils.DEFAULT_WARMUP,
+                                help="Koľko behov pred meraním zahodiť (default: %(default)s)")
+    argumentParser.add_argument('--calibrate-cpu', type=int, dest="calibrate_cpu", metavar="CPU",
+                                help="Na ktoré jadro pripnúť merané behy (default: posledné)")
+    argumentParser.add_argument('--time-limit-margin', type=float, dest="time_limit_margin",
+                                metavar="X", default=timing_utils.DEFAULT_MARGIN,
+                                help="Koľkokrát musí byť %%timelimit väčší ako najhorší " +
+                                     "nameraný čas (default: %(default)s)")
+    argumentParser.add_argument('--cache-dir', dest="cache_dir", metavar="DIR",
+                                default=cache_utils.default_cache_dir(),
+                                help="Kde držať cache výsledkov kompilácie (default: %(default)s)")
+    argumentParser.add_argument('--cache-size', type=int, dest="cache_size", metavar="MB",
+                                default=cache_utils.DEFAULT_MAX_SIZE // (1024 * 1024),
+                                help="Maximálna veľkosť cache v MB (default: %(default)s)")
+    argumentParser.add_argument('--no-cache', action="store_true", dest="no_cache",
+                                help="Nepoužívaj cache, všetko rob odznova")
+    argumentParser.add_argument('--archive', dest="archive", metavar="FILE",
+                                help="Archív minulých kôl z `check.py archive` (default: " +
+                                     ARCHIVE_FILENAME + " v --cache-dir, pri --no-cache žiadny)")
     argumentParser.add_argument('-s', '--skip', nargs='*', dest="skip", metavar="test",
                                 help="Preskoč tieto testy")
     argumentParser.add_argument('-r', '--run-only', nargs='*', dest="runonly", metavar="test",
                                 help="spusti IBA tieto testy. Overridne --skip")
+    argumentParser.add_argument('--json-lines', dest="json_lines", metavar="FILE",
+                                help="Priebežne zapisuj issues a výsledky testov ako JSON Lines " +
+                                     "('-' je stdout)")
+    argumentParser.add_argument('--sarif', dest="sarif", metavar="FILE",
+                                help="Na konci zapíš report vo formáte SARIF 2.1.0")
+    argumentParser.add_argument('--profile', action="store_true", dest="profile",
+                                help="Odmeraj každý test (čas, CPU, čítanie, procesy, pamäť) a " +
+                                     "na konci vypíš tabuľku")
+    argumentParser.add_argument('--profile-json', dest="profile_json", metavar="FILE",
+                                help="Výsledky --profile zapíš aj do JSON súboru")
+    argumentParser.add_argument('--profile-dump', dest="profile_dump", metavar="DIR",
+                                help="Pre každý test ulož cProfile dump (DIR/<test>.pstats)")
+    argumentParser.add_argument('--no-generate', action="store_true", dest="no_generate",
+                                help="Negeneruj vstupy zo súborov `generators`, kontroluj iba " +
+                                     "to čo je v test/")
+    argumentParser.add_argument('--fail-fast', action="store_true", dest="fail_fast",
+                                help="Skonči pri prvom zlyhanom teste (rozbehnuté testy sa " +
+                                     "zrušia). Testy idú v poradí podľa toho, ktorý z histórie " +
+                                     "najskôr odhalí chybu")
+    argumentParser.add_argument('--time-budget', type=float, dest="time_budget", metavar="SEC",
+                                help="Časový rozpočet na celý beh. Testy ktoré ho nestihnú sa " +
+                                     "zrušia (aj s procesmi) a skončia ako TIMEOUT")
+    argumentParser.add_argument('--shard', type=shard_argument, dest="shard", metavar="i/N",
+                                help="Sprav iba i-tu z N častí práce (rozdelenie podľa hashu " +
+                                     "testov a itemov), výsledky potom spojí `check.py merge`")
+    argumentParser.add_argument('--shard-output', dest="shard_output", metavar="FILE",
+                                help="Kam zapísať čiastočný výsledok shardu (JSON Lines)")
+    argumentParser.add_argument('--batch', nargs='+', dest="batch", metavar="ROUND",
+                                help="Skontroluj naraz veľa kôl. ROUND je foldr kola (so " +
+                                     "zadania/, vstupy/, vzoraky/), glob alebo manifest (súbor " +
+                                     "s foldrom kola na každom riadku)")
+    argumentParser.add_argument('--batch-jobs', type=int, dest="batch_jobs", metavar="N",
+                                default=os.cpu_count() or 1,
+                                help="Koľko kôl kontrolovať naraz (default: počet jadier)")
+    argumentParser.add_argument('--lsp', action="store_true", dest="lsp",
+                                help="Bež ako language server (LSP cez stdin/stdout) pre editory")
     argumentParser.add_argument('-v', action="count", dest="verbosity",
                                 help="Viac sa vykecávaj (-vv kecá ešte viac)")
-    args = argumentParser.parse_args()
+    return argumentParser
+
 
+def parse_arguments(argv=None):
+    """Argumenty checkera (default sys.argv) aj s hodnotami odvodenými z nich."""
+
+    args = argument_parser().parse_args(argv)
+
+    if args.profile_json or args.profile_dump:
+        args.profile = True
+
+    # Rozpočet času beží od štartu, pri --batch je jeden spoločný pre všetky kolá
+    args.budget = Deadline(args.time_budget) if args.time_budget is not None else None
+    return args
+
+
+def main():
+    # `check.py merge ...` a `check.py archive ...` sú samostatné príkazy s vlastnými argumentmi
+    if sys.argv[1:2] == ['merge']:
+        return merge(sys.argv[2:])
+    if sys.argv[1:2] == ['archive']:
+        return archive(sys.argv[2:])
+
+    args = parse_arguments()
+
+    manifest = load_manifest()
     if args.print_only:
-        print_tests()
+        print_tests(manifest)
         return 0
 
-    if args.verbosity:
-        if args.verbosity == 1:
-            logger.setLevel(logging.INFO)
-        if args.verbosity > 1:
-            logger.setLevel(logging.DEBUG)
+    set_verbosity(args.verbosity)
+
+    if args.shard and not args.shard_output:
+        logger.critical("--shard potrebuje --shard-output, kam zapísať čiastočný výsledok")
+        return 1
+
+    cache_utils.configure(None if args.no_cache else args.cache_dir, args.cache_size * 1024 * 1024)
+    toolchain.configure(args.compile_jobs, args.syntax_only)
+    runner.configure(args.run_jobs, Limits(args.time_limit, args.memory_limit * 1024 * 1024))
+    calibrator.configure(args.calibrate_runs, args.calibrate_warmup, args.calibrate_cpu,
+                         args.time_limit_margin)
+
+    try:
+        schedule_order(manifest["tests"])
+    except ValueError as error:
+        logger.critical("%s", error)
+        return 1
 
     if args.runonly:
         # Check či testy vôbec existujú
-        tests_to_run = dict()
+        tests_to_run = []
         for tst_name in args.runonly:
-            if tst_name not in test.all:
+            if tst_name not in manifest["tests"]:
                 logger.critical("Bol requestnutý beh testu %s, ale ten neexistuje.", tst_name)
                 return 1
-            tests_to_run[tst_name] = test.all[tst_name]
-        return execute(args, tests_to_run)
+            tests_to_run.append(tst_name)
+        return start(args, import_tests(tests_to_run, manifest))
 
     if args.skip:
         # Ak nejaký test neexistuje a chceme ho skipnúť je to asi chyba / typo
         # a test čo nemá by bežal. Umrime radšej.
-        tests_to_run = dict(test.all)
+        tests_to_run = list(manifest["tests"])
         for tst_name in args.skip:
-            if tst_name not in test.all:
+            if tst_name not in manifest["tests"]:
                 logger.critical("Bolo requestnuté skipnutie testu %s, ale tento neexistuje.",
                                 tst_name)
                 return 1
-            del tests_to_run[tst_name]
-        return execute(args, tests_to_run)
+            tests_to_run.remove(tst_name)
+        return start(args, import_tests(tests_to_run, manifest))
 
-    return execute(args, dict(test.all))
+    return start(args, import_tests(list(manifest["tests"]), manifest))
 
 if __name__ == "__main__":
     sys.exit(main())
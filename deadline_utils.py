@@ -0,0 +1,165 @@
+import os
+import time
+import signal
+import threading
+import contextlib
+import contextvars
+import subprocess
+
+# Deadline testu / itemu ktorý práve beží v tomto vlákne (alebo pre ktorý pracuje worker poolu)
+current = contextvars.ContextVar('deadline', default=None)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def kill_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+# Časový limit testu, itemu alebo celého behu (--time-budget). Deadline dieťaťa nikdy nie je
+# neskôr ako deadline rodiča. Procesy spustené pod deadline sa v ňom (aj v jeho predkoch) evidujú,
+# takže zrušenie deadline zabije všetko čo test spustil, aj cez pooly toolchainu a runnera.
+class Deadline():
+    def __init__(self, seconds=None, parent=None):
+        self.parent = parent
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds if seconds is not None else None
+        if parent is not None and parent.expires is not None:
+            self.expires = (parent.expires if self.expires is None
+                            else min(self.expires, parent.expires))
+        self.cancelled = False
+        self.processes = set()
+        self.lock = threading.Lock()
+
+    def remaining(self):
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self):
+        deadline = self
+        while deadline is not None:
+            if deadline.cancelled:
+                return True
+            deadline = deadline.parent
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def chain(self):
+        deadline = self
+        while deadline is not None:
+            yield deadline
+            deadline = deadline.parent
+
+    def add(self, process):
+        with self.lock:
+            self.processes.add(process)
+            cancelled = self.cancelled
+        if cancelled:
+            kill_group(process)
+
+    def discard(self, process):
+        with self.lock:
+            self.processes.discard(process)
+
+    def cancel(self):
+        """Zruší deadline a zabije procesy ktoré pod ním bežia."""
+
+        with self.lock:
+            self.cancelled = True
+            processes = list(self.processes)
+        for process in processes:
+            kill_group(process)
+
+
+def check():
+    """Vyhodí DeadlineExceeded ak deadline aktuálneho testu / itemu už vypršal."""
+
+    deadline = current.get()
+    if deadline is not None and deadline.expired:
+        raise DeadlineExceeded()
+
+
+def remaining():
+    deadline = current.get()
+    return deadline.remaining() if deadline is not None else None
+
+
+@contextlib.contextmanager
+def tracked(process):
+    """Eviduje proces (spustený so start_new_session) v deadlinoch aktuálneho testu."""
+
+    deadline = current.get()
+    chain = list(deadline.chain()) if deadline is not None else []
+    for link in chain:
+        link.add(process)
+    try:
+        yield
+    finally:
+        for link in chain:
+            link.discard(process)
+
+
+def run_process(command, stdout=subprocess.PIPE, stderr=None, **kwargs):
+    """Spustí proces a počká na neho najviac do deadline. Vráti (návratový kód, stdout). Pri
+    vypršaní deadline zabije celú skupinu procesov a vyhodí DeadlineExceeded."""
+
+    check()
+    process = subprocess.Popen(command, stdout=stdout, stderr=stderr, start_new_session=True,
+                               **kwargs)
+    with tracked(process):
+        try:
+            output, _ = process.communicate(timeout=remaining())
+        except subprocess.TimeoutExpired:
+            kill_group(process)
+            process.communicate()
+            raise DeadlineExceeded()
+    # Proces mohol zabiť aj cancel() z iného vlákna, vtedy jeho výsledok neplatí
+    check()
+    return process.returncode, output
+
+
+def inherit(function):
+    """Obalí funkciu pre pool tak, aby worker pracoval v kontexte volajúceho vlákna: pod jeho
+    deadline a pri --batch s jeho kolom (viď batch_utils.round_records)."""
+
+    context = contextvars.copy_context()
+
+    def run(*args):
+        # Jeden kontext nemôžu naraz používať dve vlákna, každé volanie dostane kópiu
+        return context.copy().run(function, *args)
+    return run
+
+
+def run_with_deadline(deadline, function):
+    """Spustí function() vo vlastnom vlákne pod deadline. Vráti (dobehla, výsledok).
+
+    Ak nestihne, deadline sa zruší (procesy sa zabijú) a vlákno sa nechá dobehnúť samo -- Python
+    vlákno zabiť nevie, bez svojich procesov ale skončí rýchlo a jeho výsledok sa zahodí."""
+
+    outcome = {}
+
+    def target():
+        current.set(deadline)
+        try:
+            outcome["result"] = function()
+        except BaseException as error:
+            outcome["error"] = error
+
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(target,),
+                              name='checker-deadline', daemon=True)
+    thread.start()
+    thread.join(deadline.remaining())
+    if thread.is_alive():
+        deadline.cancel()
+        return False, None
+    if "error" in outcome:
+        if isinstance(outcome["error"], DeadlineExceeded):
+            return False, None
+        raise outcome["error"]
+    return True, outcome["result"]
@@ -0,0 +1,338 @@
+import re
+
+try:
+    import numpy
+except ImportError:  # Bez numpy kontrolujeme rozsahy cez map/min/max, je to pomalšie
+    numpy = None
+
+# Meno súboru s formátom vstupu, leží vo foldri úlohy vedľa foldra `test`
+FORMAT_FILENAME = 'format'
+
+# Po koľkých bajtoch čítame vstup
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Koľko opakovaných riadkov kontrolujeme naraz
+BATCH_LINES = 64 * 1024
+
+TOKENS = {"int": rb'-?(?:0|[1-9][0-9]*)',
+          "float": rb'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?',
+          "str": rb'[!-~]+'}
+
+TOKEN_SPEC = re.compile(r'(?P<name>[A-Za-z_]\w*):(?P<type>int|float|str)'
+                        r'(?:\[(?P<low>[^,\]]*),(?P<high>[^\]]*)\])?(?:\*(?P<count>\w+))?$')
+NUMBER = re.compile(r'(-?)(\d+)(?:\^(\d+))?$')
+NAME = re.compile(r'[A-Za-z_]\w*$')
+
+
+class FormatError(Exception):
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+
+def parse_value(text, line):
+    """Hranica rozsahu alebo počet: číslo (aj `10^9`, `1e9`, `0.5`) alebo meno premennej."""
+
+    text = text.strip()
+    if NAME.match(text):
+        return text
+    number = NUMBER.match(text)
+    if number:
+        sign = -1 if number.group(1) else 1
+        value = int(number.group(2))
+        if number.group(3):
+            value **= int(number.group(3))
+        return sign * value
+    try:
+        value = float(text)
+    except ValueError:
+        raise FormatError("Neplatné číslo '{0}'".format(text), line)
+    return int(value) if value.is_integer() and 'e' in text.lower() else value
+
+
+def resolve(value, variables, line):
+    if isinstance(value, str):
+        if value not in variables:
+            raise FormatError("Premenná {0} ešte nemá hodnotu".format(value), line)
+        return variables[value]
+    return value
+
+
+# Jeden token (alebo `count` rovnakých tokenov) v riadku, napr. `a:int[1,10^9]*n`
+class Token():
+    def __init__(self, name, kind, low, high, count):
+        self.name = name
+        self.kind = kind
+        self.low = low
+        self.high = high
+        self.count = count
+
+
+# Jeden riadok vstupu zložený z tokenov oddelených jednou medzerou
+class Line():
+    def __init__(self, tokens, text, line):
+        self.tokens = tokens
+        self.text = text
+        self.line = line
+
+    def pattern(self, counts):
+        parts = []
+        for token, count in zip(self.tokens, counts):
+            if count == 1:
+                parts.append(TOKENS[token.kind])
+            elif count > 1:
+                parts.append(TOKENS[token.kind] + rb'(?: ' + TOKENS[token.kind] +
+                             rb'){' + str(count - 1).encode('ascii') + rb'}')
+        return b' '.join(parts)
+
+
+# Blok riadkov ktorý sa opakuje `count` krát
+class Repeat():
+    def __init__(self, count, body, line):
+        self.count = count
+        self.body = body
+        self.line = line
+
+
+def parse_format(text):
+    """Sparsuje formát vstupu, vráti zoznam príkazov (Line / Repeat).
+
+    Každý riadok formátu opisuje jeden riadok vstupu, tokeny sú `meno:typ[od,do]`, za tokenom
+    môže byť `*počet`. `repeat počet` ... `end` opakuje blok riadkov. `#` je komentár."""
+
+    program = []
+    stack = []
+    for number, text_line in enumerate(text.splitlines(), 1):
+        text_line = text_line.split('#', 1)[0].strip()
+        if not text_line:
+            continue
+        words = text_line.split()
+        if words[0] == 'repeat':
+            if len(words) != 2:
+                raise FormatError("repeat potrebuje práve jeden počet", number)
+            stack.append((program, Repeat(parse_value(words[1], number), [], number)))
+            program = stack[-1][1].body
+            continue
+        if words[0] == 'end':
+            if not stack or len(words) != 1:
+                raise FormatError("end bez repeat", number)
+            outer, repeat = stack.pop()
+            outer.append(repeat)
+            program = outer
+            continue
+
+        tokens = []
+        for word in words:
+            spec = TOKEN_SPEC.match(word)
+            if not spec:
+                raise FormatError("Nerozumiem tokenu '{0}'".format(word), number)
+            low = parse_value(spec.group('low'), number) if spec.group('low') else None
+            high = parse_value(spec.group('high'), number) if spec.group('high') else None
+            count = parse_value(spec.group('count'), number) if spec.group('count') else 1
+            tokens.append(Token(spec.group('name'), spec.group('type'), low, high, count))
+        program.append(Line(tokens, text_line, number))
+    if stack:
+        raise FormatError("repeat bez end", stack[-1][1].line)
+    return program
+
+
+def load_format(path):
+    with open(path, encoding='utf-8') as format_file:
+        return parse_format(format_file.read())
+
+
+# Číta vstup po veľkých blokoch a vydáva ho po dávkach celých riadkov
+class LineReader():
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = b''
+        self.newlines = 0
+        self.eof = False
+        self.lines_read = 0
+
+    def fill(self, lines):
+        while self.newlines < lines and not self.eof:
+            chunk = self.stream.read(CHUNK_SIZE)
+            if not chunk:
+                self.eof = True
+                # Neukončený posledný riadok je tiež riadok (chýbajúci newline hlási iný test)
+                if self.buffer and not self.buffer.endswith(b'\n'):
+                    self.buffer += b'\n'
+                    self.newlines += 1
+                break
+            self.buffer += chunk
+            self.newlines += chunk.count(b'\n')
+
+    def take(self, lines):
+        """Vráti (blok najviac `lines` riadkov, každý ukončený '\\n'; počet riadkov v bloku)."""
+
+        self.fill(lines)
+        if self.newlines <= lines:
+            cut = self.buffer.rfind(b'\n') + 1
+            taken = self.newlines
+        else:
+            cut = len(self.buffer) - len(self.buffer.split(b'\n', lines)[-1])
+            taken = lines
+        block = self.buffer[:cut]
+        self.buffer = self.buffer[cut:]
+        self.newlines -= taken
+        self.lines_read += taken
+        return block, taken
+
+    def at_end(self):
+        self.fill(1)
+        return not self.buffer
+
+
+# Štatistiky jedného vstupu zbierané počas kontroly
+class InputStats():
+    def __init__(self, filename):
+        self.filename = filename
+        self.lines = 0
+        self.tokens = 0
+        self.ranges = {}
+
+    def add(self, name, low, high):
+        if name in self.ranges:
+            old_low, old_high = self.ranges[name]
+            low, high = min(low, old_low), max(high, old_high)
+        self.ranges[name] = (low, high)
+
+    def __str__(self):
+        ranges = ", ".join("{0}=[{1}, {2}]".format(name, low, high)
+                           for name, (low, high) in self.ranges.items())
+        return "{0} riadkov, {1} tokenov{2}".format(self.lines, self.tokens,
+                                                    "; " + ranges if ranges else "")
+
+
+def convert(values, kind):
+    """Skonvertuje tokeny (bytes) na čísla; s numpy naraz celé pole."""
+
+    if kind == "str":
+        return list(map(len, values))
+    if numpy is not None:
+        try:
+            return numpy.array(values, dtype=bytes).astype(numpy.int64 if kind == "int"
+                                                           else numpy.float64)
+        except (ValueError, OverflowError):
+            # Mimo int64, zvládnu to Pythonovské inty
+            pass
+    return list(map(int if kind == "int" else float, values))
+
+
+def first_outside(values, low, high):
+    if numpy is not None and isinstance(values, numpy.ndarray):
+        mask = numpy.zeros(len(values), dtype=bool)
+        if low is not None:
+            mask |= values < low
+        if high is not None:
+            mask |= values > high
+        return int(numpy.flatnonzero(mask)[0])
+    return next(index for index, value in enumerate(values)
+                if (low is not None and value < low) or (high is not None and value > high))
+
+
+class Validator():
+    def __init__(self, program, filename):
+        self.program = program
+        self.stats = InputStats(filename)
+        self.variables = {}
+
+    def run(self, stream):
+        """Skontroluje vstup, pri nezhode vyhodí FormatError s číslom riadku vo vstupe."""
+
+        self.reader = LineReader(stream)
+        self.execute(self.program)
+        if not self.reader.at_end():
+            raise FormatError("Vstup má za koncom formátu ešte ďalšie riadky",
+                              self.reader.lines_read + 1)
+        self.stats.lines = self.reader.lines_read
+        return self.stats
+
+    def execute(self, program):
+        for statement in program:
+            if isinstance(statement, Line):
+                self.check_lines(statement, 1, bind=True)
+                continue
+            count = resolve(statement.count, self.variables, statement.line)
+            if not isinstance(count, int) or count < 0:
+                raise FormatError("Počet opakovaní {0} nie je nezáporné celé číslo".format(count),
+                                  self.reader.lines_read + 1)
+            if len(statement.body) == 1 and isinstance(statement.body[0], Line):
+                # Opakovaný riadok kontrolujeme po veľkých dávkach naraz
+                while count > 0:
+                    batch = min(count, BATCH_LINES)
+                    self.check_lines(statement.body[0], batch, bind=False)
+                    count -= batch
+            else:
+                for _ in range(count):
+                    self.execute(statement.body)
+
+    def check_lines(self, line, lines, bind):
+        first_line = self.reader.lines_read + 1
+        counts = []
+        for token in line.tokens:
+            count = resolve(token.count, self.variables, first_line)
+            if not isinstance(count, int) or count < 0:
+                raise FormatError("Počet tokenov {0} nie je nezáporné celé číslo".format(count),
+                                  first_line)
+            counts.append(count)
+
+        block, taken = self.reader.take(lines)
+        if taken < lines:
+            raise FormatError("Vstup skončil skôr, čakám riadok '{0}'".format(line.text),
+                              first_line + taken)
+
+        pattern = line.pattern(counts)
+        if not re.fullmatch(rb'(?:' + pattern + rb'\n)*', block):
+            line_regex = re.compile(pattern)
+            for index, text in enumerate(block.split(b'\n')):
+                if not line_regex.fullmatch(text):
+                    raise FormatError("Riadok nezodpovedá formátu '{0}'".format(line.text),
+                                      first_line + index)
+
+        width = sum(counts)
+        tokens = block.split()
+        self.stats.tokens += len(tokens)
+        offset = 0
+        for token, count in zip(line.tokens, counts):
+            if count == 0:
+                continue
+            if count == 1:
+                values = tokens[offset::width]
+            else:
+                values = [value for row in range(lines)
+                          for value in tokens[row * width + offset:row * width + offset + count]]
+            offset += count
+            self.check_range(token, convert(values, token.kind), count, first_line)
+            if bind and count == 1 and token.kind != "str":
+                self.variables[token.name] = (int(values[0]) if token.kind == "int"
+                                              else float(values[0]))
+
+    def check_range(self, token, values, count, first_line):
+        low = resolve(token.low, self.variables, first_line) if token.low is not None else None
+        high = resolve(token.high, self.variables, first_line) if token.high is not None else None
+        smallest, largest = min(values), max(values)
+        if (low is not None and smallest < low) or (high is not None and largest > high):
+            index = first_outside(values, low, high)
+            what = "Dĺžka" if token.kind == "str" else "Hodnota"
+            raise FormatError("{0} {1}={2} je mimo rozsahu [{3}, {4}]".format(
+                what, token.name, values[index], low, high), first_line + index // count)
+        if token.kind == "str":
+            self.stats.add("len(" + token.name + ")", int(smallest), int(largest))
+        else:
+            self.stats.add(token.name, smallest.item() if hasattr(smallest, 'item') else smallest,
+                           largest.item() if hasattr(largest, 'item') else largest)
+
+
+def validate_file(program, filename):
+    """Skontroluje jeden vstup proti formátu. Vráti (InputStats, FormatError alebo None)."""
+
+    validator = Validator(program, filename)
+    with open(filename, 'rb', buffering=0) as input_file:
+        try:
+            return validator.run(input_file), None
+        except FormatError as error:
+            validator.stats.lines = validator.reader.lines_read
+            return validator.stats, error
@@ -0,0 +1,171 @@
+import os
+import fnmatch
+import threading
+
+
+# Jeden súbor alebo foldr zo snapshotu
+class FileInfo():
+    __slots__ = ('path', 'size', 'mtime_ns', 'inode', 'is_dir')
+
+    def __init__(self, path, size, mtime_ns, inode, is_dir):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.is_dir = is_dir
+
+    @classmethod
+    def from_stat(cls, path, stat, is_dir):
+        return cls(path, stat.st_size, stat.st_mtime_ns, stat.st_ino, is_dir)
+
+
+def inside(path, root):
+    """Či normalizovaná cesta `path` leží v strome `root` (aj samotný `root`)."""
+
+    if root == os.curdir:
+        return not os.path.isabs(path) and path != os.pardir and \
+            not path.startswith(os.pardir + os.sep)
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def walk(root, entries, children):
+    """Prejde strom pod `root` cez os.scandir a zapíše FileInfo každej položky. Na položku padne
+    najviac jeden stat, typ položky a inode dá scandir zadarmo."""
+
+    names = []
+    children[root] = names
+    try:
+        iterator = os.scandir(root)
+    except OSError:
+        return
+    with iterator:
+        for entry in iterator:
+            # Kľúče sú normalizované cesty, aj keď root je napr. '.'
+            path = os.path.normpath(entry.path)
+            try:
+                is_dir = entry.is_dir()
+                info = FileInfo.from_stat(path, entry.stat(), is_dir)
+            except OSError:
+                # Súbor medzitým zmizol, alebo je to rozbitý symlink
+                continue
+            names.append(entry.name)
+            entries[path] = info
+            if is_dir:
+                walk(path, entries, children)
+
+
+# Snapshot stromov zadaní, vzorákov a vstupov. Vyrobí sa raz za beh a testy sa pýtajú jeho, nie
+# disku: existencia, veľkosť, mtime aj výpis foldra sú bez syscallov. Pre cesty mimo oskenovaných
+# stromov sa pýta disku, takže sa správa rovnako ako os.path. Kolá pri --batch sú rôzne stromy,
+# snapshot ich drží naraz.
+class Snapshot():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self.lock:
+            self.roots = {}
+            self.entries = {}
+            self.children = {}
+
+    def scan(self, *roots):
+        """(Znova) oskenuje stromy pod `roots`, staré položky z nich zahodí."""
+
+        for root in roots:
+            root = os.path.normpath(root)
+            entries = {}
+            children = {}
+            try:
+                info = FileInfo.from_stat(root, os.stat(root), os.path.isdir(root))
+            except OSError:
+                info = None
+            if info is not None:
+                entries[root] = info
+                if info.is_dir:
+                    walk(root, entries, children)
+            with self.lock:
+                self.forget(root)
+                self.roots[root] = info
+                self.entries.update(entries)
+                self.children.update(children)
+
+    def forget(self, root):
+        for mapping in (self.entries, self.children):
+            for path in [path for path in mapping if inside(path, root)]:
+                del mapping[path]
+
+    def covers(self, path):
+        """Či cesta patrí do niektorého oskenovaného stromu (potom snapshot vie odpovedať sám)."""
+
+        with self.lock:
+            return self._covers(os.path.normpath(path))
+
+    def _covers(self, path):
+        while True:
+            if path in self.roots:
+                return True
+            if path == os.pardir:
+                return False
+            parent = os.path.dirname(path) or os.curdir
+            if parent == path:
+                return False
+            path = parent
+
+    def get(self, path):
+        """FileInfo cesty, alebo None ak neexistuje."""
+
+        path = os.path.normpath(path)
+        with self.lock:
+            if path in self.entries:
+                return self.entries[path]
+            if self._covers(path):
+                return None
+        try:
+            return FileInfo.from_stat(path, os.stat(path), os.path.isdir(path))
+        except OSError:
+            return None
+
+    def exists(self, path):
+        return self.get(path) is not None
+
+    def isfile(self, path):
+        info = self.get(path)
+        return info is not None and not info.is_dir
+
+    def isdir(self, path):
+        info = self.get(path)
+        return info is not None and info.is_dir
+
+    def size(self, path):
+        info = self.get(path)
+        return info.size if info is not None else None
+
+    def listdir(self, path):
+        """Mená položiek foldra v poradí od os.scandir (ako os.listdir)."""
+
+        path = os.path.normpath(path)
+        with self.lock:
+            if path in self.children:
+                return list(self.children[path])
+            if self._covers(path):
+                raise FileNotFoundError(path)
+        return os.listdir(path)
+
+    def glob(self, directory, pattern):
+        """Cesty k položkám foldra ktorých meno zodpovedá `pattern` (bez rekurzie)."""
+
+        if not self.isdir(directory):
+            return []
+        return [os.path.join(directory, name)
+                for name in fnmatch.filter(self.listdir(directory), pattern)]
+
+    def mtimes(self, root):
+        """{cesta: mtime} všetkých súborov pod `root`."""
+
+        root = os.path.normpath(root)
+        with self.lock:
+            return {path: info.mtime_ns for path, info in self.entries.items()
+                    if not info.is_dir and inside(path, root)}
+
+files = Snapshot()
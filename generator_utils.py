@@ -0,0 +1,312 @@
+import os
+import shlex
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_utils
+import deadline_utils
+from deadline_utils import Deadline, DeadlineExceeded
+from issue_utils import Issue
+from incremental import file_hash
+from runner_utils import runner, limit_resources
+from toolchain import toolchain
+
+logger = logging.getLogger('checker')
+
+# Súbor s definíciou generátorov úlohy, vo foldri vstupov úlohy vedľa foldra `test` (ako `format`)
+GENERATORS_FILENAME = 'generators'
+
+
+class GeneratorError(Exception):
+    def __init__(self, message, line=None):
+        super().__init__(message)
+        self.message = message
+        self.line = line
+
+
+# Jeden vstup: `test/<name>.in` je výstup generátora spusteného s `arguments` (v nich je aj seed),
+# `test/<name>.out` je výstup vzorového riešenia na ňom
+class Case():
+    def __init__(self, name, generator, arguments, line):
+        self.name = name
+        self.generator = generator
+        self.arguments = arguments
+        self.line = line
+
+
+# Definícia generátorov jednej úlohy. Súbor `generators` vyzerá napríklad takto:
+#
+#     # Cesty sú vzhľadom na foldr vstupov úlohy
+#     %solution vzorak.cpp
+#     01 gen.py 10 1
+#     02 gen.py 1000 2
+#     03 gen_strom.cpp 100000 3
+#
+# Každý riadok je meno vstupu, generátor a jeho argumenty. Generátor vypíše vstup na stdout,
+# `%solution` k nemu vyrobí výstup (vstup dostane na stdin).
+class Definition():
+    def __init__(self, folder, solution, cases):
+        self.folder = folder
+        self.solution = solution
+        self.cases = cases
+
+    @property
+    def filename(self):
+        return os.path.join(self.folder, GENERATORS_FILENAME)
+
+    def sources(self):
+        return [self.solution] + list(dict.fromkeys(case.generator for case in self.cases))
+
+
+def read_definition(folder):
+    filename = os.path.join(folder, GENERATORS_FILENAME)
+    solution = None
+    cases = []
+    names = set()
+    with open(filename, encoding='utf-8') as definition:
+        for number, line in enumerate(definition, 1):
+            try:
+                words = shlex.split(line, comments=True)
+            except ValueError as error:
+                raise GeneratorError("Nerozumiem riadku: {0}".format(error), number)
+            if not words:
+                continue
+            if words[0] == '%solution':
+                if len(words) != 2:
+                    raise GeneratorError("%solution chce práve jeden listing", number)
+                solution = os.path.join(folder, words[1])
+                continue
+            if len(words) < 2:
+                raise GeneratorError("Chýba generátor vstupu {0}".format(words[0]), number)
+            name = words[0]
+            if name in names or os.path.basename(name) != name:
+                raise GeneratorError("Neplatné alebo opakované meno vstupu {0}".format(name),
+                                     number)
+            names.add(name)
+            cases.append(Case(name, os.path.join(folder, words[1]), words[2:], number))
+    if solution is None:
+        raise GeneratorError("Chýba %solution, nemám čím vyrobiť výstupy")
+    for source in [solution] + [case.generator for case in cases]:
+        if toolchain.compiler_for(source) is None:
+            raise GeneratorError("Neviem spustiť {0}".format(os.path.basename(source)))
+        if not os.path.isfile(source):
+            raise GeneratorError("{0} neexistuje".format(os.path.basename(source)))
+    return Definition(folder, solution, cases)
+
+
+def definition_files(folder):
+    """Súbory od ktorých závisia vygenerované vstupy úlohy (pre `reads` testov)."""
+
+    try:
+        return [os.path.join(folder, GENERATORS_FILENAME)] + read_definition(folder).sources()
+    except (OSError, GeneratorError):
+        return [os.path.join(folder, GENERATORS_FILENAME)]
+
+
+# Problémy z generovania vstupov, podľa foldra vstupov úlohy. Generuje sa pred parsovaním kola,
+# nahlási ich až test inputsGenerated, aby prešli reportermi a súhrnom ako ostatné chyby.
+class GenerationLog():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.issues = {}
+
+    def forget(self, root):
+        root = os.path.abspath(root)
+        with self.lock:
+            for folder in [folder for folder in self.issues
+                           if folder == root or folder.startswith(root + os.sep)]:
+                del self.issues[folder]
+
+    def add(self, folder, issue):
+        with self.lock:
+            self.issues.setdefault(os.path.abspath(folder), []).append(issue)
+
+    def problems(self, folder):
+        with self.lock:
+            return list(self.issues.get(os.path.abspath(folder), ()))
+
+
+generated = GenerationLog()
+
+
+def run_program(command, stdin_filename, stdout_filename):
+    """Spustí generátor / riešenie s limitmi runnera. Vráti návratový kód, None pri prekročení
+    času."""
+
+    parent = deadline_utils.current.get()
+    token = deadline_utils.current.set(Deadline(runner.limits.wall_time, parent))
+    try:
+        with open(stdin_filename or os.devnull, 'rb') as stdin, \
+                open(stdout_filename, 'wb') as stdout:
+            returncode, _ = deadline_utils.run_process(command, stdin=stdin, stdout=stdout,
+                                                       stderr=subprocess.DEVNULL,
+                                                       preexec_fn=limit_resources(runner.limits))
+        return returncode
+    except DeadlineExceeded:
+        # Vypršal celý beh (--time-budget), nie iba limit programu
+        if parent is not None and parent.expired:
+            raise
+        return None
+    finally:
+        deadline_utils.current.reset(token)
+
+
+def fingerprint(path):
+    info = os.stat(path)
+    return {"size": info.st_size, "mtime_ns": info.st_mtime_ns, "sha1": file_hash(path)}
+
+
+def fresh(path, expected):
+    """Či súbor na disku je ten ktorý sme vygenerovali. Pri zhodnom stat-e sa nečíta."""
+
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    if (info.st_size, info.st_mtime_ns) == (expected["size"], expected["mtime_ns"]):
+        return True
+    return info.st_size == expected["size"] and file_hash(path) == expected["sha1"]
+
+
+def produced_key(input_filename):
+    """Kľúč cache s odtlačkami vstupu a výstupu ktoré checker naposledy vyrobil do týchto ciest."""
+
+    return cache_utils.ContentCache.key('generated-files', os.path.abspath(input_filename))
+
+
+def remove_stale(input_filename, output_filename):
+    """Zmaže vstup a výstup ktoré sa nepodarilo vyrobiť znova, aby ich testy nekontrolovali ako
+    aktuálne. Iba ak ich vyrobil checker a odvtedy sa nezmenili, súbory od autora úlohy (napr.
+    v gite) nechá tak, zlyhanie aj tak nahlási inputsGenerated."""
+
+    if cache_utils.cache is None:
+        return
+    record = cache_utils.cache.get(produced_key(input_filename))
+    if record is None:
+        return
+    for path, expected in ((input_filename, record["in"]), (output_filename, record["out"])):
+        if fresh(path, expected):
+            os.unlink(path)
+
+
+def materialize(definition, case, builds):
+    """Vyrobí `test/<name>.in` a `.out` jedného vstupu, ak sa nezmenili zdroje. Vráti (vygeneroval,
+    Issue alebo None)."""
+
+    test_folder = os.path.join(definition.folder, 'test')
+    input_filename = os.path.join(test_folder, case.name + '.in')
+    output_filename = os.path.join(test_folder, case.name + '.out')
+    generator = builds[case.generator]
+    solution = builds[definition.solution]
+    where = (definition.filename, case.line)
+
+    key = None
+    cached = None
+    if cache_utils.cache is not None:
+        sources = []
+        for listing in (case.generator, definition.solution):
+            with open(listing, 'rb') as listing_file:
+                sources += [listing_file.read(), builds[listing].compiler.identity]
+        key = cache_utils.ContentCache.key('generated', *sources, *case.arguments)
+        cached = cache_utils.cache.get(key)
+        if cached is not None and fresh(input_filename, cached["in"]) and \
+                fresh(output_filename, cached["out"]):
+            return False, None
+
+    os.makedirs(test_folder, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=test_folder, prefix='.generate-') as temp_directory:
+        first, second, output = (os.path.join(temp_directory, name)
+                                 for name in ('first.in', 'second.in', 'out'))
+        command = generator.command + case.arguments
+        # Generátor spustíme dvakrát: rovnaké argumenty musia dať rovnaký vstup
+        for target in (first, second):
+            returncode = run_program(command, None, target)
+            if returncode != 0:
+                remove_stale(input_filename, output_filename)
+                reason = "nestihol časový limit" if returncode is None else \
+                    "skončil s kódom {0}".format(returncode)
+                return False, Issue("Generátor vstupu {0} {1}".format(case.name, reason), *where)
+        generated_input = fingerprint(first)
+        if file_hash(second) != generated_input["sha1"] or \
+                (cached is not None and cached["in"]["sha1"] != generated_input["sha1"]):
+            remove_stale(input_filename, output_filename)
+            return False, Issue("Generátor vstupu {0} nie je deterministický, s rovnakými "
+                                "argumentmi vyrobil rôzne vstupy".format(case.name), *where)
+
+        returncode = run_program(solution.command, first, output)
+        if returncode != 0:
+            remove_stale(input_filename, output_filename)
+            reason = "nestihlo časový limit" if returncode is None else \
+                "skončilo s kódom {0}".format(returncode)
+            return False, Issue("Vzorové riešenie na vstupe {0} {1}".format(case.name, reason),
+                                *where)
+        os.replace(first, input_filename)
+        os.replace(output, output_filename)
+
+    if key is not None:
+        record = {"in": fingerprint(input_filename), "out": fingerprint(output_filename)}
+        cache_utils.cache.put(key, record)
+        cache_utils.cache.put(produced_key(input_filename), record)
+    return True, None
+
+
+def generate_round(path_to_inputs):
+    """Nájde definície generátorov v úlohách kola a vyrobí z nich vstupy a výstupy. Vstupy všetkých
+    úloh sa generujú paralelne na `runner.jobs` vláknach, nezmenené (podľa cache) sa preskočia."""
+
+    generated.forget(path_to_inputs)
+    definitions = []
+    for number in range(1, 9):
+        folder = os.path.join(path_to_inputs, str(number))
+        if not os.path.isfile(os.path.join(folder, GENERATORS_FILENAME)):
+            continue
+        try:
+            definitions.append(read_definition(folder))
+        except GeneratorError as error:
+            generated.add(folder, Issue(error.message, os.path.join(folder, GENERATORS_FILENAME),
+                                        error.line))
+    if not definitions:
+        return
+
+    try:
+        results = generate(definitions)
+    except DeadlineExceeded:
+        # Vypršal --time-budget, testy kola už aj tak skončia ako TIMEOUT
+        for definition in definitions:
+            generated.add(definition.folder, Issue("Generovanie vstupov nestihlo časový limit",
+                                                   definition.filename))
+        return
+
+    count = 0
+    for (definition, case), (made, issue) in results:
+        count += made
+        if issue is not None:
+            generated.add(definition.folder, issue)
+    logger.info("Vygenerovaných %i vstupov z %i, ostatné sa nezmenili alebo zlyhali", count,
+                len(results))
+
+
+def generate(definitions):
+    """Skompiluje generátory a riešenia a vyrobí všetky vstupy. Vráti [((definícia, vstup),
+    (vygeneroval, Issue alebo None))]."""
+
+    listings = list(dict.fromkeys(source for definition in definitions
+                                  for source in definition.sources()))
+    builds = dict(zip(listings, toolchain.build_many(listings)))
+    cases = []
+    for definition in definitions:
+        broken = [build for build in map(builds.get, definition.sources()) if not build.ok or
+                  build.skipped]
+        for build in broken:
+            reason = "nemám compiler" if build.skipped else "nejde skompilovať"
+            generated.add(definition.folder, Issue("{0} {1}".format(
+                os.path.basename(build.listing_filename), reason), definition.filename))
+        if not broken:
+            cases += [(definition, case) for case in definition.cases]
+
+    work = deadline_utils.inherit(lambda job: materialize(job[0], job[1], builds))
+    with ThreadPoolExecutor(runner.jobs, thread_name_prefix='checker-generate') as executor:
+        return list(zip(cases, executor.map(work, cases)))
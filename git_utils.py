@@ -0,0 +1,103 @@
+import os
+import logging
+import subprocess
+
+logger = logging.getLogger('checker')
+
+
+class GitError(Exception):
+    pass
+
+
+def git(cwd, *arguments, input=None):
+    """Spustí git plumbing príkaz v `cwd` a vráti jeho stdout (bytes)."""
+
+    try:
+        process = subprocess.run(['git'] + list(arguments), cwd=cwd, input=input,
+                                 stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except OSError as error:
+        raise GitError("Nepodarilo sa spustiť git: {0}".format(error))
+    if process.returncode != 0:
+        raise GitError(process.stderr.decode('utf-8', 'replace').strip())
+    return process.stdout
+
+
+def decode_path(path):
+    return path.decode('utf-8', 'surrogateescape')
+
+
+def name_status(cwd, arguments, folders):
+    """Dvojice (status, cesta vzhľadom na koreň repozitára) z `git diff --name-status`."""
+
+    output = git(cwd, 'diff', '--name-status', '-z', '--no-renames', *arguments, '--', *folders)
+    fields = output.split(b'\0')
+    return [(decode_path(fields[index]), decode_path(fields[index + 1]))
+            for index in range(0, len(fields) - 1, 2)]
+
+
+def read_index_blobs(cwd, paths):
+    """Obsah súborov `paths` (vzhľadom na koreň repozitára) tak ako sú v indexe, jedným procesom."""
+
+    if not paths:
+        return {}
+    request = b''.join(b':' + path.encode('utf-8', 'surrogateescape') + b'\n' for path in paths)
+    output = git(cwd, 'cat-file', '--batch', input=request)
+    blobs = {}
+    position = 0
+    for path in paths:
+        header_end = output.index(b'\n', position)
+        header = output[position:header_end].split()
+        if header[-1] == b'missing':
+            position = header_end + 1
+            continue
+        size = int(header[2])
+        blobs[path] = output[header_end + 1:header_end + 1 + size]
+        position = header_end + 1 + size + 1
+    return blobs
+
+
+# Zmenené súbory kola. Cesty sú absolútne. `texts` je obsah zadaní a vzorákov z indexu, ktoré sa v
+# pracovnom strome líšia od toho čo sa commituje.
+class Changes():
+    def __init__(self, paths, deleted, texts):
+        self.paths = paths
+        self.deleted = deleted
+        self.texts = texts
+
+    @property
+    def selective(self):
+        """Či stačí spustiť iba testy a itemy ktoré zmenené súbory čítajú. Zmazaný súbor žiadny
+        test nečíta, vtedy treba skontrolovať celé kolo."""
+
+        return not self.deleted
+
+
+def round_changes(folders, staged=False, since=None):
+    """Zistí čo sa v foldroch kola zmenilo: so `staged` v indexe oproti HEAD, so `since` v
+    pracovnom strome oproti danej revízii."""
+
+    cwd = folders[0] if os.path.isdir(folders[0]) else os.path.dirname(folders[0]) or os.curdir
+    top = decode_path(git(cwd, 'rev-parse', '--show-toplevel').rstrip(b'\n'))
+    folders = [os.path.abspath(folder) for folder in folders]
+
+    if since is not None:
+        changed = name_status(cwd, [since], folders)
+    else:
+        changed = name_status(cwd, ['--cached'], folders)
+
+    paths = {os.path.join(top, path) for _, path in changed}
+    deleted = {os.path.join(top, path) for status, path in changed if status == 'D'}
+    texts = {}
+    if staged:
+        # Súbory ktoré sa v pracovnom strome líšia od indexu. Zadania a vzoráky prečítame z
+        # indexu, ostatné (vstupy, listingy) testy čítajú z disku.
+        unstaged = {path for _, path in name_status(cwd, [], folders)}
+        dirty = [path for status, path in changed if status != 'D' and path in unstaged]
+        markdown = [path for path in dirty if path.endswith('.md')]
+        for path in dirty:
+            if not path.endswith('.md'):
+                logger.warning("%s má zmeny ktoré nie sú v indexe, kontrolujem verziu z disku",
+                               path)
+        texts = {os.path.join(top, path): blob.decode('utf-8')
+                 for path, blob in read_index_blobs(cwd, markdown).items()}
+    return Changes(paths, deleted, texts)
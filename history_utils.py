@@ -0,0 +1,119 @@
+import os
+import json
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger('checker')
+
+HISTORY_VERSION = 1
+HISTORY_FILENAME = 'history.json'
+
+# Staršie behy sa počítajú s váhou DECAY^vek, aby história sledovala aktuálny stav kôl a checkera
+DECAY = 0.8
+
+# Koľko sekúnd stojí jednotka `cost` testu, kým o žiadnom teste nemáme históriu
+DEFAULT_SECONDS_PER_COST = 0.01
+
+
+# Malá lokálna história testov: pre každý test (váženú) dĺžku behu, počet behov a počet zlyhaní.
+# Podľa nej sa plánuje poradie testov, viď `priority`. Behy ktoré nespúšťajú všetko (--incremental,
+# --staged / --since, --shard) ju iba čítajú (`readonly`), inak by sa dĺžky skresľovali. Bez `path`
+# je história prázdna a nikam sa neukladá.
+class History():
+    def __init__(self, path=None, readonly=False):
+        self.path = path
+        self.readonly = readonly or path is None
+        self.tests = {}
+        self.lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as history_file:
+                history = json.load(history_file)
+        except (OSError, ValueError):
+            return
+        if history.get("version") == HISTORY_VERSION:
+            self.tests = history.get("tests", {})
+
+    def save(self):
+        if self.readonly:
+            return
+        with self.lock:
+            history = {"version": HISTORY_VERSION, "tests": dict(self.tests)}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as history_file:
+                json.dump(history, history_file)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.debug("Nepodarilo sa uložiť históriu testov do %s", self.path)
+
+    def record(self, test_name, seconds, failed):
+        if self.readonly:
+            return
+        with self.lock:
+            entry = self.tests.get(test_name, {"runs": 0, "failures": 0, "seconds": seconds})
+            self.tests[test_name] = {
+                "runs": entry["runs"] * DECAY + 1,
+                "failures": entry["failures"] * DECAY + (1 if failed else 0),
+                "seconds": entry["seconds"] * DECAY + seconds * (1 - DECAY)}
+
+    def failure_rate(self, test_name):
+        """Odhad pravdepodobnosti že test zlyhá. Bez histórie 1/2, s pribúdajúcimi behmi sa blíži
+        k pomeru zlyhaní."""
+
+        entry = self.tests.get(test_name, {"runs": 0, "failures": 0})
+        return (entry["failures"] + 1) / (entry["runs"] + 2)
+
+    def seconds_per_cost(self, tests):
+        known = sorted(self.tests[name]["seconds"] / max(tests[name].get("cost", 1), 1e-9)
+                       for name in tests if name in self.tests)
+        return known[len(known) // 2] if known else DEFAULT_SECONDS_PER_COST
+
+    def durations(self, tests):
+        """Odhad dĺžky každého testu. Test bez histórie sa odhadne z `cost` (v sekundách na
+        jednotku ceny typických testov s históriou)."""
+
+        per_cost = self.seconds_per_cost(tests)
+        return {name: self.tests[name]["seconds"] if name in self.tests
+                else tests[name].get("cost", 1) * per_cost for name in tests}
+
+
+def critical_paths(tests, durations):
+    """Pre každý test súčet odhadnutých dĺžok najdlhšej reťaze testov ktorá od neho závisí."""
+
+    dependents = {name: [] for name in tests}
+    for name, tst in tests.items():
+        for dependency in tst.get("depends", ()):
+            if dependency in dependents:
+                dependents[dependency].append(name)
+    paths = {}
+
+    def path(name):
+        if name not in paths:
+            paths[name] = durations[name] + max((path(dependent) for dependent in dependents[name]),
+                                                default=0)
+        return paths[name]
+    for name in tests:
+        path(name)
+    return paths
+
+
+def priority(tests, history, fail_fast):
+    """Kľúč pre schedule_order (menší ide skôr).
+
+    Pri --fail-fast idú skôr testy s najkratším očakávaným časom do zlyhania (dĺžka / šanca na
+    zlyhanie), aby sa chyba ukázala čím skôr. Inak idú skôr testy na najdlhšej reťazi závislostí
+    (critical path), aby pri --jobs dlhé vetvy nečakali na konci a celý beh bol čo najkratší."""
+
+    durations = history.durations(tests)
+    if fail_fast:
+        return {name: durations[name] / history.failure_rate(name) for name in tests}
+    paths = critical_paths(tests, durations)
+    return {name: -paths[name] for name in tests}
@@ -0,0 +1,208 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+import threading
+
+from issue_utils import Issue, BufferedIssueLogger
+from test_utils import TestResult
+from fs_utils import files
+from plugin_utils import MANIFEST
+
+logger = logging.getLogger('checker')
+
+STATE_VERSION = 1
+
+# Súbory menšie ako toto si pri uložení aj zahashujeme. Ak sa im neskôr zmení iba mtime (git
+# checkout, touch...), podľa hashu zistíme že sa vlastne nezmenili. Veľké vstupy nehashujeme, pri
+# nich stačí zmena mtime na to aby sa testy nad nimi pustili znova.
+HASH_LIMIT = 1024 * 1024
+
+
+def checker_sources():
+    """Súbory od ktorých závisia výsledky testov: všetky *.py vedľa check.py a manifest pluginov.
+    Ak sa zmení niektorý z nich, uložený stav zahodíme."""
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                  if name.endswith('.py')) + [MANIFEST]
+
+
+def checker_fingerprint(config=""):
+    digest = hashlib.sha1(config.encode('utf-8'))
+    for source in checker_sources():
+        digest.update(os.path.basename(source).encode('utf-8'))
+        try:
+            with open(source, 'rb') as source_file:
+                digest.update(source_file.read())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+
+def file_hash(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as hashed_file:
+        for chunk in iter(lambda: hashed_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dump_records(records):
+    dumped = []
+    for kind, severity, payload in records:
+        if kind == "issue":
+            payload = {"message": payload.message, "file": payload.file, "line": payload.line}
+        dumped.append([kind, severity, payload])
+    return dumped
+
+
+def load_records(dumped):
+    records = []
+    for kind, severity, payload in dumped:
+        if kind == "issue":
+            payload = Issue(payload["message"], payload["file"], payload["line"])
+        records.append((kind, severity, payload))
+    return records
+
+
+def dump_status(status):
+    if isinstance(status, TestResult):
+        return {"result": status.name}
+    return {"success": bool(status)}
+
+
+def load_status(dumped):
+    if "result" in dumped:
+        return TestResult[dumped["result"]]
+    return dumped["success"]
+
+
+# Stav inkrementálneho checkovania. Pre každý test a každý item (unit) si pamätá odtlačky súborov
+# ktoré test deklaroval cez `reads`, issues ktoré nahlásil a čo vrátil. Ak sa pri ďalšom behu
+# žiaden z tých súborov nezmenil, test (item) sa nespúšťa a iba sa prehrajú uložené issues.
+class IncrementalState():
+    def __init__(self, path, config=""):
+        self.path = path
+        self.fingerprint = checker_fingerprint(config)
+        self.tests = {}
+        self.touched = {}
+        self.stats = {}
+        self.hashes = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return
+        if state.get("version") != STATE_VERSION or state.get("checker") != self.fingerprint:
+            logger.debug("Uložený inkrementálny stav je zo starej verzie checkera, zahadzujem ho")
+            return
+        self.tests = state.get("tests", {})
+
+    def save(self):
+        with self.lock:
+            tests = dict(self.tests)
+            for test_name, units in self.touched.items():
+                tests[test_name] = units
+            state = {"version": STATE_VERSION, "checker": self.fingerprint, "tests": tests}
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.path)
+
+    def stat(self, path):
+        # stat každého súboru robíme za beh iba raz, aj keď ho číta viac testov. Súbory kola sú v
+        # snapshote (fs_utils.py), tam sa nerobí vôbec.
+        with self.lock:
+            if path in self.stats:
+                return self.stats[path]
+        info = files.get(path)
+        fingerprint = [info.mtime_ns, info.size] if info is not None else None
+        with self.lock:
+            self.stats[path] = fingerprint
+        return fingerprint
+
+    def hash(self, path):
+        # Rovnako ako stat, hash každého súboru sa za beh počíta iba raz
+        with self.lock:
+            if path in self.hashes:
+                return self.hashes[path]
+        digest = file_hash(path)
+        with self.lock:
+            self.hashes[path] = digest
+        return digest
+
+    def refresh(self, files):
+        """Ak sa žiaden zo súborov nezmenil, vráti ich odtlačky s aktuálnym mtime (súbor ktorému sa
+        zmenil iba mtime, napr. po git checkout, sa tak pri ďalšom behu nehashuje znova). Inak
+        None."""
+
+        refreshed = {}
+        for path, stored in files.items():
+            current = self.stat(path)
+            refreshed[path] = stored
+            if current is None or stored is None:
+                # Súbor ktorý chýbal musí stále chýbať
+                if (current is None) != (stored is None):
+                    return None
+                continue
+            if current == stored[:2]:
+                continue
+            # Zmenil sa mtime ale nie veľkosť, rozhodne hash
+            if current[1] != stored[1] or len(stored) < 3 or self.hash(path) != stored[2]:
+                return None
+            refreshed[path] = current + [stored[2]]
+        return refreshed
+
+    def fingerprint_files(self, paths):
+        files = {}
+        for path in paths:
+            fingerprint = self.stat(path)
+            if fingerprint is not None and fingerprint[1] <= HASH_LIMIT:
+                fingerprint = fingerprint + [self.hash(path)]
+            files[path] = fingerprint
+        return files
+
+    def run(self, test_name, unit, paths, logger, body):
+        """Spustí body(logger) iba ak sa od minulého behu zmenil niektorý zo súborov `paths`.
+        Inak prehrá do loggera uložené issues a vráti uložený výsledok."""
+
+        paths = sorted(set(paths))
+        with self.lock:
+            stored = self.tests.get(test_name, {}).get(unit)
+
+        refreshed = None
+        if stored is not None and sorted(stored["files"]) == paths:
+            refreshed = self.refresh(stored["files"])
+        if refreshed is not None:
+            replayed = BufferedIssueLogger(test_name)
+            replayed.records = load_records(stored["records"])
+            replayed.replay(logger)
+            status = load_status(stored["status"])
+            with self.lock:
+                self.hits += 1
+                self.touched.setdefault(test_name, {})[unit] = dict(stored, files=refreshed)
+            return status
+
+        # Odtlačky berieme pred behom testu, aby sa zmena počas behu prejavila pri ďalšom behe
+        files = self.fingerprint_files(paths)
+        buffer = BufferedIssueLogger(test_name)
+        status = body(buffer)
+        buffer.replay(logger)
+        entry = {"files": files,
+                 "records": dump_records(buffer.records),
+                 "status": dump_status(status)}
+        with self.lock:
+            self.misses += 1
+            self.touched.setdefault(test_name, {})[unit] = entry
+        return status
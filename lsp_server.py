@@ -0,0 +1,359 @@
+import os
+import sys
+import json
+import queue
+import logging
+import threading
+import urllib.parse
+
+from issue_utils import BufferedIssueLogger
+from test_utils import RunContext, freeze_test_data, schedule_order
+from models import Task, Solution
+from scan_utils import scanner
+from fs_utils import files
+
+logger = logging.getLogger('checker.lsp')
+
+# Ako často kontrolujeme zmeny na disku (v sekundách)
+POLL_INTERVAL = 2.0
+
+# Pri písaní (didOpen / didChange) bežia iba testy s `cost` najviac toľko. Drahšie testy (spúšťanie
+# listingov na vstupoch, meranie časov) bežia až po uložení alebo zmene na disku.
+MAX_INTERACTIVE_COST = 10
+
+# Správy ktoré menia iba rozpísaný text v editore
+EDITING_METHODS = ("textDocument/didOpen", "textDocument/didChange")
+
+# Severity z modulu logging -> DiagnosticSeverity z LSP
+SEVERITIES = {logging.CRITICAL: 1, logging.ERROR: 1, logging.WARNING: 2, logging.INFO: 3,
+              logging.DEBUG: 4}
+
+
+def path_to_uri(path):
+    return 'file://' + urllib.parse.quote(os.path.abspath(path))
+
+
+def uri_to_path(uri):
+    parsed = urllib.parse.urlparse(uri)
+    return os.path.abspath(urllib.parse.unquote(parsed.path))
+
+
+def read_message(stream):
+    """Prečíta jednu JSON-RPC správu (hlavičky + telo) zo streamu. Na konci streamu vráti None."""
+
+    length = None
+    while True:
+        header = stream.readline()
+        if not header:
+            return None
+        header = header.strip()
+        if not header:
+            break
+        name, _, value = header.decode('ascii').partition(':')
+        if name.lower() == 'content-length':
+            length = int(value.strip())
+    if length is None:
+        return None
+    return json.loads(stream.read(length).decode('utf-8'))
+
+
+def write_message(stream, message):
+    body = json.dumps(message).encode('utf-8')
+    stream.write(b'Content-Length: ' + str(len(body)).encode('ascii') + b'\r\n\r\n' + body)
+    stream.flush()
+
+
+# Checker ako language server. Zadania, vzoráky a vstupy drží sparsované v pamäti, pri zmene
+# dokumentu sparsuje iba ten jeden dokument a pustí iba testy ktoré sa ho týkajú (podľa `require`).
+# Issues z testov posiela editoru ako diagnostics.
+class LanguageServer():
+    def __init__(self, tests, path_to_tasks, path_to_inputs, path_to_solutions, parse_inputs,
+                 jobs=1, reader=None, writer=None):
+        self.tests = tests
+        self.folders = {"tasks": path_to_tasks and os.path.abspath(path_to_tasks),
+                        "solutions": path_to_solutions and os.path.abspath(path_to_solutions),
+                        "inputs": path_to_inputs and os.path.abspath(path_to_inputs)}
+        self.parse_inputs = parse_inputs
+        self.jobs = jobs
+        self.reader = reader or sys.stdin.buffer
+        self.writer = writer or sys.stdout.buffer
+        self.write_lock = threading.Lock()
+        self.events = queue.Queue()
+
+        self.tasks = {}
+        self.solutions = {}
+        self.inputs = None
+        self.open_documents = {}
+        self.parser_issues = {}
+        self.test_issues = {}
+        self.published = {}
+        self.mtimes = {}
+        # Nastaví sa pri exit (alebo keď editor zavrie stdin), zobudí aj poll vlákno
+        self.stopped = threading.Event()
+        # Podľa LSP končíme s kódom 0 iba ak exit prišiel po shutdown
+        self.shut_down = False
+
+    # --- Model ---
+
+    def kind_of(self, path):
+        """Vráti "tasks" / "solutions" ak je súbor zadanie / vzorák, "inputs" ak je to vstup."""
+
+        for kind, folder in self.folders.items():
+            if folder and os.path.commonpath([folder, path]) == folder:
+                if kind == "inputs":
+                    return kind
+                if os.path.dirname(path) == folder and \
+                   os.path.basename(path).startswith('prikl') and path.endswith('.md'):
+                    return kind
+                if kind == "solutions":
+                    # Listing vzoráku
+                    return "listings"
+        return None
+
+    def parse_document(self, path, text=None):
+        kind = self.kind_of(path)
+        if kind not in ("tasks", "solutions"):
+            return None
+        buffer = BufferedIssueLogger('checker.parser')
+        if not os.path.isfile(path) and text is None:
+            parsed = None
+        elif kind == "tasks":
+            parsed = Task.parse(buffer, path, text)
+        else:
+            parsed = Solution.parse(buffer, path, text)
+
+        # Parser hlási iba meno súboru, doplníme celú cestu
+        self.parser_issues[path] = []
+        for record, severity, issue in buffer.records:
+            if record == "issue":
+                issue.file = path
+                self.parser_issues[path].append((severity, issue))
+
+        models = self.tasks if kind == "tasks" else self.solutions
+        if parsed is None:
+            models.pop(path, None)
+        else:
+            models[path] = parsed
+        return kind
+
+    def load_all(self):
+        self.mtimes = self.snapshot()
+        for kind in ("tasks", "solutions"):
+            folder = self.folders[kind]
+            if folder and files.isdir(folder):
+                for path in sorted(files.glob(folder, 'prikl*.md')):
+                    self.parse_document(path)
+        self.load_inputs()
+
+    def load_inputs(self):
+        if self.folders["inputs"]:
+            self.inputs = self.parse_inputs(None, self.folders["inputs"])
+
+    def test_data(self):
+        return freeze_test_data({
+            "path_to_tasks": self.folders["tasks"],
+            "path_to_solutions": self.folders["solutions"],
+            "path_to_inputs": self.folders["inputs"],
+            "tasks": list(self.tasks.values()) if self.folders["tasks"] else None,
+            "solutions": list(self.solutions.values()) if self.folders["solutions"] else None,
+            "inputs": self.inputs,
+            "files": files})
+
+    # --- Testy a diagnostics ---
+
+    def affected_tests(self, kinds, editing=False):
+        if "listings" in kinds:
+            kinds = set(kinds) | {"solutions"}
+        return [name for name, tst in self.tests.items()
+                if (not tst["require"] or set(tst["require"]) & set(kinds)) and
+                not (editing and tst.get("cost", 1) > MAX_INTERACTIVE_COST)]
+
+    def run_tests(self, test_names):
+        test_data = self.test_data()
+        with RunContext(self.jobs) as context:
+            for test_name in schedule_order({name: self.tests[name] for name in test_names}):
+                buffer = BufferedIssueLogger('checker.' + test_name)
+                try:
+                    self.tests[test_name]["run"](buffer, test_data, context)
+                except Exception:
+                    # Rozbitý rozpísaný dokument nesmie zhodiť server
+                    logger.exception("Test %s spadol", test_name)
+                self.test_issues[test_name] = [(severity, issue)
+                                               for kind, severity, issue in buffer.records
+                                               if kind == "issue"]
+
+    def publish(self):
+        diagnostics = {}
+        all_issues = [issue for issues in self.parser_issues.values() for issue in issues]
+        all_issues += [issue for issues in self.test_issues.values() for issue in issues]
+        for severity, issue in all_issues:
+            # Issues bez súboru (napr. chýbajúca úloha) nemáme kam ukázať
+            if not issue.file:
+                continue
+            path = os.path.abspath(issue.file)
+            line = max((issue.line or 1) - 1, 0)
+            diagnostics.setdefault(path, []).append({
+                "range": {"start": {"line": line, "character": 0},
+                          "end": {"line": line + 1, "character": 0}},
+                "severity": SEVERITIES.get(severity, 3),
+                "source": "ksp-checker",
+                "message": issue.message})
+
+        # Posielame iba zmenené súbory. Súborom ktoré už nemajú issues treba poslať prázdny zoznam.
+        for path in sorted(set(self.published) | set(diagnostics)):
+            if self.published.get(path) != diagnostics.get(path):
+                self.notify("textDocument/publishDiagnostics",
+                            {"uri": path_to_uri(path), "diagnostics": diagnostics.get(path, [])})
+        self.published = diagnostics
+
+    def recheck(self, kinds, saved=()):
+        """Spustí testy ktorých sa týkajú zmenené druhy dokumentov. Pre `kinds` zmenené iba
+        v editore bežia lacné testy, pre `saved` (uložené, zmenené na disku) všetky."""
+
+        test_names = set(self.affected_tests(kinds, editing=True)) | \
+            set(self.affected_tests(saved))
+        test_names = [name for name in self.tests if name in test_names]
+        logger.debug("Zmenené %s (uložené %s), spúšťam %s", sorted(kinds), sorted(saved),
+                     test_names)
+        self.run_tests(test_names)
+        self.publish()
+
+    # --- Sledovanie disku ---
+
+    def snapshot(self):
+        # Foldre znova oskenujeme; ten istý snapshot potom používajú parse_inputs aj testy
+        folders = [folder for folder in self.folders.values() if folder]
+        files.scan(*folders)
+        mtimes = {}
+        for folder in folders:
+            mtimes.update(files.mtimes(folder))
+        return mtimes
+
+    def poll(self):
+        while not self.stopped.is_set():
+            self.events.put(("poll", None))
+            self.stopped.wait(POLL_INTERVAL)
+
+    def disk_changes(self):
+        current = self.snapshot()
+        changed = {path for path in set(current) | set(self.mtimes)
+                   if current.get(path) != self.mtimes.get(path)}
+        self.mtimes = current
+        return changed
+
+    def handle_changed_paths(self, paths):
+        kinds = set()
+        for path in paths:
+            kind = self.kind_of(path)
+            if kind is None:
+                continue
+            kinds.add(kind)
+            # Otvorené dokumenty má v správe editor, disk je pre ne irelevantný
+            if kind in ("tasks", "solutions") and path not in self.open_documents:
+                self.parse_document(path)
+        if "inputs" in kinds:
+            # Fakty o vstupoch z minulých behov už nemusia platiť
+            scanner.clear()
+            self.load_inputs()
+        return kinds
+
+    # --- JSON-RPC ---
+
+    def notify(self, method, params):
+        with self.write_lock:
+            write_message(self.writer, {"jsonrpc": "2.0", "method": method, "params": params})
+
+    def respond(self, request_id, result=None, error=None):
+        message = {"jsonrpc": "2.0", "id": request_id}
+        if error is not None:
+            message["error"] = error
+        else:
+            message["result"] = result
+        with self.write_lock:
+            write_message(self.writer, message)
+
+    def read_loop(self):
+        while True:
+            message = read_message(self.reader)
+            self.events.put(("message", message))
+            # Po exit už nečítame, inak by vlákno pri ukončení interpretera viselo na stdin
+            if message is None or message.get("method") == "exit":
+                return
+
+    def handle(self, message):
+        """Spracuje jednu správu, vráti množinu druhov dokumentov ktoré sa zmenili."""
+
+        method = message.get("method")
+        params = message.get("params") or {}
+
+        if method == "initialize":
+            self.load_all()
+            threading.Thread(target=self.poll, daemon=True).start()
+            self.respond(message["id"], {
+                "capabilities": {"textDocumentSync": {"openClose": True, "change": 1,
+                                                      "save": {"includeText": False}}},
+                "serverInfo": {"name": "ksp-checker"}})
+            return set()
+        if method == "initialized":
+            return {"tasks", "solutions", "inputs"}
+        if method == "shutdown":
+            self.shut_down = True
+            self.respond(message["id"], None)
+            return set()
+        if method == "exit":
+            self.stopped.set()
+            return set()
+
+        if method in ("textDocument/didOpen", "textDocument/didChange"):
+            document = params["textDocument"]
+            path = uri_to_path(document["uri"])
+            if method == "textDocument/didOpen":
+                text = document["text"]
+            else:
+                # Synchronizujeme celé dokumenty (TextDocumentSyncKind.Full)
+                text = params["contentChanges"][-1]["text"]
+            self.open_documents[path] = text
+            kind = self.parse_document(path, text)
+            return {kind} if kind else set()
+        if method == "textDocument/didSave":
+            path = uri_to_path(params["textDocument"]["uri"])
+            return self.handle_changed_paths([path])
+        if method == "textDocument/didClose":
+            path = uri_to_path(params["textDocument"]["uri"])
+            self.open_documents.pop(path, None)
+            return self.handle_changed_paths([path])
+        if method == "workspace/didChangeWatchedFiles":
+            return self.handle_changed_paths([uri_to_path(change["uri"])
+                                              for change in params.get("changes", [])])
+
+        if "id" in message:
+            self.respond(message["id"], error={"code": -32601,
+                                               "message": "Method not found: %s" % method})
+        return set()
+
+    def serve(self):
+        threading.Thread(target=self.read_loop, daemon=True).start()
+
+        while not self.stopped.is_set():
+            kinds = set()
+            saved = set()
+            events = [self.events.get()]
+            # Nahromadené zmeny (napr. rýchle písanie) spracujeme naraz, testy pustíme raz
+            while not self.events.empty():
+                events.append(self.events.get())
+
+            for event, message in events:
+                if event == "poll":
+                    saved |= self.handle_changed_paths(self.disk_changes())
+                elif message is None:
+                    self.stopped.set()
+                elif message.get("method") in EDITING_METHODS:
+                    kinds |= self.handle(message)
+                else:
+                    saved |= self.handle(message)
+                if self.stopped.is_set():
+                    break
+
+            if (kinds or saved) and not self.stopped.is_set():
+                self.recheck(kinds, saved)
+        return 0 if self.shut_down else 1
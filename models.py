@@ -1,14 +1,209 @@
 import os
 import re
 import logging
+from array import array
+from types import MappingProxyType
+from collections import namedtuple
+from collections.abc import Mapping
 
 from issue_utils import Issue, IssueLogger
 
 
-class Task():
+# Lexer zadaní a vzorákov. Jeden predkompilovaný regex, ktorý sa na každý riadok pustí iba raz a
+# rozpozná všetko čo nás zaujíma: začiatky / konce ``` blokov, `\\listing{...}` a direktívy
+# `%by`, `%skiptest`, `%proofread`, `%timelimit`.
+LEXER = re.compile(r'(?P<fence>^```(?P<fence_info>\S*))'
+                   r'|(?P<listing>^\\listing{(?P<listing_name>[^}]*)})'
+                   r'|%(?P<directive>by|skiptest|proofread|timelimit) (?P<value>.*)')
+
+# Bloky ktoré sú príkladom vstupu / výstupu
+SAMPLE_FENCES = ('vstup', 'vystup')
+
+# Čísla riadkov sú indexy od 0, rozsah riadkov [start, end) sú riadky obsahu bloku bez ``` riadkov
+Directive = namedtuple('Directive', ['line', 'kind', 'value'])
+SampleBlock = namedtuple('SampleBlock', ['kind', 'start', 'end'])
+ListingReference = namedtuple('ListingReference', ['line', 'name'])
+
+
+# Štruktúrovaný dokument (zadanie alebo vzorák) tak ako ho vidí lexer: prvý riadok s hlavičkou,
+# direktívy, bloky s príkladmi vstupu / výstupu a referencie na listingy. Drží iba čísla riadkov,
+# nie text, takže je lacný aj keď entita svoj text zabudne.
+class Document():
+    __slots__ = ('header', 'directives', 'samples', 'listings')
+
+    def __init__(self, header, directives, samples, listings):
+        self.header = header
+        self.directives = directives
+        self.samples = samples
+        self.listings = listings
+
+    @staticmethod
+    def lex(lines):
+        """Jeden prechod cez riadky (bez koncov riadkov), vráti Document."""
+
+        header = ""
+        directives = []
+        samples = []
+        listings = []
+        sample = None
+        idx = -1
+        for idx, line in enumerate(lines):
+            if idx == 0:
+                header = line
+            match = LEXER.search(line)
+            if match is None:
+                continue
+
+            if match.group('fence') is not None:
+                # Každý ``` riadok ukončí rozbehnutý príklad, ```vstup / ```vystup začne nový
+                if sample is not None:
+                    samples.append(SampleBlock(sample[0], sample[1], idx))
+                    sample = None
+                info = match.group('fence_info')
+                if info.startswith(SAMPLE_FENCES):
+                    sample = (info, idx + 1)
+            elif match.group('listing') is not None:
+                listings.append(ListingReference(idx, match.group('listing_name')))
+            else:
+                directives.append(Directive(idx, match.group('directive'), match.group('value')))
+
+        if sample is not None:
+            samples.append(SampleBlock(sample[0], sample[1], idx + 1))
+
+        return Document(header, tuple(directives), tuple(samples), tuple(listings))
+
+    def directives_of(self, kind):
+        return [directive for directive in self.directives if directive.kind == kind]
+
+
+def index_lines(data):
+    """Bajtové offsety začiatkov riadkov v `data` (posledný prvok je koniec dát)."""
+
+    offsets = array('q', [0])
+    position = data.find(b'\n')
+    while position != -1:
+        offsets.append(position + 1)
+        position = data.find(b'\n', position + 1)
+    if offsets[-1] != len(data):
+        offsets.append(len(data))
+    return offsets
+
+
+# Základ sparsovaných entít. Po sparsovaní sa entita zmrazí a odvtedy je read-only -- všetky testy
+# zdieľajú tie isté objekty, takže test ktorý by ich omylom zmenil by rozbil všetky ostatné. Pokus o
+# zmenu radšej hneď spadne.
+#
+# Entita si po sparsovaní nedrží text súboru, iba vyparsované metadáta a bajtové offsety začiatkov
+# riadkov spolu s (veľkosť, mtime_ns) súboru z čítania, z ktorého vznikli. `line(n)` potom prečíta
+# zo súboru iba svoj riadok. Ak sa súbor odvtedy zmenil, prečíta sa celý a zaindexuje znova; text
+# a offsety sú tak vždy z toho istého čítania. Text ktorý prišiel zvonku (napr. neuložený buffer
+# z editora) si entita drží, lebo na disku nie je.
+class Model():
+    __slots__ = ('_frozen', 'filename', '_data', '_index')
+
+    def __init__(self, filename=None, text=None):
+        self.filename = filename
+        self._data = text.encode('utf-8') if text is not None else None
+        # Dvojica (stamp, offsety), mení sa iba naraz. Text v pamäti má stamp None.
+        self._index = None
+        if self._in_memory:
+            self._index = (None, index_lines(self._data or b""))
+
+    @property
+    def _in_memory(self):
+        return self._data is not None or self.filename is None
+
+    def _indexed(self, model_file):
+        """Offsety riadkov otvoreného súboru. Ak nesedí stamp, súbor prečíta celý a zaindexuje
+        znova. Vráti (offsety, prečítané bajty alebo None)."""
+
+        info = os.fstat(model_file.fileno())
+        stamp = (info.st_size, info.st_mtime_ns)
+        index = self._index
+        if index is not None and index[0] == stamp:
+            return index[1], None
+        data = model_file.read()
+        index = (stamp, index_lines(data))
+        object.__setattr__(self, '_index', index)
+        return index[1], data
+
+    def _snapshot(self):
+        """Celý text v bajtoch a offsety jeho riadkov, oboje z toho istého čítania."""
+
+        if self._in_memory:
+            return self._data or b"", self._index[1]
+        # Binary read mode lebo zachovajme newlines
+        with open(self.filename, 'rb') as model_file:
+            offsets, data = self._indexed(model_file)
+            if data is None:
+                data = model_file.read()
+        return data, offsets
+
+    @property
+    def plaintext(self):
+        if self._data is None and self.filename is None:
+            return None
+        return self._snapshot()[0].decode("utf-8")
+
+    @property
+    def line_offsets(self):
+        """Bajtové offsety začiatkov riadkov (posledný prvok je koniec textu)."""
+
+        if self._in_memory:
+            return tuple(self._index[1])
+        with open(self.filename, 'rb') as model_file:
+            return tuple(self._indexed(model_file)[0])
+
+    @property
+    def line_count(self):
+        return len(self.line_offsets) - 1
+
+    def line(self, number):
+        """Vráti riadok číslo `number` (od 1) aj s koncom riadku."""
+
+        if self._in_memory:
+            data, offsets = self._snapshot()
+            return data[offsets[number - 1]:offsets[number]].decode("utf-8")
+        with open(self.filename, 'rb') as model_file:
+            offsets, data = self._indexed(model_file)
+            start, end = offsets[number - 1], offsets[number]
+            if data is not None:
+                return data[start:end].decode("utf-8")
+            model_file.seek(start)
+            return model_file.read(end - start).decode("utf-8")
+
+    def lines(self):
+        """Iteruje cez riadky textu (aj s koncami riadkov), text sa prečíta iba raz."""
+
+        data, offsets = self._snapshot()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode("utf-8")
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("{0} je read-only, atribút {1} sa nedá zmeniť"
+                                 .format(type(self).__name__, name))
+        object.__setattr__(self, name, value)
+
+    def __delattr__(self, name):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("{0} je read-only, atribút {1} sa nedá zmazať"
+                                 .format(type(self).__name__, name))
+        object.__delattr__(self, name)
+
+    def freeze(self):
+        self.points = MappingProxyType(dict(self.points))
+        self.bypass = tuple(self.bypass)
+        self._frozen = True
+        return self
+
+
+class Task(Model):
+    __slots__ = ('name', 'number', 'points', 'author', 'proofreader', 'bypass', 'document',
+                 'time_limits')
+
     def __init__(self, task_filename=None, task_text=None):
-        self.plaintext = task_text
-        self.filename = task_filename
+        super().__init__(task_filename, task_text)
 
         self.name = None
         self.number = None
@@ -17,14 +212,26 @@ class Task():
         self.proofreader = None
 
         self.bypass = []
+        self.document = None
 
-    @staticmethod
-    def parse(logger, task_filename):
-        # Binary read mode lebo zachovajme newlines
-        task_file = open(task_filename, 'rb')
-        task = Task(task_filename, task_file.read().decode("utf-8"))
+        # Časové limity v sekundách podľa jazyka (napr. "py"), pod kľúčom None je default
+        self.time_limits = {}
+
+    def freeze(self):
+        self.time_limits = MappingProxyType(dict(self.time_limits))
+        return super().freeze()
 
-        lines = task.plaintext.splitlines()
+    def time_limit_for(self, language):
+        """Časový limit pre listing v danom jazyku, alebo None ak úloha limit nemá."""
+
+        return self.time_limits.get(language, self.time_limits.get(None))
+
+    @staticmethod
+    def parse(logger, task_filename, task_text=None):
+        # Text môže prísť aj zvonku (napr. neuložený buffer z editora), vtedy súbor nečítame. Text
+        # z disku si po sparsovaní nedržíme, načíta sa znova až keď ho niekto bude chcieť.
+        task = Task(task_filename, task_text)
+        task.document = Document.lex(line.rstrip('\r\n') for line in task.lines())
 
         # Vyparsujeme číslo príkladu
         fname = os.path.basename(task.filename)
@@ -38,7 +245,7 @@ class Task():
         # Vyparsujme meno príkladu
         try:
             # Regex ktoý chce matchnúť meno príkladu (po # a pred {} s bodmi)
-            found_task_name = re.search('\.?#([^{}]*)', lines[0]).group(1)
+            found_task_name = re.search('\.?#([^{}]*)', task.document.header).group(1)
             task.name = found_task_name.strip()
         except (AttributeError, IndexError):
             logger.logIssue(logging.WARNING, Issue("Nepodarilo sa zistiť meno príkladu!", fname))
@@ -46,40 +253,53 @@ class Task():
         # Vyparsujeme body za príklad
         try:
             # Regex ktorý chce matchnúť čísleka s bodmi
-            found_points = re.search('{bodypopis=([0-9]*) bodyprogram=([0-9]*)}', lines[0])
+            found_points = re.search('{bodypopis=([0-9]*) bodyprogram=([0-9]*)}',
+                                     task.document.header)
             task.points["bodypopis"] = int(found_points.group(1))
             task.points["bodyprogram"] = int(found_points.group(2))
         except (AttributeError, IndexError, ValueError):
             logger.logIssue(logging.WARNING, Issue("Nepodarilo sa zistiť body za príklad!", fname))
 
-        for idx, line in enumerate(lines):
+        for directive in task.document.directives:
             # Vyparsujeme autora
-            found_author = re.search('%by (.*)', line)
-            if found_author:
+            if directive.kind == "by":
                 if task.author is not None:
-                    logger.warning('Úloha %s má údajne viac autorov!', task.filename)
-                task.author = found_author.group(1)
+                    logger.logIssue(logging.WARNING, Issue('Úloha má údajne viac autorov!',
+                                                           fname, directive.line+1))
+                task.author = directive.value
 
             # Vyparsujeme ktoré testy máme preskočiť
-            found_skiptest = re.search('%skiptest (.*)', line)
-            if found_skiptest:
-                task.bypass.append(found_skiptest.group(1))
+            elif directive.kind == "skiptest":
+                task.bypass.append(directive.value)
 
             # Vyparsujeme proofreadera
-            found_proofreader = re.search('%proofread (.*)', line)
-            if found_proofreader:
+            elif directive.kind == "proofread":
                 if task.proofreader is not None:
                     logger.logIssue(logging.WARNING, Issue('Úloha má údajne viac proofreaderov!',
-                                                           fname, idx+1))
-                task.proofreader = found_proofreader.group(1)
+                                                           fname, directive.line+1))
+                task.proofreader = directive.value
+
+            # Vyparsujeme časový limit: `%timelimit 2` alebo pre jeden jazyk `%timelimit py 10`
+            elif directive.kind == "timelimit":
+                words = directive.value.split()
+                try:
+                    language = words[0] if len(words) == 2 else None
+                    if len(words) not in (1, 2):
+                        raise ValueError(directive.value)
+                    task.time_limits[language] = float(words[-1])
+                except ValueError:
+                    logger.logIssue(logging.WARNING, Issue('Nerozumiem časovému limitu "{0}"!'
+                                                           .format(directive.value),
+                                                           fname, directive.line+1))
 
-        return task
+        return task.freeze()
 
 
-class Solution():
+class Solution(Model):
+    __slots__ = ('name', 'number', 'points', 'author', 'bypass', 'document')
+
     def __init__(self, solution_filename=None, solution_text=None):
-        self.plaintext = solution_text
-        self.filename = solution_filename
+        super().__init__(solution_filename, solution_text)
 
         self.name = None
         self.number = None
@@ -87,14 +307,18 @@ class Solution():
         self.author = None
 
         self.bypass = []
+        self.document = None
 
-    @staticmethod
-    def parse(logger, solution_filename):
-        # Binary read mode lebo zachovajme newlines
-        solution_file = open(solution_filename, 'rb')
-        solution = Solution(solution_filename, solution_file.read().decode("utf-8"))
+    @property
+    def listings(self):
+        return self.document.listings if self.document is not None else ()
 
-        lines = solution.plaintext.splitlines()
+    @staticmethod
+    def parse(logger, solution_filename, solution_text=None):
+        # Text môže prísť aj zvonku (napr. neuložený buffer z editora), vtedy súbor nečítame. Text
+        # z disku si po sparsovaní nedržíme, načíta sa znova až keď ho niekto bude chcieť.
+        solution = Solution(solution_filename, solution_text)
+        solution.document = Document.lex(line.rstrip('\r\n') for line in solution.lines())
 
         # Vyparsujeme číslo príkladu
         fname = os.path.basename(solution.filename)
@@ -108,7 +332,7 @@ class Solution():
         # Vyparsujme meno príkladu
         try:
             # Regex ktoý chce matchnúť meno príkladu (po # a pred {} s bodmi)
-            found_solution_name = re.search('\.?#([^{}]*)', lines[0]).group(1)
+            found_solution_name = re.search('\.?#([^{}]*)', solution.document.header).group(1)
             solution.name = found_solution_name.strip()
         except (AttributeError, IndexError):
             logger.logIssue(logging.WARNING, Issue("Nepodarilo sa zistiť meno príkladu!", fname))
@@ -117,7 +341,7 @@ class Solution():
         try:
             # Regex ktorý chce matchnúť autora a čísleka s bodmi
             found = re.search('{vzorak="([^"]*)" bodypopis=([0-9]*) bodyprogram=([0-9]*)}',
-                              lines[0])
+                              solution.document.header)
             solution.author = found.group(1)
             solution.points["bodypopis"] = int(found.group(2))
             solution.points["bodyprogram"] = int(found.group(3))
@@ -125,11 +349,34 @@ class Solution():
             logger.logIssue(logging.WARNING, Issue("Nepodarilo sa zistiť autora a body za príklad!",
                             fname))
 
-        for idx, line in enumerate(lines):
+        # Vyparsujeme ktoré testy máme preskočiť
+        for directive in solution.document.directives_of("skiptest"):
+            solution.bypass.append(directive.value)
 
-            # Vyparsujeme ktoré testy máme preskočiť
-            found_skiptest = re.search('%skiptest (.*)', line)
-            if found_skiptest:
-                solution.bypass.append(found_skiptest.group(1))
+        return solution.freeze()
+
+
+# Vstupy jednej úlohy: read-only mapovanie meno súboru -> cesta k nemu, plus číslo úlohy a folder z
+# ktorého sú vstupy.
+class TaskInputs(Mapping):
+    __slots__ = ('number', 'folder', '_files')
+
+    def __init__(self, number, folder, files):
+        object.__setattr__(self, 'number', number)
+        object.__setattr__(self, 'folder', folder)
+        object.__setattr__(self, '_files', dict(files))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TaskInputs je read-only, atribút {0} sa nedá zmeniť".format(name))
+
+    def __getitem__(self, key):
+        return self._files[key]
+
+    def __iter__(self):
+        return iter(self._files)
+
+    def __len__(self):
+        return len(self._files)
 
-        return solution
+    def __repr__(self):
+        return "TaskInputs({0}, {1!r}, {2!r})".format(self.number, self.folder, self._files)
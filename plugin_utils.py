@@ -0,0 +1,81 @@
+import os
+import json
+import hashlib
+import importlib
+
+# Moduly s testami v poradí v akom sa registrujú. Nový modul s testami treba pridať sem.
+PLUGINS = ("tests_tasks", "tests_solutions", "tests_execution", "tests_inputs", "tests_archive")
+
+# Manifest leží vedľa check.py. Pre každý test pamätá modul a metadáta z dekorátora @test, aby
+# `-p`, kontrola `-r` / `-s` a výber modulov nemuseli importovať kód testov.
+MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'plugins.json')
+
+# Kľúče registra testov ktoré sa dajú uložiť do manifestu
+MANIFEST_KEYS = ("doc", "require", "depends", "cost")
+
+
+def plugin_path(module):
+    return os.path.join(os.path.dirname(MANIFEST), module + '.py')
+
+
+def module_hashes():
+    """Hash obsahu každého modulu s testami. Manifest je platný, kým sa hashe nezmenia."""
+
+    hashes = {}
+    for module in PLUGINS:
+        with open(plugin_path(module), 'rb') as plugin_file:
+            hashes[module] = hashlib.sha1(plugin_file.read()).hexdigest()
+    return hashes
+
+
+def build_manifest():
+    """Naimportuje všetky moduly s testami a zapíše čo o testoch vie register."""
+
+    from test_utils import test
+    for module in PLUGINS:
+        importlib.import_module(module)
+    tests = {}
+    for name, tst in test.all.items():
+        tests[name] = {"module": tst["module"]}
+        tests[name].update((key, tst[key]) for key in MANIFEST_KEYS)
+    return {"modules": module_hashes(), "tests": tests}
+
+
+def load_manifest(path=MANIFEST):
+    """Vráti manifest; ak chýba alebo sa odvtedy zmenil niektorý modul, vyrobí ho nanovo."""
+
+    try:
+        with open(path, encoding='utf-8') as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get("modules") == module_hashes():
+            return manifest
+    except (OSError, ValueError):
+        pass
+
+    manifest = build_manifest()
+    try:
+        with open(path, 'w', encoding='utf-8') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2, ensure_ascii=False)
+            manifest_file.write('\n')
+    except OSError:
+        # Checker môže bežať z foldra kam nemá právo písať, manifest si vyrobí nabudúce znova
+        pass
+    return manifest
+
+
+def import_tests(names, manifest):
+    """Naimportuje iba moduly ktoré obsahujú testy `names`.
+
+    Vráti {meno: test} v poradí manifestu."""
+
+    from test_utils import test
+    modules = {manifest["tests"][name]["module"] for name in names}
+    for module in PLUGINS:
+        if module in modules:
+            importlib.import_module(module)
+    return {name: test.all[name] for name in manifest["tests"] if name in names}
+
+
+def import_all(manifest=None):
+    manifest = manifest or load_manifest()
+    return import_tests(list(manifest["tests"]), manifest)
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profiler ktorý práve beží (nastavuje ho Profiler.start). Audit hook a toolchain doň hlásia
+# otvorené súbory a spustené procesy.
+active = None
+
+# Audit hook sa nedá odobrať, preto sa nainštaluje iba raz za proces (pri prvom Profiler.start)
+# a hlási vždy do `active`
+hook_installed = False
+hook_lock = threading.Lock()
+
+
+def children_cpu_time():
+    """CPU čas všetkých skončených child procesov (compilery...) v sekundách."""
+
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def bytes_read():
+    """Koľko bajtov proces zatiaľ prečítal (Linux /proc/self/io), alebo None ak to nevieme."""
+
+    try:
+        with open('/proc/self/io', 'rb') as io_stats:
+            for line in io_stats:
+                if line.startswith(b'rchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def audit_hook(event, args):
+    profiler = active
+    if profiler is None or profiler.current is None:
+        return
+    if event == 'open':
+        counter = "files_opened"
+    elif event == 'subprocess.Popen':
+        counter = "subprocesses_spawned"
+    else:
+        return
+    # Kompilácie môžu bežať na viacerých vláknach naraz
+    with profiler.lock:
+        if profiler.current is not None:
+            profiler.current[counter] += 1
+
+
+def install_audit_hook():
+    global hook_installed
+    with hook_lock:
+        if not hook_installed:
+            sys.addaudithook(audit_hook)
+            hook_installed = True
+
+
+def record_subprocess(command, duration):
+    """Toolchain týmto hlási dobehnutý externý proces a ako dlho trval."""
+
+    profiler = active
+    if profiler is not None and profiler.current is not None:
+        with profiler.lock:
+            profiler.current["subprocesses"].append({"command": command, "duration": duration})
+
+
+# Meria jednotlivé testy: wall time, CPU time (aj child procesov), prečítané bajty, počet otvorených
+# súborov, spustené procesy a peak pamäte (tracemalloc). Voliteľne ku každému testu uloží cProfile
+# dump. Čísla sú za celý proces, preto s profilerom bežia testy sériovo.
+class Profiler():
+    def __init__(self, dump_directory=None):
+        self.dump_directory = dump_directory
+        self.results = {}
+        self.current = None
+        self.lock = threading.Lock()
+
+    def start(self):
+        global active
+        active = self
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        install_audit_hook()
+        if self.dump_directory:
+            os.makedirs(self.dump_directory, exist_ok=True)
+
+    def stop(self):
+        global active
+        active = None
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def measure(self, test_name, function):
+        profile = cProfile.Profile() if self.dump_directory else None
+
+        # Čítanie /proc/self/io sa nesmie zarátať medzi súbory otvorené testom
+        read_before = bytes_read()
+        self.current = {"files_opened": 0, "subprocesses_spawned": 0, "subprocesses": []}
+        tracemalloc.reset_peak()
+        memory_before = tracemalloc.get_traced_memory()[0]
+        children_before = children_cpu_time()
+        cpu_before = time.process_time()
+        wall_before = time.perf_counter()
+
+        if profile is not None:
+            profile.enable()
+        try:
+            return function()
+        finally:
+            if profile is not None:
+                profile.disable()
+            wall = time.perf_counter() - wall_before
+            cpu = time.process_time() - cpu_before + children_cpu_time() - children_before
+            peak = tracemalloc.get_traced_memory()[1] - memory_before
+            with self.lock:
+                stats = self.current
+                self.current = None
+            read_after = bytes_read()
+
+            stats.update({"wall_time": wall,
+                          "cpu_time": cpu,
+                          "bytes_read": (read_after - read_before
+                                         if read_before is not None and read_after is not None
+                                         else None),
+                          "peak_memory": max(peak, 0)})
+            self.results[test_name] = stats
+            if profile is not None:
+                profile.dump_stats(os.path.join(self.dump_directory, test_name + '.pstats'))
+
+    def table(self):
+        """Tabuľka výsledkov zoradená od najpomalšieho testu."""
+
+        header = "{0:40} {1:>9} {2:>9} {3:>11} {4:>6} {5:>6} {6:>10}".format(
+            "test", "wall [s]", "cpu [s]", "read [KB]", "files", "procs", "peak [KB]")
+        rows = [header, "-" * len(header)]
+        for test_name, stats in sorted(self.results.items(),
+                                       key=lambda item: -item[1]["wall_time"]):
+            read = stats["bytes_read"]
+            rows.append("{0:40} {1:9.3f} {2:9.3f} {3:>11} {4:6} {5:6} {6:10.1f}".format(
+                test_name, stats["wall_time"], stats["cpu_time"],
+                "?" if read is None else "{0:.1f}".format(read / 1024),
+                stats["files_opened"], stats["subprocesses_spawned"],
+                stats["peak_memory"] / 1024))
+        return "\n".join(rows)
+
+    def dump_json(self, path):
+        with open(path, 'w') as json_file:
+            json.dump(self.results, json_file, indent=2, sort_keys=True)
@@ -0,0 +1,138 @@
+import sys
+import json
+import logging
+import threading
+
+from issue_utils import IssueLogger
+
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+# Severity z modulu logging -> level v SARIF
+SARIF_LEVELS = {logging.CRITICAL: "error", logging.ERROR: "error", logging.WARNING: "warning",
+                logging.INFO: "note", logging.DEBUG: "note"}
+
+
+def test_name_of(logger_name):
+    """Z mena loggera ('checker.taskComplete') vyrobí meno testu ('taskComplete')."""
+
+    return logger_name[len('checker.'):] if logger_name.startswith('checker.') else logger_name
+
+
+# IssueLogger ktorý posiela všetko viacerým loggerom naraz (napr. do konzoly aj do JSON Lines).
+class TeeIssueLogger(IssueLogger):
+    def __init__(self, loggers):
+        self.loggers = loggers
+
+    def logMessage(self, severity, message):
+        for logger in self.loggers:
+            logger.logMessage(severity, message)
+
+    def logIssue(self, severity, issue):
+        for logger in self.loggers:
+            logger.logIssue(severity, issue)
+
+
+def tee_logger_class(*logger_classes):
+    """Vyrobí "triedu" loggera (callable logger_name -> IssueLogger) ktorá loguje do všetkých."""
+
+    def factory(logger_name):
+        return TeeIssueLogger([logger_class(logger_name) for logger_class in logger_classes])
+    return factory
+
+
+# Spoločný základ reportov. Report dostáva issues cez IssueLoggery ktoré sám vyrába (metóda
+# `issueLogger`, dá sa použiť ako logger_class) a výsledky testov cez `logResult`.
+class Reporter():
+    def issueLogger(self, logger_name):
+        return ReporterIssueLogger(self, logger_name)
+
+    def logIssue(self, test_name, severity, issue):
+        pass
+
+    def logResult(self, test_name, status):
+        pass
+
+    def close(self, results):
+        pass
+
+
+class ReporterIssueLogger(IssueLogger):
+    def __init__(self, reporter, logger_name):
+        self.reporter = reporter
+        self.test_name = test_name_of(logger_name)
+
+    def logMessage(self, severity, message):
+        pass
+
+    def logIssue(self, severity, issue):
+        self.reporter.logIssue(self.test_name, severity, issue)
+
+
+# Streamuje issues ako JSON Lines (jeden JSON objekt na riadok) ešte počas behu testov. Zápisy sú
+# buffrované, flushuje sa po dobehnutí každého testu, takže CI vidí výsledky priebežne.
+class JsonLinesReporter(Reporter):
+    def __init__(self, stream, owns_stream=False):
+        self.stream = stream
+        self.owns_stream = owns_stream
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def open(path):
+        if path == '-':
+            return JsonLinesReporter(sys.stdout)
+        return JsonLinesReporter(open(path, 'w', encoding='utf-8', buffering=1024 * 1024), True)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self.lock:
+            self.stream.write(line)
+
+    def logIssue(self, test_name, severity, issue):
+        self.write({"type": "issue", "test": test_name, "severity": logging.getLevelName(severity),
+                    "file": issue.file or None, "line": issue.line, "message": issue.message})
+
+    def logResult(self, test_name, status):
+        self.write({"type": "result", "test": test_name, "status": status.name})
+        with self.lock:
+            self.stream.flush()
+
+    def close(self, results):
+        self.write({"type": "summary",
+                    "results": {status.name: count for status, count in results.items()}})
+        with self.lock:
+            self.stream.flush()
+            if self.owns_stream:
+                self.stream.close()
+
+
+# Zbiera issues a na konci zapíše report vo formáte SARIF 2.1.0 (rozumie mu napr. GitHub code
+# scanning). Každý test je jedno pravidlo (rule), každé issue jeden result.
+class SarifReporter(Reporter):
+    def __init__(self, path, tests):
+        self.path = path
+        self.tests = tests
+        self.results = []
+        self.lock = threading.Lock()
+
+    def logIssue(self, test_name, severity, issue):
+        result = {"ruleId": test_name,
+                  "level": SARIF_LEVELS.get(severity, "note"),
+                  "message": {"text": issue.message}}
+        if issue.file:
+            location = {"artifactLocation": {"uri": issue.file}}
+            if issue.line:
+                location["region"] = {"startLine": issue.line}
+            result["locations"] = [{"physicalLocation": location}]
+        with self.lock:
+            self.results.append(result)
+
+    def close(self, results):
+        rules = [{"id": test_name,
+                  "shortDescription": {"text": (tst["doc"] or test_name).strip().splitlines()[0]}}
+                 for test_name, tst in self.tests.items()]
+        sarif = {"$schema": SARIF_SCHEMA,
+                 "version": "2.1.0",
+                 "runs": [{"tool": {"driver": {"name": "ksp-checker", "rules": rules}},
+                           "results": self.results}]}
+        with open(self.path, 'w', encoding='utf-8') as sarif_file:
+            json.dump(sarif, sarif_file, ensure_ascii=False, indent=2)
@@ -0,0 +1,259 @@
+import os
+import math
+import time
+import signal
+import logging
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows, limity procesov nevieme nastaviť
+    resource = None
+
+import profile_utils
+import deadline_utils
+from deadline_utils import kill_group
+
+logger = logging.getLogger('checker')
+
+# Po koľkých bajtoch porovnávame výstupy
+CHUNK_SIZE = 1024 * 1024
+
+# Wall time limit je CPU limit * WALL_FACTOR + WALL_EXTRA (proces môže aj čakať na disk)
+WALL_FACTOR = 2
+WALL_EXTRA = 1.0
+
+# Ako často sa počas behu číta peak RSS procesu: najprv každú milisekundu, interval sa zdvojnásobuje
+# až po RSS_POLL_MAX, dlhým behom stačí čítať zriedka
+RSS_POLL_START = 0.001
+RSS_POLL_MAX = 0.02
+
+
+# Limity jedného behu riešenia
+class Limits():
+    def __init__(self, time=10.0, memory=1024 * 1024 * 1024, output=1024 * 1024 * 1024, cpu=None):
+        self.time = time  # CPU čas v sekundách
+        self.memory = memory  # Adresný priestor v bajtoch
+        self.output = output  # Maximálna veľkosť výstupu v bajtoch
+        self.cpu = cpu  # Na ktorom jadre má proces bežať (None = kdekoľvek)
+
+    @property
+    def wall_time(self):
+        return self.time * WALL_FACTOR + WALL_EXTRA
+
+
+# Výsledok jedného behu. Status je "OK", "WA" (zlý výstup), "TLE" (časový limit), "OLE" (príliš
+# veľký výstup) alebo "RE" (pád / nenulový návratový kód). Čas je wall time, `cpu_time` je
+# z rusage procesu, `max_rss` je peak RSS v bajtoch (viď wait_with_usage).
+class RunResult():
+    def __init__(self, status, time=0.0, returncode=0, line=None, cpu_time=None, max_rss=None):
+        self.status = status
+        self.time = time
+        self.returncode = returncode
+        self.line = line  # Pri "WA" prvý riadok v ktorom sa výstup líši
+        self.cpu_time = cpu_time
+        self.max_rss = max_rss
+
+    @property
+    def ok(self):
+        return self.status == "OK"
+
+
+def limit_resources(limits):
+    """Vráti preexec_fn, ktorá v child procese nastaví rlimity (a pripne ho na jadro)."""
+
+    if resource is None:
+        return None
+
+    def preexec():
+        if limits.cpu is not None and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(0, {limits.cpu})
+        cpu = int(math.ceil(limits.time))
+        # Po soft limite príde SIGXCPU, po hard limite SIGKILL
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+        resource.setrlimit(resource.RLIMIT_AS, (limits.memory, limits.memory))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (limits.output, limits.output))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    return preexec
+
+
+def peak_rss(pid):
+    """VmHWM procesu (pid alebo 'self') z /proc v bajtoch, None ak sa nedá zistiť (nie je Linux,
+    proces už skončil)."""
+
+    try:
+        with open('/proc/{0}/status'.format(pid), 'rb') as status:
+            for line in status:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def wait_with_usage(process):
+    """Počká na proces a vráti (návratový kód, CPU čas, peak RSS v bajtoch).
+
+    ru_maxrss z rusage zahŕňa aj forknutého checkera pred exec-om, peak RSS sa preto počas behu
+    číta z VmHWM v /proc (ten sa pri exec-e vynuluje). Samplovanie je iba dolný odhad, pamäť ktorú
+    proces zaberie tesne pred koncom sa nemusí stihnúť prečítať. Ak je ale ru_maxrss väčší ako
+    peak checkera (viac než mohol mať forknutý checker), je to presne peak riešenia po exec-e. Bez
+    /proc je None."""
+
+    if not hasattr(os, 'wait4'):
+        return process.wait(), None, None
+    # Prvé čítanie hneď po exec-e iba overí, že /proc máme, ešte nie je načítaný ani dynamický
+    # linker. Beh ktorý skončí skôr ako ho sampler stihne prečítať má peak None.
+    peaks = []
+    if peak_rss(process.pid) is not None and hasattr(os, 'waitid'):
+        stopped = threading.Event()
+
+        def sample():
+            interval = RSS_POLL_START
+            while not stopped.wait(interval):
+                peaks.append(peak_rss(process.pid))
+                interval = min(interval * 2, RSS_POLL_MAX)
+        sampler = threading.Thread(target=sample, name='checker-rss', daemon=True)
+        sampler.start()
+        try:
+            # Kým sampler číta /proc, proces nezoberieme, inak by jeho pid mohol dostať iný proces
+            os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        finally:
+            stopped.set()
+            sampler.join()
+    _, status, usage = os.wait4(process.pid, 0)
+    # Proces sme zobrali sami, Popen ho už nesmie čakať znova
+    process.returncode = os.waitstatus_to_exitcode(status)
+    max_rss = max((peak for peak in peaks if peak is not None), default=None)
+    checker_peak = peak_rss('self')
+    if checker_peak is not None and usage.ru_maxrss * 1024 > checker_peak:
+        max_rss = max(max_rss or 0, usage.ru_maxrss * 1024)
+    return process.returncode, usage.ru_utime + usage.ru_stime, max_rss
+
+
+def outputs_match(expected, actual):
+    """Porovná dva binárne streamy. Vráti None ak sa zhodujú, inak číslo prvého rôzneho riadku.
+
+    Súbory sa nikdy nečítajú celé. Najskôr sa porovnávajú po blokoch, rovnaké bloky sa preskočia.
+    Až od bloku s rozdielom sa porovnáva po riadkoch, bez whitespace-u na konci riadkov a prázdnych
+    riadkov na konci súboru."""
+
+    lines_before = 0
+    while True:
+        expected_chunk = expected.read(CHUNK_SIZE)
+        actual_chunk = actual.read(CHUNK_SIZE)
+        if expected_chunk != actual_chunk:
+            break
+        if not expected_chunk:
+            return None
+        # Porovnávanie po riadkoch začne od začiatku posledného (možno nekompletného) riadku
+        last_line = expected_chunk.rfind(b'\n') + 1
+        lines_before += expected_chunk.count(b'\n', 0, last_line)
+        if 0 < last_line < len(expected_chunk):
+            expected.seek(last_line - len(expected_chunk), os.SEEK_CUR)
+            actual.seek(last_line - len(actual_chunk), os.SEEK_CUR)
+    expected.seek(-len(expected_chunk), os.SEEK_CUR)
+    actual.seek(-len(actual_chunk), os.SEEK_CUR)
+
+    line = lines_before
+    while True:
+        expected_line = expected.readline()
+        actual_line = actual.readline()
+        line += 1
+        if not expected_line and not actual_line:
+            return None
+        if expected_line.rstrip() != actual_line.rstrip():
+            if not expected_line and not actual_line.strip():
+                # Prázdne riadky navyše na konci výstupu nevadia, pokiaľ za nimi nič nie je
+                if not actual.read().strip():
+                    return None
+            if not actual_line and not expected_line.strip():
+                if not expected.read().strip():
+                    return None
+            return line
+
+
+def run_limited(command, input_filename, expected_filename, limits):
+    """Spustí riešenie na vstupe s limitmi a porovná výstup s očakávaným."""
+
+    deadline_utils.check()
+    with open(input_filename, 'rb') as stdin, tempfile.TemporaryFile() as stdout:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdin=stdin, stdout=stdout,
+                                   stderr=subprocess.DEVNULL, start_new_session=True,
+                                   preexec_fn=limit_resources(limits))
+        timed_out = threading.Event()
+
+        def timeout():
+            timed_out.set()
+            kill_group(process)
+        timer = threading.Timer(limits.wall_time, timeout)
+        timer.start()
+        try:
+            with deadline_utils.tracked(process):
+                returncode, cpu_time, max_rss = wait_with_usage(process)
+        finally:
+            timer.cancel()
+        elapsed = time.perf_counter() - start
+        profile_utils.record_subprocess(' '.join(command), elapsed)
+        # Beh zabitý kvôli zrušenému testu nie je TLE riešenia
+        deadline_utils.check()
+
+        usage = {"cpu_time": cpu_time, "max_rss": max_rss}
+        if timed_out.is_set() or returncode in (-signal.SIGXCPU, -signal.SIGKILL):
+            return RunResult("TLE", elapsed, returncode, **usage)
+        if returncode == -signal.SIGXFSZ:
+            return RunResult("OLE", elapsed, returncode, **usage)
+        if returncode != 0:
+            return RunResult("RE", elapsed, returncode, **usage)
+
+        stdout.seek(0)
+        with open(expected_filename, 'rb') as expected:
+            line = outputs_match(expected, stdout)
+        if line is not None:
+            return RunResult("WA", elapsed, returncode, line, **usage)
+        return RunResult("OK", elapsed, returncode, **usage)
+
+
+# Pool na ktorom bežia riešenia na vstupoch. Rovnako ako pri kompilácii je to hlavne čakanie na
+# externé procesy, takže stačia vlákna.
+class Runner():
+    def __init__(self, jobs=None, limits=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.limits = limits or Limits()
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def configure(self, jobs=None, limits=None):
+        self.shutdown()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.limits = limits or Limits()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.jobs, thread_name_prefix='checker-run')
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def run_many(self, runs):
+        """Spustí behy (command, vstup, očakávaný výstup) na poole, výsledky vráti v poradí."""
+
+        def run(arguments):
+            command, input_filename, expected_filename = arguments
+            return run_limited(command, input_filename, expected_filename, self.limits)
+
+        if self.jobs == 1 or len(runs) < 2:
+            return list(map(run, runs))
+        return list(self.executor.map(deadline_utils.inherit(run), runs))
+
+runner = Runner()
@@ -0,0 +1,99 @@
+import re
+import threading
+
+# Po koľkých bajtoch čítame vstupy. Veľké bloky = málo syscallov, vyhľadávanie v nich robí
+# bytes.find / regex v C, takže Python sa nedotkne každého riadku.
+CHUNK_SIZE = 4 * 1024 * 1024
+
+# Whitespace na konci riadku (pred '\n' alebo '\r\n'). Zodpovedá tomu čo odstráni str.rstrip() pri
+# ASCII vstupoch, okrem '\r', ktoré je súčasťou Windowsáckeho konca riadku.
+TRAILING_WHITESPACE = re.compile(b'[ \t\x0b\x0c\x1c-\x1f]\r?\n')
+
+
+# Fakty o jednom súbore so vstupom / výstupom, ktoré zisťuje scanner. Čísla riadkov sú od 1.
+class InputFacts():
+    def __init__(self, filename):
+        self.filename = filename
+        self.size = 0
+        self.line_count = 0  # Počet '\n' v súbore
+        self.first_crlf_line = None  # Prvý riadok končiaci '\r\n', alebo None
+        self.trailing_whitespace_lines = []  # Riadky ktoré končia whitespace-om
+        self.last_byte = None  # Posledný bajt súboru, None ak je súbor prázdny
+
+    @property
+    def ends_with_newline(self):
+        return self.last_byte is None or self.last_byte == b'\n'
+
+
+def scan_file(filename):
+    """Prečíta súbor raz, sekvenčne, po veľkých blokoch a zistí o ňom všetky InputFacts."""
+
+    facts = InputFacts(filename)
+    with open(filename, 'rb', buffering=0) as inp_file:
+        # Zvyšok posledného bloku za posledným '\n' -- nekompletný riadok ktorý dokončí ďalší blok
+        carry = b''
+        lines_before = 0
+        while True:
+            chunk = inp_file.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            facts.size += len(chunk)
+            facts.last_byte = chunk[-1:]
+
+            block = carry + chunk if carry else chunk
+            cut = block.rfind(b'\n') + 1
+            carry = block[cut:]
+            _scan_block(facts, block, cut, lines_before)
+            lines_before += block.count(b'\n', 0, cut)
+
+        # Neukončený posledný riadok (bez '\n') sa vždy počítal ako riadok s whitespace-om na konci
+        if carry:
+            facts.trailing_whitespace_lines.append(lines_before + 1)
+        facts.line_count = lines_before
+    return facts
+
+
+def _scan_block(facts, block, end, lines_before):
+    # Prvé '\r\n' hľadáme iba kým sme ho nenašli
+    if facts.first_crlf_line is None:
+        position = block.find(b'\r\n', 0, end)
+        if position != -1:
+            facts.first_crlf_line = lines_before + block.count(b'\n', 0, position) + 1
+
+    position = 0
+    line = lines_before
+    for match in TRAILING_WHITESPACE.finditer(block, 0, end):
+        line += block.count(b'\n', position, match.start()) + 1
+        position = match.end()
+        facts.trailing_whitespace_lines.append(line)
+
+
+# Cache faktov o vstupoch, zdieľaná všetkými testami jedného behu. Každý súbor sa prečíta iba raz,
+# aj keď sa naň pýta viac testov naraz z rôznych vlákien.
+class InputScanner():
+    def __init__(self):
+        self.facts = {}
+        self.lock = threading.Lock()
+        self.file_locks = {}
+
+    def scan(self, filename):
+        with self.lock:
+            if filename in self.facts:
+                return self.facts[filename]
+            file_lock = self.file_locks.setdefault(filename, threading.Lock())
+
+        with file_lock:
+            with self.lock:
+                if filename in self.facts:
+                    return self.facts[filename]
+            facts = scan_file(filename)
+            with self.lock:
+                self.facts[filename] = facts
+                del self.file_locks[filename]
+            return facts
+
+    def clear(self):
+        with self.lock:
+            self.facts.clear()
+
+scanner = InputScanner()
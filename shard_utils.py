@@ -0,0 +1,82 @@
+import json
+
+from test_utils import TestResult
+from report_utils import JsonLinesReporter
+
+# Poradie pri spájaní výsledkov jedného testu zo shardov: vyhráva najhorší
+SEVERITY_ORDER = (TestResult.SKIP, TestResult.OK, TestResult.WARNING, TestResult.TIMEOUT,
+                  TestResult.ERROR)
+
+
+class ShardError(Exception):
+    pass
+
+
+def worst(statuses):
+    return max(statuses, key=SEVERITY_ORDER.index)
+
+
+# Čiastočný výsledok shardu: JSON Lines ako pri --json-lines, na začiatku s hlavičkou shardu
+class ShardReporter(JsonLinesReporter):
+    def __init__(self, path, shard):
+        super().__init__(open(path, 'w', encoding='utf-8', buffering=1024 * 1024), True)
+        index, count = shard
+        self.write({"type": "shard", "index": index, "count": count})
+
+
+def read_partial(path):
+    with open(path, encoding='utf-8') as partial:
+        records = [json.loads(line) for line in partial if line.strip()]
+    if not records or records[0].get("type") != "shard":
+        raise ShardError("{0} nie je výsledok shardu".format(path))
+    if records[-1].get("type") != "summary":
+        raise ShardError("{0} je neúplný, shard asi nedobehol".format(path))
+    return records
+
+
+def merge_partials(paths):
+    """Spojí čiastočné výsledky všetkých shardov.
+
+    Vráti (issues, statuses): issues sú záznamy zo shardov v poradí testov (problémy z parsovania
+    prvé a iba raz), statuses je {test: TestResult} s najhorším výsledkom testu zo všetkých
+    shardov."""
+
+    shards = {}
+    for path in paths:
+        records = read_partial(path)
+        header = records[0]
+        if header["index"] in shards:
+            raise ShardError("Shard {0} je tam dvakrát".format(header["index"]))
+        shards[header["index"]] = (header["count"], records[1:])
+
+    counts = {count for count, _ in shards.values()}
+    if len(counts) != 1:
+        raise ShardError("Výsledky sú z rôznych rozdelení ({0})".format(
+            ", ".join(str(count) for count in sorted(counts))))
+    count = counts.pop()
+    missing = [str(index) for index in range(1, count + 1) if index not in shards]
+    if missing:
+        raise ShardError("Chýbajú shardy " + ", ".join(missing))
+
+    statuses = {}
+    issues = {}
+    # Problémy z parsovania zaloguje každý shard, rovnaký záznam z iného shardu sa preskočí. V rámci
+    # jedného shardu sa nič nezahadzuje, test môže rovnaký problém nahlásiť naozaj viackrát.
+    seen = set()
+    for index in sorted(shards):
+        logged = set()
+        for record in shards[index][1]:
+            if record["type"] == "result":
+                status = TestResult[record["status"]]
+                statuses[record["test"]] = worst([statuses.get(record["test"], status), status])
+            elif record["type"] == "issue":
+                key = tuple(sorted(record.items()))
+                logged.add(key)
+                if key not in seen:
+                    issues.setdefault(record["test"], []).append(record)
+        seen |= logged
+    # Parser (`parser.task`, `parser.solution`) nemá záznam o výsledku, ide prvý ako pri behu bez
+    # shardov, testy potom v poradí ako sa prvýkrát objavili
+    order = sorted(issues, key=lambda test_name: not test_name.startswith('parser.'))
+    ordered_issues = [issue for test_name in order for issue in issues[test_name]]
+    return ordered_issues, statuses
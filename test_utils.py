@@ -1,6 +1,17 @@
+import os
+import heapq
+import argparse
+import hashlib
 import functools
 import logging
+import threading
 from enum import Enum
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+
+from issue_utils import Issue, BufferedIssueLogger
+import deadline_utils
+from deadline_utils import Deadline, run_with_deadline
 
 logger = logging.getLogger('checker')
 
@@ -10,23 +21,257 @@ class TestResult(Enum):
     SKIP = 1
     WARNING = 2
     ERROR = 3
+    TIMEOUT = 4  # Test nestihol svoj časový limit (alebo --time-budget) a bol zrušený
+
+
+# Stav jedného behu testov. Drží pooly na ktorých bežia testy a itemy z `for_each_item_in`. Pri
+# jobs == 1 žiadne pooly nevznikajú a všetko beží sériovo tak ako doteraz.
+#
+# Testy aj itemy majú vlastné pooly, lebo test čakajúci na svoje itemy by inak mohol obsadiť
+# všetkých workerov a itemy by sa nikdy nedostali na rad.
+#
+# Ak je nastavený `incremental` (viď incremental.py), testy ktoré deklarovali `reads` sa spúšťajú
+# iba ak sa od minulého behu zmenil niektorý zo súborov ktoré čítajú.
+#
+# Ak je nastavený `profiler` (viď profile_utils.py), každý test sa odmeria.
+#
+# Ak je nastavené `changed` (množina absolútnych ciest, viď git_utils.py), testy a itemy ktoré
+# deklarovali `reads` sa spustia iba ak čítajú niektorý zo zmenených súborov.
+#
+# Ak je nastavený `shard` (i, N), beh spraví iba svoju časť práce: itemy z `for_each_item_in` a
+# testy nad celým test_data sa rozdelia medzi N behov podľa hashu (viď shard_of). Testy s
+# `shard_by` dostanú z test_data iba itemy svojho shardu.
+#
+# Ak je nastavený `budget` (Deadline celého behu, --time-budget), testy ktoré ho nestihnú sa zrušia
+# s výsledkom TestResult.TIMEOUT. Rovnako dopadnú testy a itemy ktoré nestihnú svoj `timeout` /
+# `item_timeout` z dekorátora @test.
+#
+# Kontext si pamätá aj čo ktorý test našiel: testom ktoré od neho závisia (`depends`) sa potom
+# vynechajú itemy, ktoré v ňom zlyhali, a ak zlyhal celý, nespustia sa vôbec.
+class RunContext():
+    def __init__(self, jobs=1, incremental=None, profiler=None, changed=None, shard=None,
+                 budget=None):
+        self.jobs = max(1, jobs)
+        self.incremental = incremental
+        self.profiler = profiler
+        self.changed = changed
+        self.shard = shard
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.item_failures = {}
+        self.failures = {}
+        self.executor = None
+        self.item_executor = None
+        if self.jobs > 1:
+            self.executor = ThreadPoolExecutor(self.jobs, thread_name_prefix='checker-test')
+            self.item_executor = ThreadPoolExecutor(self.jobs, thread_name_prefix='checker-item')
+
+    def affects(self, paths):
+        """Či zmeny ovplyvňujú test / item ktorý číta `paths`."""
+
+        return self.changed is None or any(os.path.abspath(path) in self.changed
+                                           for path in paths)
+
+    def deadline(self, seconds, parent=None):
+        """Deadline pre test / item s limitom `seconds`, alebo None ak nemá žiadny limit."""
+
+        parent = parent or self.budget
+        if seconds is None and parent is None:
+            return None
+        return Deadline(seconds, parent)
+
+    def owns(self, key):
+        """Či jednotka práce s kľúčom `key` patrí tomuto shardu."""
+
+        return self.shard is None or shard_of(key, self.shard[1]) == self.shard[0]
+
+    def item_failed(self, test_name, items, key):
+        with self.lock:
+            self.item_failures.setdefault(test_name, set()).add((items, key))
+
+    def test_failed(self, test_name, per_item):
+        """Zaznamená že test zlyhal. Testy nad itemami zlyhali iba na itemoch ktoré zlyhali."""
+
+        with self.lock:
+            self.failures[test_name] = (self.item_failures.get(test_name, set()) if per_item
+                                        else WHOLE_TEST)
+
+    def failed_prerequisites(self, depends):
+        """Vráti WHOLE_TEST ak niektorý z testov zlyhal celý, inak množinu (kolekcia, item)
+        ktoré v nich zlyhali."""
+
+        failed = set()
+        with self.lock:
+            for test_name in depends:
+                failure = self.failures.get(test_name, set())
+                if failure is WHOLE_TEST:
+                    return WHOLE_TEST
+                failed |= failure
+        return failed
+
+    def shutdown(self):
+        for executor in (self.executor, self.item_executor):
+            if executor is not None:
+                executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def shard_of(key, count):
+    """Do ktorého shardu (od 1) patrí jednotka práce. Hash je stabilný medzi behmi aj strojmi."""
+
+    digest = hashlib.sha1(key.encode('utf-8', 'surrogateescape')).digest()
+    return int.from_bytes(digest[:8], 'big') % count + 1
+
+
+def shard_argument(text):
+    """Parser pre argparse: `i/N` -> (i, N), shardy sú číslované od 1."""
+
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("shard má byť v tvare i/N, napr. 2/4")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError("shard {0} nie je medzi 1 a {1}".format(index, count))
+    return index, count
+
+
+def freeze_test_data(test_data):
+    """Spraví z test_data read-only snapshot, ktorý môžu všetky testy zdieľať bez kopírovania.
+
+    Zoznamy sa zmenia na tuple, samotný dict na read-only mapping. Entity (Task, Solution,
+    TaskInputs) sú read-only už samé od seba."""
+
+    return MappingProxyType({key: tuple(value) if isinstance(value, list) else value
+                             for key, value in test_data.items()})
+
+
+# Značka pre test ktorý zlyhal celý, nie iba na niektorých itemoch
+WHOLE_TEST = object()
+
+# Kolekcie v test_data, v ktorých záleží na pozícii (vstupy úlohy n sú na indexe n-1). Vynechané
+# itemy sa v nich nahradia None namiesto toho aby sa vyhodili.
+POSITIONAL = ("inputs",)
+
+
+def prune(test_data, failed):
+    """Vráti test_data bez itemov, ktoré zlyhali v niektorom predpoklade."""
+
+    pruned = dict(test_data)
+    for items in {items for items, _ in failed}:
+        keys = {key for failed_items, key in failed if failed_items == items}
+        if not isinstance(test_data.get(items), tuple):
+            continue
+        if items in POSITIONAL:
+            pruned[items] = tuple(None if item_key(item, index) in keys else item
+                                  for index, item in enumerate(test_data[items]))
+        else:
+            pruned[items] = tuple(item for index, item in enumerate(test_data[items])
+                                  if item_key(item, index) not in keys)
+    return MappingProxyType(pruned)
+
+
+def schedule_order(tests, priority=None):
+    """Poradie v akom sa testy spúšťajú: každý test až po testoch od ktorých závisí, a spomedzi
+    testov ktoré môžu ísť na rad najskôr tie lacné (podľa `cost`, potom podľa registrácie).
+    `priority` ({test: kľúč}, napr. z history_utils.priority) môže `cost` nahradiť. Závislosti na
+    testoch ktoré sa nespúšťajú sa ignorujú. Pri cykle vyhodí ValueError."""
+
+    if priority is None:
+        priority = {name: tests[name].get("cost", 1) for name in tests}
+    names = list(tests)
+    index = {name: position for position, name in enumerate(names)}
+    waiting = {name: {dependency for dependency in tests[name].get("depends", ())
+                      if dependency in tests} for name in names}
+    dependents = {name: [] for name in names}
+    for name, dependencies in waiting.items():
+        for dependency in dependencies:
+            dependents[dependency].append(name)
+
+    ready = [(priority[name], index[name], name) for name in names if not waiting[name]]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        _, _, name = heapq.heappop(ready)
+        order.append(name)
+        for dependent in dependents[name]:
+            waiting[dependent].discard(name)
+            if not waiting[dependent]:
+                heapq.heappush(ready, (priority[dependent], index[dependent], dependent))
+    if len(order) != len(names):
+        raise ValueError("Cyklus v závislostiach testov: " +
+                         ", ".join(name for name in names if name not in order))
+    return order
 
 
 class TestRegistrar():
     def __init__(self):
         self.all = {}
 
-    def __call__(self, severity, require=[], ignore=False):
+    def __call__(self, severity, require=[], ignore=False, reads=None, depends=[], cost=1,
+                 shard_by=None, timeout=None, item_timeout=None):
         def registrar_decorator(func):
-            def wrapper(logger, test_data):
+            def run(logger, test_data, context):
+                # Kontext dostanú iba funkcie ktoré oň stoja (napr. for_each_item_in)
+                if getattr(func, 'uses_context', False):
+                    return func(logger, test_data, context)
+                return func(logger, test_data)
+
+            def checked_run(logger, test_data, context):
                 # Otestujeme či test má všetko potrebné pre svoj beh
                 for requirement in require:
                     if requirement not in test_data.keys() or not test_data[requirement]:
                         logger.logMessage(logging.DEBUG, 'Nemám potrebné veci, skippupjem sa...')
                         return TestResult.SKIP
 
-                # Spustíme test
-                status = func(logger, test_data)
+                # Ak zlyhal predpoklad, test nespustíme vôbec alebo iba na itemoch ktoré prešli
+                if context is not None and depends:
+                    failed = context.failed_prerequisites(depends)
+                    if failed is WHOLE_TEST:
+                        logger.logMessage(logging.DEBUG, 'Zlyhal test od ktorého závisím, ' +
+                                                         'skippujem sa...')
+                        return TestResult.SKIP
+                    if failed:
+                        logger.logMessage(logging.DEBUG, 'Vynechávam {0} itemov ktoré zlyhali v '
+                                                         'predpokladoch'.format(len(failed)))
+                        test_data = prune(test_data, failed)
+
+                # Pri rozdelení na shardy spravíme iba svoju časť
+                if context is not None and context.shard is not None:
+                    if shard_by is not None and test_data[shard_by]:
+                        test_data = prune(test_data, {
+                            (shard_by, item_key(item, index))
+                            for index, item in enumerate(test_data[shard_by])
+                            if not context.owns(item_key(item, index))})
+                    elif shard_by is None and not getattr(func, 'per_item', False) and \
+                            not context.owns(func.__name__):
+                        logger.logMessage(logging.DEBUG, 'Patrím inému shardu, skippujem sa...')
+                        return TestResult.SKIP
+
+                status = run_status(logger, test_data, context)
+                if context is not None and status in (TestResult.ERROR, TestResult.TIMEOUT):
+                    context.test_failed(func.__name__, getattr(func, 'per_item', False))
+                return status
+
+            def run_status(logger, test_data, context):
+                # Test ktorý nečíta nič zmenené netreba spúšťať
+                if (reads is not None and context is not None and context.changed is not None
+                   and not getattr(func, 'per_item', False)
+                   and not context.affects(reads(test_data))):
+                    logger.logMessage(logging.DEBUG, 'Nečítam nič zmenené, skippujem sa...')
+                    return TestResult.SKIP
+
+                # Spustíme test. Testy nad itemami riešia inkrementálnosť pre každý item zvlášť.
+                if (reads is not None and context is not None and context.incremental is not None
+                   and not getattr(func, 'per_item', False)):
+                    status = context.incremental.run(func.__name__, '*', reads(test_data), logger,
+                                                     lambda logger: run(logger, test_data, context))
+                else:
+                    status = run(logger, test_data, context)
 
                 # Ak funkcia vráti boolean miesto TestResult, vráťme hodnotu parametra severity pri
                 # zlyhaní.
@@ -35,27 +280,148 @@ class TestRegistrar():
                 else:
                     return status
 
+            def measured_run(logger, test_data, context):
+                if context is not None and context.profiler is not None:
+                    return context.profiler.measure(func.__name__,
+                                                    lambda: checked_run(logger, test_data, context))
+                return checked_run(logger, test_data, context)
+
+            def wrapper(logger, test_data, context=None):
+                deadline = context.deadline(timeout) if context is not None else None
+                if deadline is None:
+                    return measured_run(logger, test_data, context)
+                if deadline.expired:
+                    logger.logMessage(logging.ERROR, 'Minul sa čas na beh, test sa nespustí')
+                    context.test_failed(func.__name__, False)
+                    return TestResult.TIMEOUT
+
+                # Test beží vo vlastnom vlákne a loguje do bufferu, aby zrušený test už nič
+                # nevypísal
+                buffer = BufferedIssueLogger('checker.' + func.__name__)
+                done, status = run_with_deadline(
+                    deadline, lambda: measured_run(buffer, test_data, context))
+                buffer.replay(logger)
+                if not done:
+                    logger.logMessage(logging.ERROR, 'Test nestihol časový limit, zrušený ' +
+                                                     '(spolu s procesmi ktoré spustil)')
+                    context.test_failed(func.__name__, False)
+                    return TestResult.TIMEOUT
+                return status
+
+            # `reads` dostane to isté čo test: test_data, alebo pri for_each_item_in jeden item
+            func.reads = reads
+            func.item_timeout = item_timeout
             if not ignore:
-                self.all[func.__name__] = {"doc": func.__doc__, "run": wrapper}
+                self.all[func.__name__] = {"doc": func.__doc__, "run": wrapper, "require": require,
+                                           "depends": depends, "cost": cost,
+                                           "module": func.__module__}
             return wrapper
         return registrar_decorator
 
 test = TestRegistrar()
 
 
+def is_bypassed(logger, item, test_name):
+    """Zistí či item (zadanie / vzorák) obsahuje inštrukciu `%skiptest` pre daný test."""
+
+    if item.bypass and test_name in item.bypass:
+        logger.logMessage(logging.DEBUG, (("Nájdená inštrukcia na preskočenie testu v" +
+                                           " \"{0}\", preskakujem test {1}")
+                                          .format(item.filename, test_name)))
+        return True
+    return False
+
+
+def item_key(item, index):
+    """Identifikátor itemu stabilný medzi behmi (napr. pre inkrementálny stav)."""
+
+    filename = getattr(item, 'filename', None)
+    return filename if filename is not None else '#{0}'.format(index)
+
+
 def for_each_item_in(items, bypassable=False):
     def foreach_decorator(function):
-        @functools.wraps(function)
-        def wrapper(logger, test_data):
-            success = True
-            for item in test_data[items]:
-                if bypassable and item.bypass and function.__name__ in item.bypass:
-                    logger.logMessage(logging.DEBUG, (("Nájdená inštrukcia na preskočenie testu v" +
-                                                       " \"{0}\", preskakujem test {1}")
-                                                      .format(item.filename, function.__name__)))
-                    continue
-                if not function(logger, item):
-                    success = False
+        def run_item(logger, item):
+            # Chýbajúce vstupy úlohy (alebo item vynechaný kvôli zlyhanému predpokladu)
+            if item is None:
+                return True
+            if bypassable and is_bypassed(logger, item, function.__name__):
+                return True
+            return function(logger, item)
+
+        def run_unit(logger, item, index, context):
+            if context is not None and not context.owns(item_key(item, index)):
+                return True
+            if (context is not None and wrapper.reads is not None and item is not None
+               and not context.affects(wrapper.reads(item))):
+                return True
+            # Test už bol zrušený (--time-budget, --fail-fast), zvyšné itemy nemá zmysel spúšťať
+            current = deadline_utils.current.get()
+            if current is not None and current.expired:
+                return TestResult.TIMEOUT
+
+            deadline = None
+            if context is not None and item is not None and wrapper.item_timeout is not None:
+                deadline = context.deadline(wrapper.item_timeout, deadline_utils.current.get())
+            if deadline is None:
+                success = run_checked_item(logger, item, index, context)
+            elif deadline.expired:
+                success = TestResult.TIMEOUT
+            else:
+                buffer = BufferedIssueLogger(function.__name__)
+                done, success = run_with_deadline(
+                    deadline, lambda: run_checked_item(buffer, item, index, context))
+                buffer.replay(logger)
+                if not done:
+                    success = TestResult.TIMEOUT
+
+            if success is TestResult.TIMEOUT:
+                logger.logIssue(logging.ERROR, Issue("Test {0} nestihol časový limit, zrušený"
+                                                     .format(function.__name__),
+                                                     getattr(item, 'filename', None)))
+            if (not success or success is TestResult.TIMEOUT) and context is not None:
+                context.item_failed(function.__name__, items, item_key(item, index))
             return success
+
+        def run_checked_item(logger, item, index, context):
+            if context is None or context.incremental is None or wrapper.reads is None:
+                return run_item(logger, item)
+            return context.incremental.run(function.__name__, item_key(item, index),
+                                           wrapper.reads(item), logger,
+                                           lambda logger: run_item(logger, item))
+
+        def run_buffered(logger_name, item, index, context):
+            buffer = BufferedIssueLogger(logger_name)
+            return buffer, run_unit(buffer, item, index, context)
+
+        def result(successes):
+            # Item ktorý nestihol limit spraví TIMEOUT z celého testu
+            successes = list(successes)
+            if any(success is TestResult.TIMEOUT for success in successes):
+                return TestResult.TIMEOUT
+            return all(successes)
+
+        @functools.wraps(function)
+        def wrapper(logger, test_data, context=None):
+            if context is None or context.item_executor is None:
+                return result([run_unit(logger, item, index, context)
+                               for index, item in enumerate(test_data[items])])
+
+            # Itemy bežia paralelne, každý do vlastného bufferu. Buffery prehráme v pôvodnom
+            # poradí itemov, aby bol výstup rovnaký ako pri sériovom behu. Workery pracujú pod
+            # deadline testu.
+            run = deadline_utils.inherit(run_buffered)
+            futures = [context.item_executor.submit(run, function.__name__, item, index, context)
+                       for index, item in enumerate(test_data[items])]
+            successes = []
+            for future in futures:
+                buffer, item_success = future.result()
+                buffer.replay(logger)
+                successes.append(item_success)
+            return result(successes)
+        wrapper.uses_context = True
+        wrapper.per_item = True
+        wrapper.reads = None
+        wrapper.item_timeout = None
         return wrapper
     return foreach_decorator
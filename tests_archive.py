@@ -0,0 +1,37 @@
+from test_utils import test, TestResult
+from models import *
+from archive_utils import SIMILAR_THRESHOLD, round_of, statement_text
+from tests import all_files
+
+
+def tasks_and_archive(test_data):
+    # Výsledok závisí aj od archívu: po `check.py archive` sa test spustí znova
+    return all_files("tasks")(test_data) + [test_data["archive"].path]
+
+
+@test(TestResult.WARNING, require=["tasks", "archive"], reads=tasks_and_archive, cost=2)
+def taskNotInArchive(logger, test_data):
+    """Kontrola či sa meno alebo text úlohy neopakuje z minulých kôl.
+
+    Úlohy sa hľadajú v archíve (viď `check.py archive`): rovnaké meno bez ohľadu na veľkosť písmen
+    a diakritiku, a text ktorý sa s niektorým starším zadaním zhoduje aspoň na 60 %. Kolo ktoré sa
+    práve kontroluje sa ignoruje, aj keď je v archíve."""
+
+    archive = test_data["archive"]
+    current_round = round_of(test_data["path_to_tasks"])
+    success = True
+    for task in sorted(test_data["tasks"], key=lambda task: task.number):
+        for match in archive.same_name("task", task.name, current_round):
+            logger.logIssue(logging.WARNING,
+                            Issue("Úloha s menom \"{0}\" už bola v {1}".format(match.name,
+                                                                            match.path),
+                                  task.filename))
+            success = False
+        for match in archive.similar("task", statement_text(task), SIMILAR_THRESHOLD,
+                                     current_round):
+            logger.logIssue(logging.WARNING,
+                            Issue("Text úlohy sa na {0:.0%} zhoduje so zadaním \"{1}\" z {2}"
+                                  .format(match.similarity, match.name, match.path),
+                                  task.filename))
+            success = False
+    return success
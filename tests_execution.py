@@ -0,0 +1,124 @@
+from test_utils import test, is_bypassed, TestResult
+from models import *
+from toolchain import toolchain
+from runner_utils import runner
+from timing_utils import calibrator, TaskReport
+from tests import (solution_listings, inputs_of, input_output_pairs,
+                   solutions_listings_and_inputs, tasks_solutions_and_inputs)
+
+
+def timing_reports(test_data, only_limited=False):
+    """Zmeria listingy vzorákov na vstupoch ich úloh (viď timing_utils.py). Vráti trojice
+    (zadanie alebo None, vzorák, TaskReport). S only_limited iba úlohy ktoré majú %timelimit."""
+
+    tasks = {task.number: task for task in test_data["tasks"] or ()}
+    reports = []
+    for solution in sorted(test_data["solutions"], key=lambda solution: solution.number):
+        task = tasks.get(solution.number)
+        time_limits = task.time_limits if task is not None else {}
+        inputs = inputs_of(test_data, solution.number)
+        if not inputs or (only_limited and not time_limits):
+            continue
+        listing_filenames = [listing_filename
+                             for _, _, listing_filename in solution_listings(solution)
+                             if toolchain.compiler_for(listing_filename)
+                             and test_data["files"].isfile(listing_filename)]
+        measurements = calibrator.measure_solution(solution, listing_filenames,
+                                                   input_output_pairs(inputs))
+        reports.append((task, solution, TaskReport(solution.number, time_limits, measurements,
+                                                   calibrator.margin)))
+    return reports
+
+
+@test(TestResult.ERROR, require=["solutions", "inputs"], reads=solutions_listings_and_inputs,
+      depends=["solutionAllListingsExist", "eachInputHasOutput"], cost=100, shard_by="solutions",
+      timeout=30 * 60)
+def solutionOutputsMatch(logger, test_data):
+    """Kontrola či listingy vzorákov na vstupoch vyrobia prislúchajúce .out súbory.
+
+    Každý listing sa skompiluje raz a spustí sa na všetkých vstupoch svojej úlohy na poole runnera,
+    s limitmi na CPU čas, pamäť a veľkosť výstupu. Výstup sa porovnáva s .out súborom priebežne,
+    ohlási sa prvý riadok v ktorom sa líšia."""
+
+    listings = []
+    for solution in test_data["solutions"]:
+        if is_bypassed(logger, solution, "solutionOutputsMatch"):
+            continue
+        inputs = inputs_of(test_data, solution.number)
+        if not inputs:
+            continue
+        for idx, _, listing_filename in solution_listings(solution):
+            if (toolchain.compiler_for(listing_filename) and
+                    test_data["files"].isfile(listing_filename)):
+                listings.append((solution, idx, listing_filename, input_output_pairs(inputs)))
+
+    builds = toolchain.build_many([listing_filename for _, _, listing_filename, _ in listings])
+
+    runs = []
+    for (solution, idx, listing_filename, pairs), build in zip(listings, builds):
+        if build.skipped:
+            logger.logMessage(logging.INFO, ("{0} nenájdené, nespúšťam listing {1}"
+                                             .format(build.compiler.name, listing_filename)))
+        elif not build.ok:
+            # Nekompilovateľné listingy hlási solutionAllListingsCompileable
+            logger.logMessage(logging.INFO, ("Listing {0} nejde skompilovať, nespúšťam ho"
+                                             .format(listing_filename)))
+        else:
+            runs += [(solution, idx, listing_filename, build.command, inp_filename, out_filename)
+                     for inp_filename, out_filename in pairs]
+
+    results = runner.run_many([(command, inp_filename, out_filename)
+                               for _, _, _, command, inp_filename, out_filename in runs])
+
+    messages = {"WA": "dal na vstupe {1} iný výstup ako {2}, prvý rozdiel na riadku {3}",
+                "TLE": "prekročil na vstupe {1} časový limit",
+                "OLE": "vypísal na vstupe {1} príliš veľký výstup",
+                "RE": "spadol na vstupe {1} (návratový kód {4})"}
+    success = True
+    for (solution, idx, listing_filename, _, inp_filename, out_filename), result in zip(runs,
+                                                                                       results):
+        if not result.ok:
+            message = ("Listing {0} " + messages[result.status]).format(
+                listing_filename, inp_filename, out_filename, result.line, result.returncode)
+            logger.logIssue(logging.ERROR, Issue(message, solution.filename, idx+1))
+            success = False
+    return success
+
+
+@test(TestResult.ERROR, require=["tasks", "solutions", "inputs"],
+      reads=tasks_solutions_and_inputs, depends=["solutionOutputsMatch"], cost=1000,
+      shard_by="solutions", timeout=60 * 60)
+def solutionsWithinTimeLimit(logger, test_data):
+    """Kontrola či listingy vzorákov bežia s rezervou pod časovým limitom úlohy.
+
+    Týka sa iba úloh s direktívou `%timelimit`. Každý listing sa na každom vstupe po zahriatí
+    niekoľkokrát zmeria (CPU čas, pripnutý na jedno jadro) a najhorší čas krát rezerva
+    (`--time-limit-margin`) musí byť pod limitom."""
+
+    success = True
+    for task, solution, report in timing_reports(test_data, only_limited=True):
+        if is_bypassed(logger, task, "solutionsWithinTimeLimit"):
+            continue
+        # Riadok direktívy s limitom pre daný jazyk (alebo s defaultným limitom)
+        directive_lines = {}
+        for directive in task.document.directives_of("timelimit"):
+            words = directive.value.split()
+            directive_lines[words[0] if len(words) == 2 else None] = directive.line + 1
+        for measurement in report.measurements:
+            limit = task.time_limit_for(measurement.language)
+            if limit is None:
+                continue
+            if measurement.status == "TLE":
+                message = "Listing {0} na vstupe {1} prekročil časový limit behu".format(
+                    measurement.listing_filename, measurement.input_filename)
+            elif measurement.ok and measurement.max * report.margin > limit:
+                message = ("Listing {0} beží na vstupe {1} až {2:.3f} s, to je pri rezerve " +
+                           "{3:g}x nad limitom {4:g} s").format(
+                    measurement.listing_filename, measurement.input_filename, measurement.max,
+                    report.margin, limit)
+            else:
+                continue
+            logger.logIssue(logging.ERROR, Issue(message, task.filename, directive_lines.get(
+                measurement.language, directive_lines.get(None))))
+            success = False
+    return success
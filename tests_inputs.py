@@ -0,0 +1,135 @@
+from test_utils import test, for_each_item_in, TestResult
+from models import *
+from scan_utils import scanner
+from fs_utils import files
+from format_utils import FORMAT_FILENAME, FormatError, load_format, validate_file
+from generator_utils import generated, definition_files
+from tests import input_files, tasks_and_inputs
+
+
+def format_and_inputs(inputs):
+    if not inputs:
+        return []
+    return [os.path.join(inputs.folder, FORMAT_FILENAME)] + input_files(inputs)
+
+
+def generators_and_inputs(inputs):
+    if not inputs:
+        return []
+    return definition_files(inputs.folder) + input_files(inputs)
+
+
+@test(TestResult.WARNING, require=["tasks", "inputs"], reads=tasks_and_inputs)
+def taskHasInputs(logger, test_data):
+    """Kontrola či každá úloha má vstupy."""
+
+    success = True
+    for task in test_data["tasks"]:
+        if not test_data["inputs"][task.number-1]:
+            logger.logIssue(logging.WARNING, Issue("Úloha nemá vstupy!", task.filename))
+            success = False
+    return success
+
+
+@test(TestResult.ERROR, require=["inputs"], reads=input_files)
+@for_each_item_in("inputs")
+def inputsHaveUnixNewlines(logger, tests):
+    """Kontrola či majú vstupy UNIXácke newlines."""
+
+    for inp, inp_filename in tests.items():
+        facts = scanner.scan(inp_filename)
+        if facts.first_crlf_line is not None:
+            logger.logIssue(logging.ERROR, Issue("Vstup má Windowsácky newline!",
+                                                 inp_filename, facts.first_crlf_line))
+            return False
+    return True
+
+
+@test(TestResult.WARNING, require=["inputs"], reads=input_files)
+@for_each_item_in("inputs")
+def inputsNoTrailingWhitespace(logger, tests):
+    """Kontrola či vstupy a výstupy nemajú medzery na konci riadkov."""
+
+    success = True
+    for inp, inp_filename in tests.items():
+        for line_number in scanner.scan(inp_filename).trailing_whitespace_lines:
+            logger.logIssue(logging.WARNING,
+                            Issue("Vstup má na konci riadku whitespaces!", inp_filename,
+                                  line_number))
+            success = False
+    return success
+
+
+@test(TestResult.ERROR, require=["inputs"], reads=input_files)
+@for_each_item_in("inputs")
+def eachInputHasOutput(logger, tests):
+    """Kontrola či každý .in súbor zo vstupov má prislúchajúci .out súbor"""
+
+    for inp, inp_filename in tests.items():
+        if inp.endswith('.in') and inp[:-3]+'.out' not in tests.keys():
+            logger.logIssue(logging.ERROR, Issue("Vstup nemá výstup!", inp_filename))
+            return False
+    return True
+
+
+@test(TestResult.ERROR, require=["inputs"], reads=input_files)
+@for_each_item_in("inputs")
+def inputHasNewlineAtEof(logger, tests):
+    """Kontrola či posledný riadok vo vstupoch a výstupoch končí znakom nového riadku."""
+
+    for inp, inp_filename in tests.items():
+        facts = scanner.scan(inp_filename)
+        if not facts.ends_with_newline:
+            logger.logIssue(logging.ERROR,
+                            Issue("Súbor nekončí znakom nového riadku!", inp_filename,
+                                  facts.line_count + 1))
+            return False
+    return True
+
+
+@test(TestResult.ERROR, require=["inputs"], reads=format_and_inputs,
+      depends=["inputsHaveUnixNewlines"], cost=5, item_timeout=60)
+@for_each_item_in("inputs")
+def inputsMatchFormat(logger, tests):
+    """Kontrola či vstupy zodpovedajú formátu a rozsahom zo súboru `format` vo foldri úlohy."""
+
+    if not tests:
+        return True
+    format_filename = os.path.join(tests.folder, FORMAT_FILENAME)
+    if not files.isfile(format_filename):
+        logger.logMessage(logging.DEBUG, "Úloha {0} nemá formát vstupu".format(tests.number))
+        return True
+    try:
+        program = load_format(format_filename)
+    except FormatError as error:
+        logger.logIssue(logging.ERROR, Issue("Chybný formát: " + error.message, format_filename,
+                                             error.line))
+        return False
+
+    success = True
+    for inp, inp_filename in sorted(tests.items()):
+        if not inp.endswith('.in'):
+            continue
+        stats, error = validate_file(program, inp_filename)
+        if error is not None:
+            logger.logIssue(logging.ERROR, Issue(error.message, inp_filename, error.line))
+            success = False
+        else:
+            logger.logMessage(logging.INFO, "Vstup {0}: {1}".format(inp_filename, stats))
+    return success
+
+
+@test(TestResult.ERROR, require=["inputs"], reads=generators_and_inputs)
+@for_each_item_in("inputs")
+def inputsGenerated(logger, tests):
+    """Kontrola či generátory vstupov úlohy (súbor `generators` vo foldri úlohy) zbehli.
+
+    Vstupy sa generujú pred testami, tento test iba nahlási čo pri tom zlyhalo: chybnú definíciu,
+    generátor alebo vzorové riešenie ktoré spadlo, a generátor ktorý nie je deterministický."""
+
+    if not tests:
+        return True
+    problems = generated.problems(tests.folder)
+    for issue in problems:
+        logger.logIssue(logging.ERROR, issue)
+    return not problems
@@ -0,0 +1,122 @@
+from test_utils import test, for_each_item_in, is_bypassed, TestResult
+from models import *
+from toolchain import toolchain
+from fs_utils import files
+from tests import (item_file, all_files, solution_listings, solution_and_listings,
+                   all_solutions_and_listings)
+
+
+@test(TestResult.WARNING, require=["solutions"], reads=all_files("solutions"))
+def allSolutionsPresent(logger, test_data):
+    """Kontrola či existujú všetky vzoráky."""
+
+    solutions_exist = [False]*8
+
+    for solution in test_data["solutions"]:
+        solutions_exist[solution.number-1] = True
+
+    for solution_number, solution_exists in enumerate(solutions_exist):
+        if not solution_exists:
+            logger.logIssue(logging.WARNING,
+                            Issue("Vzorák číslo {0} neexistuje!".format(solution_number+1), ""))
+
+    return all(solutions_exist)
+
+
+@test(TestResult.ERROR, require=["solutions"], reads=item_file)
+@for_each_item_in("solutions")
+def solutionComplete(logger, solution):
+    """Kontrola či vzorák má meno a autora."""
+
+    success = True
+    if not solution.name:
+        logger.logIssue(logging.ERROR, Issue("Vzorák nemá meno!", solution.filename))
+        success = False
+    if not solution.author:
+        logger.logIssue(logging.ERROR, Issue("Vzorák nemá autora!", solution.filename))
+        success = False
+    return success
+
+
+@test(TestResult.ERROR, require=["tasks", "solutions"], reads=all_files("tasks", "solutions"))
+def solutionMatchesTask(logger, test_data):
+    """Kontrola či úloha a prislúchajúci vzorák majú rovnaké meno a rovnaké body."""
+
+    tasks = [None]*8
+    solutions = [None]*8
+
+    for task in test_data["tasks"]:
+        tasks[task.number-1] = task
+
+    for solution in test_data["solutions"]:
+        solutions[solution.number-1] = solution
+
+    success = True
+    for index in range(8):
+        if tasks[index] and solutions[index]:
+            if tasks[index].name != solutions[index].name:
+                logger.logIssue(logging.ERROR,
+                                Issue(("Názov vzoráku \"{0}\" sa nezhoduje s názvom" +
+                                       " úlohy \"{1}\"").format(solutions[index].name,
+                                                                tasks[index].name),
+                                      solutions[index].filename))
+                success = False
+            if tasks[index].points != solutions[index].points:
+                logger.logIssue(logging.ERROR,
+                                Issue(("Body za úlohu \"{1}\" sa nezhodujú s bodmi vo vzoráku " +
+                                       "\"{0}\"").format(solutions[index].points,
+                                                         tasks[index].points),
+                                      solutions[index].filename))
+                success = False
+    return success
+
+
+@test(TestResult.ERROR, require=["solutions"], reads=solution_and_listings)
+@for_each_item_in("solutions")
+def solutionAllListingsExist(logger, solution):
+    """Kontrola či existujú všetky súbory listingov použité vo vzoráku."""
+
+    success = True
+    for idx, listing, listing_filename in solution_listings(solution):
+        if not files.isfile(listing_filename):
+            logger.logIssue(logging.ERROR,
+                            Issue("Listing {0} neexistuje!".format(listing),
+                                  solution.filename, idx+1))
+            success = False
+    return success
+
+
+@test(TestResult.WARNING, require=["solutions"], reads=all_solutions_and_listings,
+      depends=["solutionAllListingsExist"], cost=10, shard_by="solutions", timeout=10 * 60)
+def solutionAllListingsCompileable(logger, test_data):
+    """Kontrola či sú všetky listingy skompilovateľné.
+
+    Kontroluje všetky listingy s príponami .cc, .c++, .cpp, .py, .pas tak, že sa ich pokúsi
+    skompilovať. Ak sa nenájde príslušný compiler skippne sa checkovanie daného listingu. Listingy
+    všetkých vzorákov sa kompilujú naraz na poole toolchainu a výsledky kompilácie sa pamätajú v
+    cache, takže nezmenený listing sa druhýkrát nekompiluje."""
+
+    # Najskôr pozbierame listingy zo všetkých vzorákov, nech ich toolchain môže kompilovať naraz
+    listings = []
+    for solution in test_data["solutions"]:
+        if is_bypassed(logger, solution, "solutionAllListingsCompileable"):
+            continue
+        for idx, _, listing_filename in solution_listings(solution):
+            if (toolchain.compiler_for(listing_filename) and
+                    test_data["files"].isfile(listing_filename)):
+                listings.append((solution, idx, listing_filename))
+
+    results = toolchain.compile_many([listing_filename for _, _, listing_filename in listings])
+
+    # Výsledky hlásime v poradí vzorákov a riadkov, nezávisle od toho čo dokompilovalo skôr
+    success = True
+    for (solution, idx, listing_filename), result in zip(listings, results):
+        if result.skipped:
+            logger.logMessage(logging.INFO, ("{0} nenájdené, skippujem checkovanie listingu {1}"
+                                             .format(result.compiler.name, listing_filename)))
+        elif not result.ok:
+            logger.logIssue(logging.WARNING,
+                            Issue(("Listing {0} nejde skompilovať!\n{1}"
+                                   .format(listing_filename, result.output)),
+                                  solution.filename, idx+1))
+    return success
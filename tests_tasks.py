@@ -0,0 +1,121 @@
+from test_utils import test, for_each_item_in, TestResult
+from models import *
+from tests import item_file, all_files
+
+
+@test(TestResult.ERROR, require=["tasks"], reads=all_files("tasks"))
+def allTasksPresent(logger, test_data):
+    """Kontrola či existuje všetkých 8 úloh."""
+
+    tasks_exist = [False]*8
+
+    for task in test_data["tasks"]:
+        tasks_exist[task.number-1] = True
+
+    for task_number, task_exists in enumerate(tasks_exist):
+        if not task_exists:
+            logger.logIssue(logging.ERROR,
+                            Issue("Úloha číslo {0} neexistuje!".format(task_number+1), ""))
+
+    return all(tasks_exist)
+
+
+@test(TestResult.ERROR, require=["tasks"], reads=item_file)
+@for_each_item_in("tasks")
+def taskComplete(logger, task):
+    """Kontrola či úloha má meno a autora"""
+
+    success = True
+    if not task.name:
+        logger.logIssue(logging.ERROR, Issue("Úloha nemá meno!", task.filename))
+        success = False
+    if not task.author:
+        logger.logIssue(logging.ERROR, Issue("Úloha nemá autora!", task.filename))
+        success = False
+    return success
+
+
+@test(TestResult.WARNING, require=["tasks"], reads=item_file)
+@for_each_item_in("tasks", bypassable=True)
+def taskProofreaded(logger, task):
+    """Kontrola či je úloha sproofreadovaná"""
+
+    if not task.proofreader:
+        logger.logIssue(logging.WARNING, Issue("Úloha nie je sproofreadovaná!", task.filename))
+        return False
+    return True
+
+
+@test(TestResult.ERROR, require=["tasks"], reads=item_file)
+@for_each_item_in("tasks", bypassable=True)
+def taskFirstLetter(logger, task):
+    """Kontrola prvého písmenka úlohy.
+
+    Tento test zlyhá, ak úlohy v kategórií Z a O nezačínajú na správne písmenko."""
+
+    config = []
+    config += ['Z']*4  # Prvé 4 úlohy majú začínať Z-tkom
+    config += ['O']*4  # Ďalšie 4 úlohy majú začínať O-čkom
+
+    if not task.name.startswith(config[task.number-1]):
+        logger.logIssue(logging.ERROR,
+                        Issue(("Úloha \"{0}\" nezačína správnym písmenom ({1})!"
+                              .format(task.name, config[task.number-1])), task.filename))
+        return False
+    return True
+
+
+@test(TestResult.ERROR, require=["tasks"], reads=item_file)
+@for_each_item_in("tasks", bypassable=True)
+def taskCorrectPoints(logger, task):
+    """Kontrola správneho súčtu bodov.
+
+    Tento test zlyhá ak úlohy nemajú správne súčty bodov. Správne súčty bodov sú 10 za príklady
+    1-3, 15 za 4-5 a 20 za 6-8."""
+
+    config = []
+    config += [10]*3  # Úlohy 1-3 10b
+    config += [15]*2  # Úlohy 4-5 15b
+    config += [20]*3  # Úlohy 6-8 20b
+
+    task_points = (task.points["bodypopis"] + task.points["bodyprogram"])
+    if task_points != config[task.number-1]:
+        logger.logIssue(logging.ERROR,
+                        Issue(("Úloha \"{0}\" nemá spávny počet bodov! Má {1}, má mať {2}."
+                               .format(task.name, task_points, config[task.number-1])),
+                              task.filename))
+        return False
+    return True
+
+
+@test(TestResult.ERROR, require=["tasks"], reads=item_file)
+@for_each_item_in("tasks", bypassable=True)
+def taskSamplesEndWithUnixNewline(logger, task):
+    """Kontrola či všetky príklady vstupu / výstupu končia s UNIX newline."""
+
+    success = True
+    lines = list(task.lines())
+    for sample in task.document.samples:
+        # Slice a nie indexy: súbor sa mohol od parsovania skrátiť (napr. v --lsp medzi kontrolami)
+        for index, line in enumerate(lines[sample.start:sample.end], sample.start):
+            if line.endswith('\r\n'):
+                logger.logIssue(logging.ERROR, Issue("Riadok má Windowsácky endline!",
+                                                     task.filename, index+1))
+                success = False
+    return success
+
+
+@test(TestResult.ERROR, require=["tasks"], reads=item_file)
+@for_each_item_in("tasks", bypassable=True)
+def taskSamplesWhitespace(logger, task):
+    """Kontrola či príklady vstupu / výstupu nekončia medzerou."""
+
+    success = True
+    lines = list(task.lines())
+    for sample in task.document.samples:
+        for index, line in enumerate(lines[sample.start:sample.end], sample.start):
+            if re.match("[^ \t\r\f\v]*[ \t\r\f\v]+$", line):
+                logger.logIssue(logging.ERROR, Issue("Riadok končí whitespace-om!", task.filename,
+                                                     index+1))
+                success = False
+    return success
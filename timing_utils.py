@@ -0,0 +1,188 @@
+import os
+import math
+import json
+import statistics
+import threading
+
+from runner_utils import runner, run_limited, Limits
+from toolchain import toolchain
+
+# Koľkokrát po zahriatí meriame každý listing na každom vstupe
+DEFAULT_RUNS = 5
+
+# Koľko behov pred meraním zahodíme (page cache, frekvencia CPU...)
+DEFAULT_WARMUP = 1
+
+# Koľkokrát musí byť limit väčší ako najhorší nameraný čas
+DEFAULT_MARGIN = 2.0
+
+# Navrhnutý limit zaokrúhľujeme nahor na takéto kroky (v sekundách)
+LIMIT_STEP = 0.1
+
+
+def percentile(values, fraction):
+    """Percentil metódou nearest-rank (p95 z 5 hodnôt je maximum)."""
+
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def suggest_limit(seconds, margin):
+    return max(LIMIT_STEP, math.ceil(seconds * margin / LIMIT_STEP - 1e-9) * LIMIT_STEP)
+
+
+def megabytes(size):
+    return "-" if size is None else "{0:.1f}".format(size / (1024 * 1024))
+
+
+def stamp(path):
+    info = os.stat(path)
+    return info.st_size, info.st_mtime_ns
+
+
+# Merania jedného listingu na jednom vstupe. Časy sú CPU časy (user + sys) z rusage, `max_rss` je
+# najväčší peak RSS zo všetkých behov v bajtoch (None ak sa nedal zistiť).
+class Measurement():
+    def __init__(self, listing_filename, language, input_filename, results):
+        self.listing_filename = listing_filename
+        self.language = language
+        self.input_filename = input_filename
+        self.results = results
+        failed = [result for result in results if not result.ok]
+        self.status = failed[0].status if failed else "OK"
+        times = [result.cpu_time if result.cpu_time is not None else result.time
+                 for result in results]
+        self.median = statistics.median(times)
+        self.p95 = percentile(times, 0.95)
+        self.max = max(times)
+        self.max_rss = max((result.max_rss for result in results if result.max_rss is not None),
+                           default=None)
+
+    @property
+    def ok(self):
+        return self.status == "OK"
+
+    def as_dict(self):
+        return {"listing": self.listing_filename, "language": self.language,
+                "input": self.input_filename, "status": self.status, "median": self.median,
+                "p95": self.p95, "max": self.max, "max_rss": self.max_rss,
+                "runs": len(self.results)}
+
+
+# Kalibrácia časových limitov. Každý skompilovaný listing sa na každom vstupe svojej úlohy spustí
+# `warmup` krát naprázdno a potom `runs` krát s meraním. Behy idú za sebou a sú pripnuté na jedno
+# jadro, aby si merania navzájom nezavadzali. Merania sa pamätajú, kým sa nezmení binárka, listing,
+# vstup ani výstup, takže test aj report z jedného behu checkera púšťajú listingy iba raz.
+class Calibrator():
+    def __init__(self, runs=DEFAULT_RUNS, warmup=DEFAULT_WARMUP, cpu=None, margin=DEFAULT_MARGIN):
+        self.configure(runs, warmup, cpu, margin)
+
+    def configure(self, runs=DEFAULT_RUNS, warmup=DEFAULT_WARMUP, cpu=None, margin=DEFAULT_MARGIN):
+        self.runs = max(1, runs)
+        self.warmup = max(0, warmup)
+        self.cpu = cpu if cpu is not None else self.default_cpu()
+        self.margin = margin
+        self.measurements = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def default_cpu():
+        if hasattr(os, 'sched_getaffinity'):
+            return max(os.sched_getaffinity(0))
+        return None
+
+    def limits(self):
+        limits = runner.limits
+        return Limits(limits.time, limits.memory, limits.output, self.cpu)
+
+    def measure(self, command, language, listing_filename, input_filename, expected_filename):
+        key = (listing_filename, input_filename)
+        fingerprint = (tuple(command), stamp(listing_filename), stamp(input_filename),
+                       stamp(expected_filename))
+        with self.lock:
+            if key in self.measurements and self.measurements[key][0] == fingerprint:
+                return self.measurements[key][1]
+            limits = self.limits()
+            results = []
+            for run in range(self.warmup + self.runs):
+                result = run_limited(command, input_filename, expected_filename, limits)
+                if run >= self.warmup or not result.ok:
+                    results.append(result)
+                if not result.ok:
+                    # Zlé riešenie nemá zmysel merať ďalej
+                    break
+            measurement = Measurement(listing_filename, language, input_filename, results)
+            self.measurements[key] = (fingerprint, measurement)
+            return measurement
+
+    def measure_solution(self, solution, listing_filenames, pairs):
+        """Zmeria listingy vzoráku na dvojiciach (.in, .out). Vráti zoznam Measurement-ov, listingy
+        ktoré sa nedajú skompilovať (alebo nemajú compiler) vynechá."""
+
+        measurements = []
+        builds = toolchain.build_many(listing_filenames)
+        for listing_filename, build in zip(listing_filenames, builds):
+            if build.skipped or not build.ok:
+                continue
+            for input_filename, expected_filename in pairs:
+                measurements.append(self.measure(build.command, build.compiler.language,
+                                                 listing_filename, input_filename,
+                                                 expected_filename))
+        return measurements
+
+
+class TaskReport():
+    def __init__(self, number, time_limits, measurements, margin):
+        self.number = number
+        self.time_limits = time_limits
+        self.measurements = measurements
+        self.margin = margin
+
+    def languages(self):
+        """Najhorší čas a pamäť pre každý jazyk."""
+
+        languages = {}
+        for measurement in self.measurements:
+            worst = languages.setdefault(measurement.language, {"max": 0.0, "max_rss": None})
+            worst["max"] = max(worst["max"], measurement.max)
+            if measurement.max_rss is not None:
+                worst["max_rss"] = max(worst["max_rss"] or 0, measurement.max_rss)
+        return languages
+
+    def suggested_limits(self):
+        return {language: suggest_limit(worst["max"], self.margin)
+                for language, worst in self.languages().items()}
+
+    def as_dict(self):
+        return {"task": self.number,
+                "time_limits": {language or "*": limit
+                                for language, limit in self.time_limits.items()},
+                "languages": self.languages(),
+                "suggested_limits": self.suggested_limits(),
+                "measurements": [measurement.as_dict() for measurement in self.measurements]}
+
+    def table(self):
+        rows = ["Úloha {0}".format(self.number)]
+        rows.append("  {0:30} {1:20} {2:>6} {3:>8} {4:>8} {5:>8} {6:>10}".format(
+            "listing", "vstup", "stav", "medián", "p95", "max", "RSS [MB]"))
+        for measurement in self.measurements:
+            rows.append("  {0:30} {1:20} {2:>6} {3:8.3f} {4:8.3f} {5:8.3f} {6:>10}".format(
+                os.path.basename(measurement.listing_filename),
+                os.path.basename(measurement.input_filename), measurement.status,
+                measurement.median, measurement.p95, measurement.max,
+                megabytes(measurement.max_rss)))
+        suggested = self.suggested_limits()
+        for language, worst in sorted(self.languages().items()):
+            limit = self.time_limits.get(language, self.time_limits.get(None))
+            rows.append("  {0:4} max {1:.3f} s, {2} MB, limit {3}, navrhujem {4:.1f} s".format(
+                language, worst["max"], megabytes(worst["max_rss"]),
+                "-" if limit is None else "{0:g} s".format(limit), suggested[language]))
+        return "\n".join(rows)
+
+
+def dump_reports(reports, path):
+    with open(path, 'w', encoding='utf-8') as report_file:
+        json.dump([report.as_dict() for report in reports], report_file, indent=2,
+                  ensure_ascii=False)
+
+calibrator = Calibrator()
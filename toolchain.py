@@ -0,0 +1,271 @@
+import os
+import sys
+import time
+import shutil
+import logging
+import tempfile
+import threading
+import subprocess
+import py_compile
+from concurrent.futures import ThreadPoolExecutor
+
+import cache_utils
+import profile_utils
+import deadline_utils
+
+logger = logging.getLogger('checker')
+
+
+def check_output(command, **kwargs):
+    """subprocess.check_output, ktorý dĺžku behu procesu nahlási profileru (ak beží). Proces beží
+    najviac do deadline testu (viď deadline_utils.py), potom sa zabije s DeadlineExceeded."""
+
+    start = time.perf_counter()
+    try:
+        returncode, output = deadline_utils.run_process(command, **kwargs)
+    finally:
+        profile_utils.record_subprocess(' '.join(command), time.perf_counter() - start)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command, output)
+    return output
+
+
+# Jeden compiler, ktorým vieme kompilovať listingy. Identita (výpis verzie) sa zisťuje iba raz za
+# beh a je súčasťou kľúča do cache, aby sa po update compilera listingy skompilovali nanovo.
+class Compiler():
+    def __init__(self, name, language, extensions, identity_command):
+        self.name = name
+        self.language = language
+        self.extensions = extensions
+        self.identity_command = identity_command
+        self._identity = None
+        self._detected = False
+        self._lock = threading.Lock()
+
+    @property
+    def identity(self):
+        """Výpis verzie compilera, alebo None ak compiler nie je nainštalovaný."""
+
+        with self._lock:
+            if not self._detected:
+                self._identity = self.detect()
+                self._detected = True
+                if self._identity is None:
+                    logger.debug("Compiler %s nenájdený", self.name)
+            return self._identity
+
+    def detect(self):
+        try:
+            return check_output(self.identity_command,
+                                stderr=subprocess.DEVNULL).decode('utf-8', 'replace')
+        except (subprocess.CalledProcessError, FileNotFoundError):
+            return None
+
+    def command(self, listing_filename, output_directory, syntax_only=False):
+        raise NotImplementedError
+
+    def executable(self, listing_filename, output_directory):
+        """Príkaz ktorým sa spustí listing skompilovaný do output_directory."""
+
+        raise NotImplementedError
+
+    def compile(self, listing_filename, output_directory, syntax_only=False):
+        """Skompiluje listing a vráti dvojicu (podarilo sa, výpis compilera)."""
+
+        try:
+            check_output(self.command(listing_filename, output_directory, syntax_only),
+                         stderr=subprocess.STDOUT)
+        except subprocess.CalledProcessError as e:
+            return False, e.output.decode('utf-8', 'replace')
+        return True, ""
+
+
+class GccCompiler(Compiler):
+    def __init__(self):
+        super().__init__('g++', 'cpp', ('.cpp', '.cc', '.c++'), ['g++', '--version'])
+
+    def command(self, listing_filename, output_directory, syntax_only=False):
+        command = ['g++', '-std=c++11', '-fdiagnostics-color=never', listing_filename]
+        if syntax_only:
+            return command + ['-fsyntax-only']
+        return command + ['-o', os.path.join(output_directory, 'test.out')]
+
+    def executable(self, listing_filename, output_directory):
+        return [os.path.join(output_directory, 'test.out')]
+
+
+class FpcCompiler(Compiler):
+    def __init__(self):
+        super().__init__('fpc', 'pas', ('.pas',), ['fpc', '-iV'])
+
+    def command(self, listing_filename, output_directory, syntax_only=False):
+        # -s: nevolaj assembler ani linker, stačí nám že prejde kompiláciou
+        return ['fpc', '-FE' + output_directory] + (['-s'] if syntax_only else []) + \
+               [listing_filename]
+
+    def executable(self, listing_filename, output_directory):
+        name = os.path.splitext(os.path.basename(listing_filename))[0]
+        return [os.path.join(output_directory, name)]
+
+
+class PythonCompiler(Compiler):
+    def __init__(self):
+        super().__init__('python', 'py', ('.py',), None)
+
+    def detect(self):
+        return sys.version
+
+    def command(self, listing_filename, output_directory, syntax_only=False):
+        return []
+
+    def executable(self, listing_filename, output_directory):
+        return [sys.executable, os.path.abspath(listing_filename)]
+
+    def compile(self, listing_filename, output_directory, syntax_only=False):
+        try:
+            py_compile.compile(listing_filename, cfile=os.path.join(output_directory, "out.pyc"),
+                               doraise=True)
+        except py_compile.PyCompileError as e:
+            return False, e.msg
+        return True, ""
+
+
+# Výsledok kompilácie jedného listingu. Ak compiler nie je nainštalovaný, skipped je True. Pri
+# `Toolchain.build` je v `command` príkaz ktorým sa skompilovaný listing spúšťa.
+class CompileResult():
+    def __init__(self, listing_filename, compiler, ok=True, output="", skipped=False, cached=False,
+                 command=None):
+        self.listing_filename = listing_filename
+        self.compiler = compiler
+        self.ok = ok
+        self.output = output
+        self.skipped = skipped
+        self.cached = cached
+        self.command = command
+
+
+# Všetky compilery ktoré checker pozná, plus bounded pool na ktorom sa kompilujú listingy.
+# Kompilácia je väčšinou čakanie na externý proces, takže stačia vlákna.
+class Toolchain():
+    def __init__(self, jobs=None, syntax_only=False):
+        self.compilers = [GccCompiler(), FpcCompiler(), PythonCompiler()]
+        self.jobs = jobs or os.cpu_count() or 1
+        self.syntax_only = syntax_only
+        self._executor = None
+        self._lock = threading.Lock()
+        self._builds = {}
+        self._build_directory = None
+
+    def configure(self, jobs=None, syntax_only=False):
+        self.shutdown()
+        self.jobs = jobs or os.cpu_count() or 1
+        self.syntax_only = syntax_only
+
+    def compiler_for(self, listing_filename):
+        extension = os.path.splitext(listing_filename)[1]
+        for compiler in self.compilers:
+            if extension in compiler.extensions:
+                return compiler
+        return None
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.jobs, thread_name_prefix='checker-compile')
+            return self._executor
+
+    def shutdown(self):
+        """Zastaví pool a zmaže všetky binárky z `build`."""
+
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+            self._builds = {}
+            if self._build_directory is not None:
+                self._build_directory.cleanup()
+                self._build_directory = None
+
+    def compile(self, listing_filename):
+        """Skompiluje jeden listing (ak sa dá, tak výsledok vytiahne z cache)."""
+
+        compiler = self.compiler_for(listing_filename)
+        if compiler.identity is None:
+            return CompileResult(listing_filename, compiler, skipped=True)
+
+        key = None
+        if cache_utils.cache is not None:
+            with open(listing_filename, 'rb') as listing_file:
+                content = listing_file.read()
+            key = cache_utils.ContentCache.key('listing', content, compiler.name,
+                                               compiler.identity,
+                                               *compiler.command('', '', self.syntax_only))
+            cached = cache_utils.cache.get(key)
+            if cached is not None:
+                return CompileResult(listing_filename, compiler, cached["ok"], cached["output"],
+                                     cached=True)
+
+        with tempfile.TemporaryDirectory() as temp_directory:
+            ok, output = compiler.compile(listing_filename, temp_directory, self.syntax_only)
+
+        if key is not None:
+            cache_utils.cache.put(key, {"ok": ok, "output": output})
+        return CompileResult(listing_filename, compiler, ok, output)
+
+    def compile_many(self, listing_filenames):
+        """Skompiluje všetky listingy na poole. Výsledky vráti v rovnakom poradí ako listingy."""
+
+        # Listing použitý viackrát kompilujeme iba raz
+        unique = list(dict.fromkeys(listing_filenames))
+        if self.jobs == 1 or len(unique) < 2:
+            results = dict(zip(unique, map(self.compile, unique)))
+        else:
+            results = dict(zip(unique, self.executor.map(deadline_utils.inherit(self.compile),
+                                                         unique)))
+        return [results[listing_filename] for listing_filename in listing_filenames]
+
+    def build(self, listing_filename):
+        """Skompiluje listing na spúšťanie (vždy celý, nie iba syntax). Binárka sa použije znova,
+        kým sa listing nezmení (veľkosť a mtime), žije v dočasnom foldri do `shutdown`."""
+
+        compiler = self.compiler_for(listing_filename)
+        if compiler.identity is None:
+            return CompileResult(listing_filename, compiler, skipped=True)
+
+        with self._lock:
+            if self._build_directory is None:
+                self._build_directory = tempfile.TemporaryDirectory(prefix='checker-build-')
+            build_directory = self._build_directory.name
+            build = self._builds.setdefault(listing_filename, {"lock": threading.Lock()})
+
+        with build["lock"]:
+            try:
+                info = os.stat(listing_filename)
+                stamp = (info.st_size, info.st_mtime_ns)
+            except OSError:
+                stamp = None
+            if "result" not in build or build["stamp"] != stamp:
+                # Listing sa zmenil (napr. pri --lsp), starú binárku už netreba
+                if "directory" in build:
+                    shutil.rmtree(build["directory"], ignore_errors=True)
+                build["directory"] = tempfile.mkdtemp(dir=build_directory)
+                ok, output = compiler.compile(listing_filename, build["directory"])
+                build["stamp"] = stamp
+                build["result"] = CompileResult(
+                    listing_filename, compiler, ok, output,
+                    command=compiler.executable(listing_filename, build["directory"]))
+            return build["result"]
+
+    def build_many(self, listing_filenames):
+        """Ako compile_many, iba cez `build`."""
+
+        unique = list(dict.fromkeys(listing_filenames))
+        if self.jobs == 1 or len(unique) < 2:
+            results = dict(zip(unique, map(self.build, unique)))
+        else:
+            results = dict(zip(unique, self.executor.map(deadline_utils.inherit(self.build),
+                                                         unique)))
+        return [results[listing_filename] for listing_filename in listing_filenames]
+
+toolchain = Toolchain()